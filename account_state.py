@@ -0,0 +1,143 @@
+import threading
+import time
+import uuid
+
+# Конечные статусы ордера: executionReport по нему больше не придёт
+FINAL_STATUSES = {'FILLED', 'CANCELED', 'EXPIRED', 'REJECTED', 'EXPIRED_IN_MATCH'}
+
+
+def new_order_id():
+    """clientOrderId для ордера бота (newClientOrderId): по нему снимается резерв"""
+    return f"bot-{uuid.uuid4().hex[:24]}"
+
+
+class AccountState:
+    """
+    Балансы аккаунта в памяти.
+    Загружаются один раз через REST, дальше обновляются снимками outboundAccountPosition
+    из user data stream и периодически сверяются с REST. balanceUpdate (ввод/вывод) только
+    логируется: тот же остаток придёт следующим снимком, а дельта поверх снимка считалась бы дважды.
+    Отправленный ордер резервирует сумму (reserve) по своему clientOrderId — несколько покупок
+    за цикл не проходят проверку по одному и тому же устаревшему балансу. Резерв снимается
+    по executionReport этого ордера: при отмене/отклонении сразу, при исполнении — следующим
+    снимком баланса (он уже учитывает сделку). Локальные часы с временем биржи не сравниваются.
+    Пока поток не запущен, free() ходит в REST, как раньше.
+    """
+
+    def __init__(self, client, reconcile_interval=5 * 60):
+        self.client = client
+        self.reconcile_interval = reconcile_interval
+        self.balances = {}      # {'USDT': {'free': 100.0, 'locked': 0.0}}
+        self.updated_at = {}    # {'USDT': время последнего обновления (мс)}
+        self.orders = {}        # последние executionReport активных ордеров по clientOrderId
+        # {clientOrderId: {'asset', 'amount', 'filled', 'at'}} — списано локально, биржа ещё не подтвердила
+        self._reserved = {}
+        self.live = False
+        self._lock = threading.Lock()
+        self._socket = None
+
+    def load(self):
+        """Полная загрузка балансов через REST (стартовая и при сверке)"""
+        account = self.client.get_account()
+        update_time = account.get('updateTime')  # время биржи; без него снимок REST главнее
+        with self._lock:
+            for b in account['balances']:
+                asset = b['asset']
+                # Событие из потока новее снимка REST — оставляем его
+                if update_time is not None and self.updated_at.get(asset, 0) > update_time:
+                    continue
+                self.balances[asset] = {'free': float(b['free']), 'locked': float(b['locked'])}
+                if update_time is not None:
+                    self.updated_at[asset] = update_time
+            # Снимок запрошен после executionReport — исполненные ордера в нём уже учтены.
+            # Резерв без отчёта дольше интервала сверки (потерян при переподключении) тоже снимаем
+            expired = time.monotonic() - self.reconcile_interval
+            self._reserved = {
+                order_id: r for order_id, r in self._reserved.items()
+                if not r['filled'] and r['at'] > expired
+            }
+
+    def free(self, asset):
+        if not self.live:
+            balance_info = self.client.get_asset_balance(asset=asset)
+            return float(balance_info['free']) if balance_info else 0.0
+        with self._lock:
+            balance = self.balances.get(asset)
+            reserved = sum(r['amount'] for r in self._reserved.values() if r['asset'] == asset)
+        return max((balance['free'] if balance else 0.0) - reserved, 0.0)
+
+    def reserve(self, order_id, asset, amount):
+        """Локально списывает amount перед ордером с clientOrderId = order_id"""
+        if not self.live:
+            return  # без потока free() и так читает свежий баланс из REST
+        with self._lock:
+            self._reserved[order_id] = {
+                'asset': asset, 'amount': float(amount), 'filled': False, 'at': time.monotonic(),
+            }
+
+    def release(self, order_id):
+        """Снимает резерв ордера, который не прошёл"""
+        with self._lock:
+            self._reserved.pop(order_id, None)
+
+    def _settle(self, asset):
+        """Снимок баланса asset учитывает уже исполненные ордера — их резерв не нужен (под _lock)"""
+        self._reserved = {
+            order_id: r for order_id, r in self._reserved.items()
+            if not (r['filled'] and r['asset'] == asset)
+        }
+
+    def handle_event(self, msg):
+        event = msg.get('data', msg)
+        event_type = event.get('e')
+        if event_type == 'outboundAccountPosition':
+            update_time = event.get('u', event.get('E', 0))
+            with self._lock:
+                for b in event['B']:
+                    self.balances[b['a']] = {'free': float(b['f']), 'locked': float(b['l'])}
+                    self.updated_at[b['a']] = update_time
+                    self._settle(b['a'])
+        elif event_type == 'balanceUpdate':
+            # Ввод/вывод средств: баланс обновит следующий outboundAccountPosition
+            print(f"💱 Изменение баланса {event['a']}: {float(event['d']):+g}")
+        elif event_type == 'executionReport':
+            self._on_order(event)
+        elif event_type == 'error':
+            print(f"⚠️ Ошибка user data stream: {event.get('m')} — сверяем балансы через REST")
+            self._safe_load()
+
+    def _on_order(self, event):
+        order_id, status = event['c'], event.get('X')
+        with self._lock:
+            if status in FINAL_STATUSES:
+                self.orders.pop(order_id, None)
+            else:
+                self.orders[order_id] = event
+            reservation = self._reserved.get(order_id)
+            if reservation is None or status not in FINAL_STATUSES:
+                return
+            if status == 'FILLED':
+                reservation['filled'] = True  # снимет следующий снимок баланса
+            else:
+                del self._reserved[order_id]
+
+    def start(self, manager):
+        """Подписывается на user data stream и запускает периодическую сверку с REST"""
+        self.load()
+        self._socket = manager.start_user_socket(callback=self.handle_event)
+        self.live = True
+
+        def reconcile():
+            while True:
+                time.sleep(self.reconcile_interval)
+                self._safe_load()
+
+        t = threading.Thread(target=reconcile, daemon=True)
+        t.start()
+        return t
+
+    def _safe_load(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f"⚠️ Не удалось сверить балансы: {e}")
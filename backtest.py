@@ -0,0 +1,144 @@
+import json
+import sys
+import numpy as np
+from indicators import IndicatorEngine
+from kline_cache import klines_to_frame
+from strategies import STRATEGY_SIGNALS, strategy_warmup, confidence_multiplier
+from utils import get_strategy_params
+
+# Правила выхода — те же, что в check_exit_conditions
+TAKE_PROFIT = 1.5    # %
+STOP_LOSS = 1.0      # %
+MAX_TIMEOUT = 240    # минут
+START_DEPOSIT = 1000.0
+TRADE_PERCENT = 5
+
+
+def strategy_signal_matrix(df, strategy_names=None, params_by_name=None, engine=None):
+    """
+    Сигналы всех стратегий на каждом баре.
+    Возвращает (buy_count, sell_count) — массивы длины len(df).
+    """
+    engine = engine or IndicatorEngine(df)
+    strategy_names = strategy_names or list(STRATEGY_SIGNALS)
+    buy_count = np.zeros(len(df), dtype=np.int64)
+    sell_count = np.zeros(len(df), dtype=np.int64)
+    bars = np.arange(1, len(df) + 1)  # сколько баров истории видно на каждом баре
+    for name in strategy_names:
+        if params_by_name is not None and name in params_by_name:
+            params = params_by_name[name]
+        else:
+            params = get_strategy_params(name)
+        signals = STRATEGY_SIGNALS[name](df, params=params, engine=engine).to_numpy()
+        # Как в боте: пока индикаторы не прогрелись, стратегия не голосует
+        ready = bars >= strategy_warmup(name, params)
+        buy_count += (signals == 'BUY') & ready
+        sell_count += (signals == 'SELL') & ready
+    return buy_count, sell_count
+
+
+def adaptive_timeouts(df, engine=None):
+    """Векторный аналог calculate_adaptive_timeout * (1 + estimate_volatility), в минутах"""
+    engine = engine or IndicatorEngine(df)
+    avg_range = engine.rolling_mean('range_pct', 20).to_numpy()
+    base = np.where(avg_range > 3, 30, np.where(avg_range > 1.5, 60, 90))
+    volatility = (engine.rolling_mean('body', 20) / engine.rolling_mean('close', 20)).to_numpy()
+    timeout = base * (1 + volatility)
+    # Где волатильность ещё не посчитана, main.py падает на int(NaN) и сделку не открывает
+    return np.where(np.isnan(timeout), np.nan, np.minimum(np.floor(timeout), MAX_TIMEOUT))
+
+
+def run_backtest(df, strategy_names=None, params_by_name=None, bar_minutes=5,
+                 start_deposit=START_DEPOSIT, trade_percent=TRADE_PERCENT,
+                 take_profit=TAKE_PROFIT, stop_loss=STOP_LOSS, start_bar=0):
+    """
+    Прогоняет стратегии по всей истории одного символа.
+    Вход — по close бара с подтверждённым сигналом (минимум 2 стратегии),
+    выход — по close первого бара, где достигнут +take_profit% / -stop_loss% или тайм-аут.
+    Одновременно открыта не больше одной позиции, как и в боте.
+    Бары до start_bar только прогревают индикаторы — сделки на них не открываются.
+    """
+    engine = IndicatorEngine(df)
+    close = df['close'].to_numpy(dtype=float)
+    n = len(close)
+
+    buy_count, sell_count = strategy_signal_matrix(df, strategy_names, params_by_name, engine)
+    timeouts = adaptive_timeouts(df, engine)
+    side = np.where((buy_count >= 2) & (sell_count == 0), 1, np.where((sell_count >= 2) & (buy_count == 0), -1, 0))
+    side[np.isnan(timeouts)] = 0
+    entries = np.flatnonzero(side)
+
+    deposit = start_deposit
+    trades = []
+    i = start_bar
+    while True:
+        # Следующий сигнал после закрытия предыдущей позиции
+        k = np.searchsorted(entries, i)
+        if k >= len(entries):
+            break
+        entry = entries[k]
+        direction = side[entry]
+        hold_bars = max(int(np.ceil(timeouts[entry] / bar_minutes)), 1)
+        last = min(entry + hold_bars, n - 1)
+        if last <= entry:
+            break
+
+        window = close[entry + 1:last + 1]
+        change = (window - close[entry]) / close[entry] * 100 * direction
+        hit = np.flatnonzero((change >= take_profit) | (change <= -stop_loss))
+        offset = hit[0] if len(hit) else len(window) - 1
+        exit_bar = entry + 1 + offset
+
+        confidence = confidence_multiplier(buy_count[entry], sell_count[entry])
+        percent = min(trade_percent + (confidence - 2) * 2, 30)
+        amount = deposit * percent / 100
+        profit = round(float(amount * change[offset] / 100), 2)
+        deposit += profit
+        trades.append({
+            'entry_bar': int(entry),
+            'exit_bar': int(exit_bar),
+            'direction': 'BUY' if direction > 0 else 'SELL',
+            'change': float(change[offset]),
+            'amount': amount,
+            'profit': profit,
+            'result': 'win' if profit > 0 else 'loss',
+        })
+        i = exit_bar + 1
+
+    wins = sum(1 for t in trades if t['result'] == 'win')
+    return {
+        'trades': trades,
+        'total': len(trades),
+        'wins': wins,
+        'losses': len(trades) - wins,
+        'winrate': wins / len(trades) if trades else None,
+        'profit': round(deposit - start_deposit, 2),
+        'final_deposit': deposit,
+    }
+
+
+def run_backtest_many(histories, **kwargs):
+    """Бэктест по нескольким символам: {'BTCUSDT': df, ...} -> сводка и результаты по символам"""
+    results = {symbol: run_backtest(df, **kwargs) for symbol, df in histories.items()}
+    total = sum(r['total'] for r in results.values())
+    wins = sum(r['wins'] for r in results.values())
+    return {
+        'total': total,
+        'wins': wins,
+        'winrate': wins / total if total else None,
+        'profit': round(sum(r['profit'] for r in results.values()), 2),
+        'by_symbol': results,
+    }
+
+
+if __name__ == '__main__':
+    # python backtest.py klines.json — файл со списком свечей в формате client.get_klines
+    # python backtest.py --store klines DOGEUSDT — история из KlineStore (kline_store.py backfill)
+    if sys.argv[1] == '--store':
+        from kline_store import KlineStore
+        df = KlineStore(sys.argv[2]).frame(sys.argv[3], '5m')
+    else:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            df = klines_to_frame(json.load(f))
+    result = run_backtest(df)
+    print(f"Сделок: {result['total']}, win rate: {result['winrate']}, прибыль: ${result['profit']:.2f}")
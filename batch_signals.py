@@ -0,0 +1,291 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils import get_strategy_params
+
+# Пакетный расчёт: окна свечей всех символов складываются в 2-D массивы (символы × бары),
+# индикаторы считаются сразу по всем строкам, стратегии дают столбец сигналов на символ.
+# Значения совпадают с pandas-версиями из indicators.py / strategies.py.
+
+BUY = 1
+SELL = -1
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def stack_frames(frames, fields=FIELDS):
+    """
+    {символ: df} -> список групп (символы, {поле: 2-D массив}).
+    В одну группу попадают окна одинаковой длины (обычно все — lookback баров).
+    """
+    groups = {}
+    for symbol, df in frames.items():
+        groups.setdefault(len(df), []).append(symbol)
+    result = []
+    for length, symbols in groups.items():
+        if length == 0:
+            continue
+        arrays = {f: np.vstack([frames[s][f].to_numpy(dtype=np.float64) for s in symbols]) for f in fields}
+        result.append((symbols, arrays))
+    return result
+
+
+# 🧮 Ядра по оси баров (axis=1); первые window-1 значений — NaN, как у rolling(window)
+
+def _rolling(x, window, reduce):
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = reduce(sliding_window_view(x, window, axis=1), axis=-1)
+    return out
+
+
+def rolling_mean(x, window):
+    return _rolling(x, window, np.mean)
+
+
+def rolling_std(x, window):
+    return _rolling(x, window, lambda w, axis: np.std(w, axis=axis, ddof=1))
+
+
+def rolling_min(x, window):
+    return _rolling(x, window, np.min)
+
+
+def rolling_max(x, window):
+    return _rolling(x, window, np.max)
+
+
+def ewm_mean(x, span):
+    """
+    Аналог Series.ewm(span=span).mean() (adjust=True), векторно по символам и по барам.
+    Числитель num_t = x_t + decay * num_(t-1) внутри блока баров — это взвешенный cumsum:
+    decay^j * cumsum(x_k * decay^-k). Блок ограничен так, чтобы decay^-j не превышал 1e8
+    и сумма не теряла точность; между блоками переносится только последний num.
+    Знаменатель — сумма геометрической прогрессии.
+    """
+    decay = 1 - 2 / (span + 1)
+    if decay <= 0:
+        return x.astype(np.float64, copy=True)
+    n = x.shape[1]
+    block = max(1, min(n, int(np.log(1e8) / -np.log(decay))))
+    powers = decay ** np.arange(block)
+    num = np.empty(x.shape)
+    carry = np.zeros((x.shape[0], 1))
+    for start in range(0, n, block):
+        m = min(block, n - start)
+        acc = np.cumsum(x[:, start:start + m] / powers[:m], axis=1) * powers[:m]
+        acc += carry * (decay * powers[:m])
+        num[:, start:start + m] = acc
+        carry = acc[:, -1:]
+    den = (1 - decay ** np.arange(1, n + 1)) / (1 - decay)
+    return num / den
+
+
+def rsi(close, period=14):
+    delta = np.full(close.shape, np.nan)
+    delta[:, 1:] = np.diff(close, axis=1)
+    avg_gain = rolling_mean(np.clip(delta, 0, None), period)
+    avg_loss = rolling_mean(-np.clip(delta, None, 0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def stochastic_rsi(close, period=14, smoothK=3, smoothD=3, rsi_values=None):
+    if rsi_values is None:
+        rsi_values = rsi(close, period)
+    min_rsi = rolling_min(rsi_values, period)
+    max_rsi = rolling_max(rsi_values, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stoch = (rsi_values - min_rsi) / (max_rsi - min_rsi)
+    k = rolling_mean(stoch, smoothK)
+    return k, rolling_mean(k, smoothD)
+
+
+class BatchIndicators:
+    """IndicatorEngine для 2-D массивов: тот же набор индикаторов и тот же кэш по (имя, параметры)"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self._cache = {}
+
+    def _get(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def rsi(self, period=14, column='close'):
+        return self._get(('rsi', column, period), lambda: rsi(self.arrays[column], period))
+
+    def ema(self, span, column='close'):
+        return self._get(('ema', column, span), lambda: ewm_mean(self.arrays[column], span))
+
+    def sma(self, window, column='close'):
+        return self._get(('sma', column, window), lambda: rolling_mean(self.arrays[column], window))
+
+    def std(self, window, column='close'):
+        return self._get(('std', column, window), lambda: rolling_std(self.arrays[column], window))
+
+    def bollinger(self, window=20, num_std=2):
+        def compute():
+            ma = self.sma(window)
+            std = self.std(window)
+            return ma, ma + num_std * std, ma - num_std * std
+        return self._get(('bollinger', window, num_std), compute)
+
+    def macd(self, fast=12, slow=26, signal=9):
+        def compute():
+            macd = self.ema(fast) - self.ema(slow)
+            return macd, ewm_mean(macd, signal)
+        return self._get(('macd', fast, slow, signal), compute)
+
+    def vwap(self, window=None):
+        def compute():
+            q = self.arrays['volume']
+            pq = self.arrays['close'] * q
+            if window is None:
+                return np.cumsum(pq, axis=1) / np.cumsum(q, axis=1)
+            return _rolling(pq, window, np.sum) / _rolling(q, window, np.sum)
+        return self._get(('vwap', window), compute)
+
+    def stoch_rsi(self, period=14, smoothK=3, smoothD=3):
+        return self._get(
+            ('stoch_rsi', period, smoothK, smoothD),
+            lambda: stochastic_rsi(self.arrays['close'], period, smoothK, smoothD, rsi_values=self.rsi(period)),
+        )
+
+    def rolling_mean(self, name, window):
+        if name == 'range_pct':
+            a = self.arrays
+            return self._get(('rolling_mean', name, window),
+                             lambda: rolling_mean((a['high'] - a['low']) / a['close'] * 100, window))
+        if name == 'body':
+            a = self.arrays
+            return self._get(('rolling_mean', name, window),
+                             lambda: rolling_mean(np.abs(a['close'] - a['open']), window))
+        return self.sma(window, column=name)
+
+
+# 📌 Стратегии: сигнал на последнем баре каждого символа (BUY=1, SELL=-1, 0 — нет)
+
+def _signal(buy, sell):
+    """Как в обычных стратегиях: BUY проверяется первым"""
+    return np.where(buy, BUY, np.where(sell, SELL, 0)).astype(np.int8)
+
+
+def _cross_up(a, b):
+    return (a[:, -2] < b[:, -2]) & (a[:, -1] > b[:, -1])
+
+
+def _cross_down(a, b):
+    return (a[:, -2] > b[:, -2]) & (a[:, -1] < b[:, -1])
+
+
+def ema_rsi_batch(ind, params):
+    ema = ind.ema(params['ema_period'])[:, -1]
+    rsi_last = ind.rsi(params['rsi_period'])[:, -1]
+    close = ind.arrays['close'][:, -1]
+    return _signal((close > ema) & (rsi_last < 70), (close < ema) & (rsi_last > 30))
+
+
+def bollinger_rsi_batch(ind, params):
+    _, upper, lower = ind.bollinger(params.get('window', 20))
+    rsi_last = ind.rsi(params.get('rsi_period', 14))[:, -1]
+    close = ind.arrays['close'][:, -1]
+    return _signal((close < lower[:, -1]) & (rsi_last < 30), (close > upper[:, -1]) & (rsi_last > 70))
+
+
+def macd_ema_batch(ind, params):
+    macd, signal = ind.macd(params.get('fast', 12), params.get('slow', 26), params.get('signal', 9))
+    return _signal(_cross_up(macd, signal), _cross_down(macd, signal))
+
+
+def vwap_rsi_batch(ind, params):
+    vwap = ind.vwap(params.get('vwap_window', 100))[:, -1]
+    rsi_last = ind.rsi(params.get('rsi_period', 14))[:, -1]
+    close = ind.arrays['close'][:, -1]
+    return _signal((close > vwap) & (rsi_last < 70), (close < vwap) & (rsi_last > 30))
+
+
+def macd_stochastic_batch(ind, params):
+    macd, signal = ind.macd(12, 26, 9)
+    k, d = ind.stoch_rsi(14, 3, 3)
+    return _signal(
+        _cross_up(macd, signal) & _cross_up(k, d),
+        _cross_down(macd, signal) & _cross_down(k, d),
+    )
+
+
+def bollinger_volume_batch(ind, params, volume_threshold=1.5):
+    _, upper, lower = ind.bollinger(20)
+    volume_ma = ind.sma(20, column='volume')[:, -1]
+    close = ind.arrays['close'][:, -1]
+    volume_spike = ind.arrays['volume'][:, -1] > volume_threshold * volume_ma
+    # В обычной версии SELL проверяется первым
+    sell = (close > upper[:, -1]) & volume_spike
+    buy = (close < lower[:, -1]) & volume_spike & ~sell
+    return _signal(buy, sell)
+
+
+def ema_crossover_batch(ind, params):
+    fast = ind.ema(50)
+    slow = ind.ema(200)
+    return _signal(_cross_up(fast, slow), _cross_down(fast, slow))
+
+
+BATCH_STRATEGIES = {
+    'ema_rsi_strategy': ema_rsi_batch,
+    'bollinger_rsi_strategy': bollinger_rsi_batch,
+    'macd_ema_strategy': macd_ema_batch,
+    'vwap_rsi_strategy': vwap_rsi_batch,
+    'macd_stochastic_strategy': macd_stochastic_batch,
+    'bollinger_volume_strategy': bollinger_volume_batch,
+    'ema_crossover_strategy': ema_crossover_batch,
+}
+
+
+def signal_matrix(ind, strategy_names=None, params_by_name=None):
+    """Матрица сигналов (стратегии × символы): BUY=1, SELL=-1, 0 — нет сигнала"""
+    strategy_names = strategy_names or list(BATCH_STRATEGIES)
+    rows = []
+    for name in strategy_names:
+        if params_by_name is not None and name in params_by_name:
+            params = params_by_name[name]
+        else:
+            params = get_strategy_params(name)
+        rows.append(BATCH_STRATEGIES[name](ind, params))
+    return np.vstack(rows)
+
+
+def consensus(matrix):
+    """
+    Консенсус по столбцам матрицы — как consensus_signal / confidence_multiplier.
+    Возвращает (сигнал по символу, множитель уверенности, buy_count, sell_count).
+    """
+    buy_count = (matrix == BUY).sum(axis=0)
+    sell_count = (matrix == SELL).sum(axis=0)
+    final = np.where((buy_count >= 2) & (sell_count == 0), BUY,
+                     np.where((sell_count >= 2) & (buy_count == 0), SELL, 0))
+    count = np.maximum(buy_count, sell_count)
+    confidence = np.select([count >= 4, count == 3, count == 2], [1.2, 1.1, 1.0], 0.9)
+    return final, confidence, buy_count, sell_count
+
+
+def adaptive_timeouts(ind, max_timeout=240):
+    """calculate_adaptive_timeout * (1 + estimate_volatility) по последнему бару; NaN — данных мало"""
+    avg_range = ind.rolling_mean('range_pct', 20)[:, -1]
+    base = np.where(avg_range > 3, 30, np.where(avg_range > 1.5, 60, 90))
+    timeout = base * (1 + volatility(ind))
+    return np.where(np.isnan(timeout), np.nan, np.minimum(np.floor(timeout), max_timeout))
+
+
+def volatility(ind):
+    """estimate_volatility по последнему бару: среднее тело свечи / средняя цена за 20 баров"""
+    return ind.rolling_mean('body', 20)[:, -1] / ind.rolling_mean('close', 20)[:, -1]
+
+
+def volume_sufficient(ind, min_volume_ratio=0.5):
+    """is_volume_sufficient: последний объём не ниже min_volume_ratio от среднего (по предпоследнему бару)"""
+    volume = ind.arrays['volume']
+    if volume.shape[1] < 2:
+        return np.zeros(volume.shape[0], dtype=bool)
+    return volume[:, -1] >= ind.sma(20, column='volume')[:, -2] * min_volume_ratio
@@ -0,0 +1,291 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorEngine, compute_rsi, stochastic_rsi
+from kline_cache import klines_to_frame
+from kline_buffer import KlineBuffer
+from batch_signals import BUY, SELL, BatchIndicators, stack_frames, signal_matrix, consensus as batch_consensus
+from utils import can_trade, get_strategy_params
+from strategies import (
+    STRATEGY_REGISTRY,
+    STRATEGY_SIGNALS,
+    consensus_signal,
+    confidence_multiplier
+)
+
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+RAW_MAX_BARS = 200_000  # сырые свечи (списки строк) дальше не генерируем — слишком много памяти
+MIN_TIME = 0.2          # один замер — не короче стольких секунд (быстрые кейсы вызываются много раз подряд)
+MAX_REPEAT = 1_000_000  # предел вызовов в замере
+ROUNDS = 5              # замеров на кейс: сравнивается медиана
+SCAN_SYMBOLS = 100      # символов в цикле скана: пакетный режим против поштучного
+SCAN_MAX_BARS = 1_000   # цикл скана замеряем только на окнах, которые бот реально держит
+THRESHOLD = 0.2         # замедление больше чем на 20% — регрессия
+
+STRATEGIES = [spec['func'] for spec in STRATEGY_REGISTRY.values()]
+
+
+def synthetic_frame(n, seed=42, start_price=0.1):
+    """Случайное блуждание: числовой DataFrame (для размеров, где сырые свечи не помещаются в память)"""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(rng.normal(0, 0.004, n).cumsum())
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'timestamp': 1_700_000_000_000 + np.arange(n) * 300_000,
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, n))),
+        'low': np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, n))),
+        'close': close,
+        'volume': rng.uniform(1e5, 1e6, n),
+    })
+
+
+def synthetic_klines(n, seed=42, start_price=0.1):
+    """Те же данные в формате client.get_klines (цены строками)"""
+    df = synthetic_frame(n, seed, start_price)
+    return [
+        [t, str(o), str(h), str(lo), str(c), str(v), t + 299_999, str(v * c), 100, str(v / 2), str(v * c / 2), '0']
+        for t, o, h, lo, c, v in zip(*(df[col].tolist() for col in ('timestamp', 'open', 'high', 'low', 'close', 'volume')))
+    ]
+
+
+def load_recorded(path):
+    """Файл свечей: список (как для backtest.py) или {символ: свечи} (как для replay.py) — берём самый длинный ряд"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = max(data.values(), key=len)
+    return data
+
+
+def _timed(func, number):
+    t0 = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - t0
+
+
+def measure(func, rounds=ROUNDS):
+    """
+    Время одного вызова в секундах.
+    Число вызовов подбирается так, чтобы замер длился не меньше MIN_TIME, затем делается
+    rounds замеров; в результате — минимум и медиана среднего времени вызова по замерам.
+    """
+    number = 1
+    while True:
+        elapsed = _timed(func, number)
+        if elapsed >= MIN_TIME or number >= MAX_REPEAT:
+            break
+        # С запасом до MIN_TIME по времени прошлого замера, но не больше чем в 10 раз за шаг
+        number = min(MAX_REPEAT, number * 10, max(number * 2, int(number * MIN_TIME * 1.2 / max(elapsed, 1e-9))))
+    per_call = [elapsed / number] + [_timed(func, number) / number for _ in range(rounds - 1)]
+    return {'min': min(per_call), 'median': float(np.median(per_call)), 'repeat': number, 'rounds': rounds}
+
+
+# 🧮 Путь решения по символу — тот же, что у бота: свеча в KlineBuffer -> DataFrame ->
+# индикаторы -> прогретые стратегии -> консенсус -> объём сделки через main.get_trade_quantity
+
+BENCH_SYMBOL = {
+    'symbol': 'BENCHUSDT',
+    'status': 'TRADING',
+    'baseAsset': 'BENCH',
+    'quoteAsset': 'USDT',
+    'filters': [
+        {'filterType': 'LOT_SIZE', 'minQty': '1.00000000', 'maxQty': '9000000000.00000000', 'stepSize': '1.00000000'},
+        {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'},
+        {'filterType': 'PRICE_FILTER', 'minPrice': '0.00001000', 'maxPrice': '1000.00000000', 'tickSize': '0.00001000'},
+    ],
+}
+
+
+def bot():
+    """Модуль main с фильтрами BENCHUSDT; импорт не ходит в сеть — клиент биржи создаётся лениво"""
+    import main
+    if 'BENCHUSDT' not in main.symbol_filters.symbols():
+        main.symbol_filters.load({'symbols': [BENCH_SYMBOL]})
+    return main
+
+
+def run_strategies(df):
+    engine = IndicatorEngine(df)
+    return [s(df, params=get_strategy_params(s.__name__), engine=engine) for s in STRATEGIES]
+
+
+def trade_quantity(main, signal, confidence, price):
+    """Объём сделки, как в main.execute_trade (без ордера и winrate)"""
+    if not signal:
+        return 0.0
+    percent = min(main.TRADE_PERCENT + (confidence - 2) * 2, 30)
+    trade_amount = main.current_deposit * percent / 100
+    if not can_trade(main.symbol_filters, 'BENCHUSDT', trade_amount):
+        return 0.0
+    return main.get_trade_quantity('BENCHUSDT', trade_amount, price)
+
+
+def decision_path(main, buffer, bar):
+    """main.evaluate_symbol: последняя свеча обновляет буфер кэша, стратегии — по его окну"""
+    buffer.update_last(bar)
+    return symbol_decision(main, buffer.to_frame())
+
+
+def symbol_decision(main, df):
+    engine = IndicatorEngine(df)
+    signals = [
+        STRATEGY_REGISTRY[name]['func'](df, params=get_strategy_params(name), engine=engine)
+        for name in main.ready_strategies(len(df))
+    ]
+    buy_count = signals.count('BUY')
+    sell_count = signals.count('SELL')
+    final_signal = consensus_signal(buy_count, sell_count)
+    confidence = confidence_multiplier(buy_count, sell_count)
+    return final_signal, trade_quantity(main, final_signal, confidence, float(df['close'].iloc[-1]))
+
+
+def batch_decision_path(main, buffer, bar):
+    """main.evaluate_batch (режим по умолчанию) для одного символа"""
+    buffer.update_last(bar)
+    return batch_decision(main, {'BENCHUSDT': buffer.to_frame()})['BENCHUSDT']
+
+
+def batch_decision(main, frames):
+    """Сигналы и объёмы по всем символам одним пакетом: {символ: (сигнал, объём)}"""
+    decisions = {}
+    for symbols, arrays in stack_frames(frames):
+        ind = BatchIndicators(arrays)
+        names = main.ready_strategies(arrays['close'].shape[1])
+        final, confidence, _, _ = batch_consensus(signal_matrix(ind, names))
+        for j, symbol in enumerate(symbols):
+            signal = {BUY: 'BUY', SELL: 'SELL'}.get(int(final[j]))
+            decisions[symbol] = signal, trade_quantity(main, signal, float(confidence[j]), float(arrays['close'][j, -1]))
+    return decisions
+
+
+def scan_cases(n, count=SCAN_SYMBOLS):
+    """Цикл скана count символов с окном n баров: поштучно (BATCH_SIGNALS=0) и пакетно (по умолчанию)"""
+    main = bot()
+    frames = {f"BENCH{i}USDT": synthetic_frame(n, seed=i) for i in range(count)}
+    return {
+        f'scan/symbol_by_symbol_{count}': lambda: {s: symbol_decision(main, df) for s, df in frames.items()},
+        f'scan/batch_{count}': lambda: batch_decision(main, frames),
+    }
+
+
+def cases(df, raw):
+    """{имя: функция без аргументов} для одного набора свечей"""
+    close = df['close']
+    result = {
+        'indicator/compute_rsi': lambda: compute_rsi(close, 14),
+        'indicator/stochastic_rsi': lambda: stochastic_rsi(close),
+        'indicator/ema_50': lambda: IndicatorEngine(df).ema(50),
+        'indicator/bollinger_20': lambda: IndicatorEngine(df).bollinger(20),
+        'indicator/macd': lambda: IndicatorEngine(df).macd(),
+        'indicator/vwap': lambda: IndicatorEngine(df).vwap(100),
+    }
+    for strat in STRATEGIES:
+        result[f'strategy/{strat.__name__}'] = (
+            lambda strat=strat: strat(df, params=get_strategy_params(strat.__name__))
+        )
+    # Все стратегии на одном движке — как в main.evaluate_symbol
+    result['strategies/shared_engine'] = lambda: run_strategies(df)
+    for name, fn in STRATEGY_SIGNALS.items():
+        result[f'signals/{name}'] = lambda fn=fn, name=name: fn(df, params=get_strategy_params(name))
+    if raw is not None:
+        result['parse/klines_to_frame'] = lambda: klines_to_frame(raw)
+        result['parse/kline_buffer_extend'] = lambda: KlineBuffer(len(raw)).extend(raw)
+        buffer = KlineBuffer(len(raw))
+        buffer.extend(raw)
+        result['frame/kline_buffer_to_frame'] = lambda: buffer.to_frame()
+        main = bot()
+        result['decision/full_path'] = lambda: decision_path(main, buffer, raw[-1])
+        result['decision/batch_path'] = lambda: batch_decision_path(main, buffer, raw[-1])
+    if raw is not None and len(df) <= SCAN_MAX_BARS:
+        result.update(scan_cases(len(df)))
+    return result
+
+
+def run(sizes=SIZES, recorded=None, only=None):
+    results = {}
+    datasets = [('synthetic', None)]
+    if recorded is not None:
+        datasets.append(('recorded', recorded))
+    for dataset, source in datasets:
+        for n in sizes:
+            if source is not None:
+                if n > len(source):
+                    continue
+                raw = source[-n:]
+                df = klines_to_frame(raw)
+            elif n <= RAW_MAX_BARS:
+                raw = synthetic_klines(n)
+                df = klines_to_frame(raw)
+            else:
+                raw = None
+                df = synthetic_frame(n)
+            for name, func in cases(df, raw).items():
+                if only and only not in name:
+                    continue
+                key = f"{name}/{dataset}/{n}"
+                results[key] = measure(func)
+                print(f"{key:<60} {results[key]['median'] * 1000:10.3f} мс")
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Список (ключ, было, стало, отношение) по медианам для замедлившихся больше чем на threshold"""
+    regressions = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        ratio = new['median'] / old['median'] if old['median'] else float('inf')
+        if ratio > 1 + threshold:
+            regressions.append((key, old['median'], new['median'], ratio))
+    return regressions
+
+
+if __name__ == '__main__':
+    # python benchmarks.py --output baseline.json
+    # python benchmarks.py --compare baseline.json [--threshold 0.2] — код выхода 1 при регрессии
+    parser = argparse.ArgumentParser(description='Замеры индикаторов, стратегий и цикла решения')
+    parser.add_argument('--sizes', type=lambda s: [int(x) for x in s.split(',')], default=SIZES)
+    parser.add_argument('--data', help='записанные свечи (JSON) — дополнительно к синтетическим')
+    parser.add_argument('--only', help='замерять только кейсы, в имени которых есть подстрока')
+    parser.add_argument('--output', help='куда записать результаты (JSON)')
+    parser.add_argument('--compare', help='базовый файл результатов для сравнения')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    recorded = load_recorded(args.data) if args.data else None
+    results = run(args.sizes, recorded, args.only)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'numpy': np.__version__,
+                    'pandas': pd.__version__,
+                    'machine': platform.machine(),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"💾 Результаты записаны в {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n🐢 Регрессии (медленнее больше чем на {args.threshold:.0%}):")
+            for key, old, new, ratio in regressions:
+                print(f"  {key}: {old * 1000:.3f} -> {new * 1000:.3f} мс (x{ratio:.2f})")
+            sys.exit(1)
+        print(f"\n✅ Регрессий нет (порог {args.threshold:.0%})")
@@ -0,0 +1,92 @@
+import bisect
+import heapq
+import math
+import threading
+from datetime import timedelta
+
+TAKE_PROFIT = 1.5  # %
+STOP_LOSS = 1.0    # %
+
+
+class ExitEngine:
+    """
+    Индекс условий выхода.
+    При открытии позиции TP/SL переводятся в абсолютные цены и кладутся в отсортированные
+    по символу списки, тайм-ауты — в кучу дедлайнов. Обновление цены или часов затрагивает
+    только позиции, которые действительно пересекли свой уровень.
+    Сработавшие позиции остаются в индексе до remove() — если закрыть не удалось,
+    они вернутся на следующем тике.
+    """
+
+    def __init__(self, take_profit=TAKE_PROFIT, stop_loss=STOP_LOSS):
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self._above = {}      # symbol -> [(цена, key)] — срабатывает при price >= уровня
+        self._below = {}      # symbol -> [(цена, key)] — срабатывает при price <= уровня
+        self._deadlines = []  # куча (дедлайн, key)
+        self._expired = set()
+        self._positions = {}  # key -> {'symbol', 'above', 'below', 'deadline'}
+        self._lock = threading.Lock()
+
+    def add(self, key, symbol, side, entry_price, opened_at, timeout_minutes):
+        if side == 'BUY':
+            above = entry_price * (1 + self.take_profit / 100)  # тейк-профит
+            below = entry_price * (1 - self.stop_loss / 100)    # стоп-лосс
+        else:
+            # Для коротких сделок уровни зеркальные
+            above = entry_price * (1 + self.stop_loss / 100)
+            below = entry_price * (1 - self.take_profit / 100)
+        deadline = opened_at + timedelta(minutes=timeout_minutes)
+        with self._lock:
+            self._remove(key)
+            bisect.insort(self._above.setdefault(symbol, []), (above, key))
+            bisect.insort(self._below.setdefault(symbol, []), (below, key))
+            heapq.heappush(self._deadlines, (deadline, key))
+            self._positions[key] = {'symbol': symbol, 'above': above, 'below': below, 'deadline': deadline}
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        pos = self._positions.pop(key, None)
+        if pos is None:
+            return
+        self._expired.discard(key)
+        for index, level in ((self._above, pos['above']), (self._below, pos['below'])):
+            levels = index[pos['symbol']]
+            i = bisect.bisect_left(levels, (level, key))
+            if i < len(levels) and levels[i] == (level, key):
+                levels.pop(i)
+            if not levels:
+                del index[pos['symbol']]
+        # Из кучи удаляем лениво: запись без позиции пропускается в on_clock
+
+    def on_price(self, symbol, price):
+        """Ключи позиций по символу, цена которых пересекла TP/SL"""
+        with self._lock:
+            triggered = []
+            above = self._above.get(symbol)
+            if above:
+                # Все уровни <= price; кортеж (x,) меньше любого (x, key)
+                end = bisect.bisect_left(above, (math.nextafter(price, math.inf),))
+                triggered.extend(key for _, key in above[:end])
+            below = self._below.get(symbol)
+            if below:
+                # Все уровни >= price
+                triggered.extend(key for _, key in below[bisect.bisect_left(below, (price,)):])
+            return triggered
+
+    def on_clock(self, now):
+        """Ключи позиций, у которых истёк тайм-аут"""
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, key = heapq.heappop(self._deadlines)
+                pos = self._positions.get(key)
+                if pos is not None and pos['deadline'] == deadline:
+                    self._expired.add(key)
+            return list(self._expired)
+
+    def levels(self, key):
+        pos = self._positions.get(key)
+        return dict(pos) if pos else None
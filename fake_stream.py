@@ -0,0 +1,99 @@
+import itertools
+
+
+class FakeStreamManager:
+    """
+    Локальная замена ThreadedWebsocketManager для тестов и прогонов без сети.
+    Повторяет его интерфейс (start / start_multiplex_socket / start_user_socket / stop_socket / stop)
+    и рассылает подписчикам сообщения в формате потоков Binance.
+    """
+
+    def __init__(self):
+        self._sockets = {}  # {имя сокета: (callback, набор потоков)}
+        self._user_sockets = {}  # {имя сокета: callback}
+        self._ids = itertools.count(1)
+        self.started = False
+
+    def start(self):
+        self.started = True
+
+    def join(self, timeout=None):
+        pass
+
+    def stop(self):
+        self._sockets.clear()
+        self._user_sockets.clear()
+        self.started = False
+
+    def start_multiplex_socket(self, callback, streams):
+        name = f"multiplex-{next(self._ids)}"
+        self._sockets[name] = (callback, set(streams))
+        return name
+
+    def start_user_socket(self, callback):
+        name = f"user-{next(self._ids)}"
+        self._user_sockets[name] = callback
+        return name
+
+    def stop_socket(self, name):
+        self._sockets.pop(name, None)
+        self._user_sockets.pop(name, None)
+
+    def send(self, stream, data):
+        """Отправляет сообщение всем подписчикам потока"""
+        for callback, streams in list(self._sockets.values()):
+            if stream in streams:
+                callback({'stream': stream, 'data': data})
+
+    def push_kline(self, symbol, interval, bar, closed=True):
+        """Отправляет свечу в формате client.get_klines как событие kline"""
+        stream = f"{symbol.lower()}@kline_{interval}"
+        self.send(stream, {
+            'e': 'kline',
+            'E': bar[6],
+            's': symbol,
+            'k': {
+                't': bar[0], 'T': bar[6], 's': symbol, 'i': interval,
+                'o': bar[1], 'h': bar[2], 'l': bar[3], 'c': bar[4], 'v': bar[5],
+                'n': bar[8], 'x': closed, 'q': bar[7], 'V': bar[9], 'Q': bar[10], 'B': bar[11],
+            },
+        })
+
+    def push_book_ticker(self, symbol, bid, ask, bid_qty=1.0, ask_qty=1.0):
+        stream = f"{symbol.lower()}@bookTicker"
+        self.send(stream, {
+            'u': 0, 's': symbol,
+            'b': str(bid), 'B': str(bid_qty),
+            'a': str(ask), 'A': str(ask_qty),
+        })
+
+    def replay(self, symbol, interval, bars):
+        """Проигрывает список свечей: каждая приходит как закрытая"""
+        for bar in bars:
+            self.push_kline(symbol, interval, bar, closed=True)
+
+    # 📌 User data stream
+
+    def push_user_event(self, event):
+        for callback in list(self._user_sockets.values()):
+            callback(event)
+
+    def push_account_position(self, balances, update_time=0):
+        """balances: {'USDT': (free, locked), ...}"""
+        self.push_user_event({
+            'e': 'outboundAccountPosition',
+            'E': update_time,
+            'u': update_time,
+            'B': [{'a': asset, 'f': str(free), 'l': str(locked)} for asset, (free, locked) in balances.items()],
+        })
+
+    def push_balance_update(self, asset, delta, update_time=0):
+        """Ввод/вывод средств: дельта свободного баланса"""
+        self.push_user_event({'e': 'balanceUpdate', 'E': update_time, 'a': asset, 'd': str(delta), 'T': update_time})
+
+    def push_execution_report(self, symbol, side, qty, price, status='FILLED', client_order_id='fake', update_time=0):
+        self.push_user_event({
+            'e': 'executionReport', 'E': update_time, 's': symbol, 'c': client_order_id,
+            'S': side, 'o': 'MARKET', 'q': str(qty), 'X': status, 'x': 'TRADE',
+            'l': str(qty), 'z': str(qty), 'L': str(price), 'T': update_time,
+        })
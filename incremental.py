@@ -0,0 +1,382 @@
+import math
+from collections import deque
+
+# Инкрементальные индикаторы: каждое update() — O(1) (амортизированно для min/max).
+# Значения совпадают с pandas-версиями из indicators.py (ewm(span).mean(), rolling(...)),
+# пока окно не заполнено — возвращается NaN, как и в pandas.
+# В потоковый путь пока не подключены: стратегии читают индикаторы рядами (пересечения,
+# prev-значения) через IndicatorEngine / batch_signals, а состояние нужно сбрасывать
+# вместе с KlineCache при разрывах и перезаливке окна.
+
+NAN = float('nan')
+
+
+def _divide(a, b):
+    """Деление с семантикой numpy: x/0 -> ±inf, 0/0 -> NaN"""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return NAN
+        return math.copysign(math.inf, a)
+    return a / b
+
+
+# 📌 EMA
+class EMA:
+    """EMA как ewm(span=span, adjust=adjust).mean()"""
+
+    def __init__(self, span, adjust=True):
+        self.span = span
+        self.adjust = adjust
+        self.alpha = 2 / (span + 1)
+        self.num = 0.0  # взвешенная сумма значений
+        self.den = 0.0  # сумма весов
+        self.value = NAN
+
+    def update(self, x):
+        decay = 1 - self.alpha
+        if self.adjust:
+            self.num = x + decay * self.num
+            self.den = 1 + decay * self.den
+            self.value = self.num / self.den
+        else:
+            self.value = x if math.isnan(self.value) else self.alpha * x + decay * self.value
+        return self.value
+
+    def snapshot(self):
+        return {'span': self.span, 'adjust': self.adjust, 'num': self.num, 'den': self.den, 'value': self.value}
+
+    def restore(self, state):
+        self.__init__(state['span'], state['adjust'])
+        self.num, self.den, self.value = state['num'], state['den'], state['value']
+        return self
+
+
+# 📌 Скользящее среднее и стандартное отклонение
+class RollingMeanStd:
+    """
+    rolling(window).mean() и rolling(window).std() (ddof=1).
+    Используется добавление/удаление по Уэлфорду — без потери точности на больших ценах.
+    NaN внутри окна даёт NaN, как в pandas.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nan_count = 0
+        self.n = 0        # количество не-NaN значений в окне
+        self.mean_ = 0.0
+        self.m2 = 0.0
+        self.same_run = 0  # длина серии одинаковых значений: как в pandas, даёт ровно std=0
+
+    def _add(self, x):
+        self.n += 1
+        delta = x - self.mean_
+        self.mean_ += delta / self.n
+        self.m2 += delta * (x - self.mean_)
+
+    def _remove(self, x):
+        self.n -= 1
+        if self.n == 0:
+            self.mean_ = 0.0
+            self.m2 = 0.0
+            return
+        delta = x - self.mean_
+        self.mean_ -= delta / self.n
+        self.m2 = max(self.m2 - delta * (x - self.mean_), 0.0)
+
+    def update(self, x):
+        self.same_run = self.same_run + 1 if self.values and self.values[-1] == x else 1
+        self.values.append(x)
+        if math.isnan(x):
+            self.nan_count += 1
+        else:
+            self._add(x)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if math.isnan(old):
+                self.nan_count -= 1
+            else:
+                self._remove(old)
+        return self.mean
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window and self.nan_count == 0
+
+    @property
+    def mean(self):
+        return self.mean_ if self.ready else NAN
+
+    @property
+    def std(self):
+        if not self.ready or self.window < 2:
+            return NAN
+        if self.same_run >= self.window:
+            return 0.0
+        return math.sqrt(self.m2 / (self.n - 1))
+
+    def snapshot(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    def restore(self, state):
+        # Пересчёт по сохранённому окну даёт то же состояние и защищает от накопленной ошибки
+        self.__init__(state['window'])
+        for x in state['values']:
+            self.update(x)
+        return self
+
+
+# 📌 Полосы Боллинджера
+class Bollinger:
+    """(MA, Upper, Lower) как в IndicatorEngine.bollinger"""
+
+    def __init__(self, window=20, num_std=2):
+        self.num_std = num_std
+        self.stats = RollingMeanStd(window)
+
+    def update(self, x):
+        self.stats.update(x)
+        ma, std = self.stats.mean, self.stats.std
+        return ma, ma + self.num_std * std, ma - self.num_std * std
+
+    def snapshot(self):
+        return {'num_std': self.num_std, 'stats': self.stats.snapshot()}
+
+    def restore(self, state):
+        self.num_std = state['num_std']
+        self.stats = RollingMeanStd(1).restore(state['stats'])
+        return self
+
+
+# 📌 Скользящие минимум и максимум
+class RollingMinMax:
+    """rolling(window).min() / .max() на монотонных очередях"""
+
+    def __init__(self, window):
+        self.window = window
+        self.i = -1                # индекс последнего значения
+        self.last_nan = -window    # индекс последнего NaN
+        self.mins = deque()        # (индекс, значение), значения возрастают
+        self.maxs = deque()        # (индекс, значение), значения убывают
+
+    def update(self, x):
+        self.i += 1
+        if math.isnan(x):
+            self.last_nan = self.i
+        else:
+            while self.mins and self.mins[-1][1] >= x:
+                self.mins.pop()
+            self.mins.append((self.i, x))
+            while self.maxs and self.maxs[-1][1] <= x:
+                self.maxs.pop()
+            self.maxs.append((self.i, x))
+        start = self.i - self.window + 1
+        while self.mins and self.mins[0][0] < start:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] < start:
+            self.maxs.popleft()
+        return self.min, self.max
+
+    @property
+    def ready(self):
+        return self.i + 1 >= self.window and self.last_nan <= self.i - self.window
+
+    @property
+    def min(self):
+        return self.mins[0][1] if self.ready else NAN
+
+    @property
+    def max(self):
+        return self.maxs[0][1] if self.ready else NAN
+
+    def snapshot(self):
+        return {
+            'window': self.window, 'i': self.i, 'last_nan': self.last_nan,
+            'mins': [list(p) for p in self.mins], 'maxs': [list(p) for p in self.maxs],
+        }
+
+    def restore(self, state):
+        self.__init__(state['window'])
+        self.i, self.last_nan = state['i'], state['last_nan']
+        self.mins = deque(tuple(p) for p in state['mins'])
+        self.maxs = deque(tuple(p) for p in state['maxs'])
+        return self
+
+
+# 📌 RSI
+class RSI:
+    """
+    RSI по последним ценам закрытия.
+    wilder=False — как compute_rsi (простые средние за period),
+    wilder=True — классическое сглаживание Уайлдера, затравка — SMA первых period изменений.
+    """
+
+    def __init__(self, period=14, wilder=False):
+        self.period = period
+        self.wilder = wilder
+        self.prev = NAN
+        self.gains = RollingMeanStd(period)
+        self.losses = RollingMeanStd(period)
+        # Счётчики ненулевых значений в окне: при нуле среднее ровно 0, без хвостов округления
+        self.gain_nonzero = 0
+        self.loss_nonzero = 0
+        self.count = 0
+        self.seed_gain = 0.0
+        self.seed_loss = 0.0
+        self.avg_gain = NAN
+        self.avg_loss = NAN
+        self.value = NAN
+
+    def update(self, close):
+        delta = close - self.prev if not math.isnan(self.prev) else NAN
+        self.prev = close
+        gain = max(delta, 0.0) if not math.isnan(delta) else NAN
+        loss = max(-delta, 0.0) if not math.isnan(delta) else NAN
+
+        if self.wilder:
+            self._update_wilder(gain, loss)
+        else:
+            self._update_sma(gain, loss)
+
+        rs = _divide(self.avg_gain, self.avg_loss)
+        self.value = 100 - 100 / (1 + rs) if not math.isnan(rs) else NAN
+        return self.value
+
+    def _update_sma(self, gain, loss):
+        self.gain_nonzero += self._slide(self.gains, gain)
+        self.loss_nonzero += self._slide(self.losses, loss)
+        self.avg_gain = self.gains.mean if self.gain_nonzero else (0.0 if self.gains.ready else NAN)
+        self.avg_loss = self.losses.mean if self.loss_nonzero else (0.0 if self.losses.ready else NAN)
+
+    def _slide(self, stats, x):
+        """Сдвигает окно и возвращает изменение числа ненулевых значений в нём"""
+        change = 0
+        if len(stats.values) == self.period and stats.values[0] != 0:
+            change -= 1
+        stats.update(x)
+        if x != 0:
+            change += 1
+        return change
+
+    def _update_wilder(self, gain, loss):
+        if math.isnan(gain):
+            return
+        self.count += 1
+        n = self.period
+        if self.count <= n:
+            # Затравка: копим суммы первых period изменений
+            self.seed_gain += gain
+            self.seed_loss += loss
+            if self.count == n:
+                self.avg_gain = self.seed_gain / n
+                self.avg_loss = self.seed_loss / n
+        else:
+            self.avg_gain = (self.avg_gain * (n - 1) + gain) / n
+            self.avg_loss = (self.avg_loss * (n - 1) + loss) / n
+
+    def snapshot(self):
+        return {
+            'period': self.period, 'wilder': self.wilder, 'prev': self.prev, 'count': self.count,
+            'seed_gain': self.seed_gain, 'seed_loss': self.seed_loss,
+            'avg_gain': self.avg_gain, 'avg_loss': self.avg_loss, 'value': self.value,
+            'gains': self.gains.snapshot(), 'losses': self.losses.snapshot(),
+        }
+
+    def restore(self, state):
+        self.__init__(state['period'], state['wilder'])
+        self.prev, self.count = state['prev'], state['count']
+        self.seed_gain, self.seed_loss = state['seed_gain'], state['seed_loss']
+        self.avg_gain, self.avg_loss, self.value = state['avg_gain'], state['avg_loss'], state['value']
+        self.gains.restore(state['gains'])
+        self.losses.restore(state['losses'])
+        self.gain_nonzero = sum(1 for x in self.gains.values if x != 0)
+        self.loss_nonzero = sum(1 for x in self.losses.values if x != 0)
+        return self
+
+
+# 📌 Stochastic RSI
+class StochasticRSI:
+    """(K, D) как indicators.stochastic_rsi"""
+
+    def __init__(self, period=14, smoothK=3, smoothD=3):
+        self.rsi = RSI(period)
+        self.range = RollingMinMax(period)
+        self.k = RollingMeanStd(smoothK)
+        self.d = RollingMeanStd(smoothD)
+
+    def update(self, close):
+        rsi = self.rsi.update(close)
+        low, high = self.range.update(rsi)
+        stoch = _divide(rsi - low, high - low)
+        k = self.k.update(stoch)
+        d = self.d.update(k)
+        return k, d
+
+    def snapshot(self):
+        return {
+            'rsi': self.rsi.snapshot(), 'range': self.range.snapshot(),
+            'k': self.k.snapshot(), 'd': self.d.snapshot(),
+        }
+
+    def restore(self, state):
+        self.rsi = RSI().restore(state['rsi'])
+        self.range = RollingMinMax(1).restore(state['range'])
+        self.k = RollingMeanStd(1).restore(state['k'])
+        self.d = RollingMeanStd(1).restore(state['d'])
+        return self
+
+
+# 📌 VWAP
+class VWAP:
+    """
+    VWAP как IndicatorEngine.vwap(window): window=None — накопительный
+    cumsum(close * volume) / cumsum(volume), иначе — по последним window барам
+    (стратегии берут vwap_window=100). Суммы окна ведутся скользящими и раз в window
+    обновлений пересчитываются по самому окну, чтобы не копить ошибку округления.
+    """
+
+    def __init__(self, window=None):
+        self.window = window
+        self.pairs = deque()  # (price * volume, volume) в окне
+        self.pv = 0.0
+        self.volume = 0.0
+        self.since_resum = 0
+        self.value = NAN
+
+    def update(self, price, volume):
+        return self._push(price * volume, volume)
+
+    def _push(self, pv, volume):
+        self.pv += pv
+        self.volume += volume
+        if self.window is not None:
+            self.pairs.append((pv, volume))
+            if len(self.pairs) > self.window:
+                old_pv, old_volume = self.pairs.popleft()
+                self.pv -= old_pv
+                self.volume -= old_volume
+            self.since_resum += 1
+            if self.since_resum >= self.window:
+                self.pv = math.fsum(p for p, _ in self.pairs)
+                self.volume = math.fsum(q for _, q in self.pairs)
+                self.since_resum = 0
+            if len(self.pairs) < self.window:
+                self.value = NAN  # окно не заполнено — как rolling(window).sum()
+                return self.value
+        self.value = _divide(self.pv, self.volume)
+        return self.value
+
+    def snapshot(self):
+        if self.window is not None:
+            return {'window': self.window, 'pairs': [list(p) for p in self.pairs]}
+        return {'window': None, 'pv': self.pv, 'volume': self.volume, 'value': self.value}
+
+    def restore(self, state):
+        self.__init__(state.get('window'))
+        if self.window is None:
+            self.pv, self.volume, self.value = state['pv'], state['volume'], state['value']
+        else:
+            # Как и RollingMeanStd, пересчитываем по сохранённому окну
+            for pv, volume in state['pairs']:
+                self._push(pv, volume)
+        return self
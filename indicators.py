@@ -15,3 +15,95 @@ def compute_rsi(series, period=None, params=None):
     rs = avg_gain / avg_loss
     rsi = 100 - (100 / (1 + rs))
     return rsi
+
+# 📌 Stochastic RSI
+def stochastic_rsi(close, period=14, smoothK=3, smoothD=3, rsi=None):
+    if rsi is None:
+        rsi = compute_rsi(close, period)
+    min_rsi = rsi.rolling(window=period).min()
+    max_rsi = rsi.rolling(window=period).max()
+    stoch_rsi = (rsi - min_rsi) / (max_rsi - min_rsi)
+    k = stoch_rsi.rolling(window=smoothK).mean()
+    d = k.rolling(window=smoothD).mean()
+    return k, d
+
+
+class IndicatorEngine:
+    """
+    Считает индикаторы по одному набору свечей и запоминает результат.
+    Ключ кэша — (имя, параметры): RSI(14), MACD или полосы Боллинджера
+    считаются один раз на df, сколько бы стратегий их ни запросило.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._cache = {}
+
+    def _get(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def rsi(self, period=14, column='close'):
+        return self._get(('rsi', column, period), lambda: compute_rsi(self.df[column], period))
+
+    def ema(self, span, column='close'):
+        return self._get(('ema', column, span), lambda: self.df[column].ewm(span=span).mean())
+
+    def sma(self, window, column='close'):
+        return self._get(('sma', column, window), lambda: self.df[column].rolling(window=window).mean())
+
+    def std(self, window, column='close'):
+        return self._get(('std', column, window), lambda: self.df[column].rolling(window=window).std())
+
+    def bollinger(self, window=20, num_std=2):
+        """Возвращает (средняя, верхняя, нижняя)"""
+        def compute():
+            ma = self.sma(window)
+            std = self.std(window)
+            return ma, ma + num_std * std, ma - num_std * std
+        return self._get(('bollinger', window, num_std), compute)
+
+    def macd(self, fast=12, slow=26, signal=9):
+        """Возвращает (MACD, сигнальная линия)"""
+        def compute():
+            macd = self.ema(fast) - self.ema(slow)
+            return macd, macd.ewm(span=signal).mean()
+        return self._get(('macd', fast, slow, signal), compute)
+
+    def vwap(self, window=None):
+        """VWAP: накопительный с начала df или по последним window барам"""
+        def compute():
+            q = self.df['volume']
+            p = self.df['close']
+            if window is None:
+                return (p * q).cumsum() / q.cumsum()
+            return (p * q).rolling(window=window).sum() / q.rolling(window=window).sum()
+        return self._get(('vwap', window), compute)
+
+    def stoch_rsi(self, period=14, smoothK=3, smoothD=3):
+        """Возвращает (K, D)"""
+        return self._get(
+            ('stoch_rsi', period, smoothK, smoothD),
+            lambda: stochastic_rsi(self.df['close'], period, smoothK, smoothD, rsi=self.rsi(period)),
+        )
+
+    def range_pct(self):
+        """Размах свечи (high - low) в процентах от close"""
+        return self._get(
+            ('range_pct',),
+            lambda: (self.df['high'] - self.df['low']) / self.df['close'] * 100,
+        )
+
+    def body(self):
+        """Тело свечи |close - open|"""
+        return self._get(('body',), lambda: (self.df['close'] - self.df['open']).abs())
+
+    def rolling_mean(self, name, window):
+        """Скользящее среднее по колонке df или по уже посчитанному ряду (range_pct, body)"""
+        if name not in ('range_pct', 'body'):
+            return self.sma(window, column=name)
+        return self._get(
+            ('rolling_mean', name, window),
+            lambda: getattr(self, name)().rolling(window=window).mean(),
+        )
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Поля свечи Binance в порядке client.get_klines (последнее, 'ignore', не храним)
+FIELDS = (
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64),
+    ('quote_asset_volume', np.float64),
+    ('number_of_trades', np.int64),
+    ('taker_buy_base', np.float64),
+    ('taker_buy_quote', np.float64),
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+
+
+class KlineBuffer:
+    """
+    Кольцевой буфер свечей одного символа фиксированной ёмкости:
+    по одному непрерывному массиву float64/int64 на поле.
+    Каждый бар пишется дважды — в ячейку i и i + capacity, поэтому последние n баров
+    всегда лежат одним срезом и отдаются без копирования (view / to_frame(copy=False)).
+    Память не растёт: capacity баров × 11 полей × 8 байт × 2.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._arrays = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in FIELDS}
+        self._start = 0  # ячейка самого старого бара, 0 <= _start < capacity
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def _write(self, slot, bar):
+        for i, (name, dtype) in enumerate(FIELDS):
+            value = dtype(float(bar[i])) if dtype is np.int64 else float(bar[i])
+            array = self._arrays[name]
+            array[slot] = value
+            array[slot + self.capacity] = value
+
+    def append(self, bar):
+        """Добавляет бар в формате client.get_klines; самый старый вытесняется"""
+        if self._len < self.capacity:
+            slot = (self._start + self._len) % self.capacity
+            self._len += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._write(slot, bar)
+
+    def update_last(self, bar):
+        """Перезаписывает последний (ещё не закрытый) бар"""
+        self._write((self._start + self._len - 1) % self.capacity, bar)
+
+    def extend(self, bars):
+        """Пачка баров разбирается в массивы сразу по столбцам, без промежуточного DataFrame"""
+        if not bars:
+            return
+        bars = bars[-self.capacity:]
+        count = len(bars)
+        columns = list(zip(*bars))
+        slots = (self._start + self._len + np.arange(count)) % self.capacity
+        for i, (name, dtype) in enumerate(FIELDS):
+            values = np.array(columns[i], dtype=np.float64).astype(dtype)
+            array = self._arrays[name]
+            array[slots] = values
+            array[slots + self.capacity] = values
+        overflow = max(0, self._len + count - self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+        self._len = min(self.capacity, self._len + count)
+
+    def last_open_time(self):
+        return int(self._arrays['timestamp'][self._start + self._len - 1]) if self._len else None
+
+    def view(self, field, n=None):
+        """Последние n значений поля — срез без копирования (только для чтения)"""
+        n = self._len if n is None else min(n, self._len)
+        end = self._start + self._len
+        view = self._arrays[field][end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def to_frame(self, n=None, copy=True):
+        """
+        DataFrame последних n баров с теми же столбцами, что у klines_to_frame.
+        copy=False — столбцы смотрят прямо в буфер: быстро, но только пока буфер не меняют.
+        """
+        columns = {name: self.view(name, n) for name in FIELD_NAMES}
+        if copy:
+            columns = {name: values.copy() for name, values in columns.items()}
+        return pd.DataFrame(columns, copy=False)
+
+    def to_klines(self, n=None):
+        """Последние n баров списками в формате client.get_klines (числа вместо строк)"""
+        columns = [self.view(name, n).tolist() for name in FIELD_NAMES]
+        return [list(bar) + ['0'] for bar in zip(*columns)]
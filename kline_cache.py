@@ -0,0 +1,225 @@
+import threading
+import pandas as pd
+from kline_buffer import KlineBuffer
+
+# Длительность интервалов Binance в миллисекундах
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '2h': 2 * 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '6h': 6 * 60 * 60_000,
+    '8h': 8 * 60 * 60_000,
+    '12h': 12 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+    '3d': 3 * 24 * 60 * 60_000,
+    '1w': 7 * 24 * 60 * 60_000,
+}
+
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base', 'taker_buy_quote', 'ignore'
+]
+
+
+def klines_to_frame(klines):
+    """Сырые свечи Binance -> DataFrame с числовыми OHLCV"""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df['high'] = df['high'].astype(float)
+    df['low'] = df['low'].astype(float)
+    df['open'] = df['open'].astype(float)
+    df['close'] = df['close'].astype(float)
+    df['volume'] = df['volume'].astype(float)
+    return df
+
+
+class KlineCache:
+    """
+    Хранит последние `size` свечей по каждому символу в кольцевых буферах NumPy.
+    При обновлении докачивает только свечи после последней закрытой,
+    при обнаружении разрыва — перезаливает окно целиком.
+    Новые свечи разбираются сразу в массивы, DataFrame строится из готовых столбцов.
+    С store (KlineStore) пустой буфер сначала прогревается с диска, а закрытые свечи
+    дописываются на диск — после перезапуска докачиваются только пропущенные бары.
+    С диска берётся только непрерывный хвост истории, разрывы в окно не попадают.
+    С timeframes (MultiTimeframe) все новые свечи передаются и туда — старшие таймфреймы
+    собираются из того же потока без лишних запросов.
+    """
+
+    def __init__(self, client, interval, size=100, store=None, timeframes=None):
+        self.client = client
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.size = size
+        self.store = store
+        self.timeframes = timeframes
+        self._buffers = {}  # {'BTCUSDT': KlineBuffer}
+        self._lock = threading.Lock()
+
+    def _buffer(self, symbol):
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            buffer = self._buffers[symbol] = KlineBuffer(self.size)
+        return buffer
+
+    def update(self, symbol, fetch=True):
+        """
+        Доводит буфер символа до актуального состояния.
+        С fetch=False только прогревает пустой буфер, без лишних обращений к REST.
+        """
+        with self._lock:
+            last_open = self._buffer(symbol).last_open_time()
+
+        if last_open is None and self.store is not None:
+            last_open = self._warm(symbol)
+        if last_open is None:
+            self.refill(symbol)
+            return
+        if not fetch:
+            return
+
+        # Последняя свеча в кэше могла быть ещё не закрыта — запрашиваем начиная с неё
+        new_bars = self.client.get_klines(
+            symbol=symbol, interval=self.interval, startTime=last_open, limit=self.size
+        )
+        if not new_bars:
+            return
+
+        # Пропустили больше, чем помещается в окно, или пришли не те свечи — разрыв
+        if len(new_bars) >= self.size or new_bars[0][0] != last_open or not self._is_contiguous(new_bars):
+            self.refill(symbol)
+            return
+
+        with self._lock:
+            buffer = self._buffer(symbol)
+            if buffer.last_open_time() != last_open:
+                return  # пока качали, буфер обновил поток — его данные не старее
+            buffer.update_last(new_bars[0])
+            buffer.extend(new_bars[1:])
+        self._persist(symbol)
+        if self.timeframes is not None:
+            self.timeframes.add_many(symbol, new_bars)
+
+    def frame(self, symbol, n=None, fetch=True):
+        """DataFrame последних n свечей (копия под блокировкой — поток может дописывать буфер)"""
+        self.update(symbol, fetch)
+        with self._lock:
+            return self._buffer(symbol).to_frame(n)
+
+    def get(self, symbol, fetch=True):
+        """
+        Актуальные свечи списками в формате client.get_klines (для совместимости).
+        С fetch=False отдаёт кэш без обращения к REST (если он уже прогрет).
+        """
+        self.update(symbol, fetch)
+        with self._lock:
+            return self._buffer(symbol).to_klines()
+
+    def refill(self, symbol):
+        """Полностью перезагружает окно свечей по символу"""
+        bars = self.client.get_klines(symbol=symbol, interval=self.interval, limit=self.size)
+        with self._lock:
+            buffer = self._buffer(symbol)
+            buffer.clear()
+            buffer.extend(bars)
+        self._persist(symbol)
+        if self.timeframes is not None:
+            self.timeframes.add_many(symbol, bars)
+
+    def apply_bar(self, symbol, bar):
+        """
+        Применяет свечу из WebSocket-потока: обновляет текущую или добавляет следующую.
+        При разрыве сбрасывает символ, чтобы следующий get() перезалил окно.
+        """
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            last_open = buffer.last_open_time() if buffer is not None else None
+            if last_open is None:
+                return False  # кэш ещё не прогрет через REST
+            if bar[0] == last_open:
+                buffer.update_last(bar)
+            elif bar[0] == last_open + self.interval_ms:
+                buffer.append(bar)
+            elif bar[0] < last_open:
+                return False  # запоздавшее сообщение
+            else:
+                buffer.clear()
+                return False
+        if bar[0] != last_open:
+            self._persist(symbol)  # предыдущая свеча закрылась — сохраняем её
+        if self.timeframes is not None:
+            self.timeframes.add(symbol, bar)
+        return True
+
+    def _warm(self, symbol):
+        """Загружает последние свечи с диска; возвращает время открытия последней или None"""
+        count = self.size
+        if self.timeframes is not None:
+            # Старшим таймфреймам с диска берём историю длиннее окна кэша
+            count = max(count, self.timeframes.history_bars())
+        bars = self.store.klines(symbol, self.interval, count)
+        # На диске могут быть разрывы (простой бота) — берём только непрерывный хвост,
+        # пропущенное после него докачает update()
+        bars = bars[self._gap_end(bars):]
+        if not bars:
+            return None
+        with self._lock:
+            buffer = self._buffer(symbol)
+            warmed = not len(buffer)
+            if warmed:
+                buffer.extend(bars)
+            last_open = buffer.last_open_time()
+        if warmed and self.timeframes is not None:
+            self.timeframes.add_many(symbol, bars)
+        return last_open
+
+    def _persist(self, symbol):
+        """Дописывает на диск закрытые свечи, которых там ещё нет (последняя может быть не закрыта)"""
+        if self.store is None:
+            return
+        saved = self.store.last_open_time(symbol, self.interval)
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is None or len(buffer) < 2:
+                return
+            timestamps = buffer.view('timestamp')
+            new = len(timestamps) if saved is None else int((timestamps > saved).sum())
+            if new < 2:
+                return
+            bars = buffer.to_klines(new)[:-1]
+        try:
+            self.store.append(symbol, self.interval, bars)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить свечи {symbol} на диск: {e}")
+
+    def symbols(self):
+        """Символы, по которым в кэше уже есть свечи"""
+        with self._lock:
+            return [symbol for symbol, buffer in self._buffers.items() if len(buffer)]
+
+    def invalidate(self, symbol=None):
+        """Сбрасывает кэш по символу (или целиком)"""
+        with self._lock:
+            if symbol is None:
+                self._buffers.clear()
+            else:
+                self._buffers.pop(symbol, None)
+
+    def _gap_end(self, bars):
+        """Индекс первой свечи после последнего разрыва (0 — разрывов нет)"""
+        for i in range(len(bars) - 1, 0, -1):
+            if bars[i][0] - bars[i - 1][0] != self.interval_ms:
+                return i
+        return 0
+
+    def _is_contiguous(self, bars):
+        """Проверяет, что между свечами нет пропусков"""
+        return all(
+            bars[i][0] - bars[i - 1][0] == self.interval_ms
+            for i in range(1, len(bars))
+        )
@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from kline_buffer import FIELDS, FIELD_NAMES
+from kline_cache import INTERVAL_MS
+
+SEGMENT_BARS = 100_000  # баров в сегменте: ~1 год 5-минуток; 11 полей × 800 КБ = 8.8 МБ на сегмент
+INDEX_INTERVAL = 60.0   # index.json пишется не чаще раза в столько секунд (и при новом сегменте)
+
+
+class KlineStore:
+    """
+    Столбцовое хранилище свечей на диске: root/SYMBOL/INTERVAL/.
+    История режется на сегменты по SEGMENT_BARS баров; сегмент — каталог с отдельным
+    .npy на каждое поле, файлы заранее размечены под весь сегмент и открываются через memmap.
+    index.json хранит для каждого сегмента число баров и первое/последнее время открытия —
+    по нему ищутся сегменты для диапазона, внутри сегмента — searchsorted по timestamp.
+    Дописываются только бары новее последнего сохранённого (последний можно перезаписать).
+    Разрывы (простой бота) пишутся в тот же сегмент и отмечаются в индексе: 'gaps' сегмента —
+    [позиция, время открытия] первого бара после каждого разрыва.
+    index.json сохраняется при создании сегмента и не чаще раза в index_interval секунд (и во flush()).
+    Неразмеченные ячейки файлов — нули, поэтому хвост последнего сегмента, дописанный после
+    последнего сохранения индекса, при открытии восстанавливается по файлу timestamp.
+    Чтение одного сегмента не копирует данные в память.
+    """
+
+    def __init__(self, root, segment_bars=SEGMENT_BARS, index_interval=INDEX_INTERVAL):
+        self.root = root
+        self.segment_bars = segment_bars
+        self.index_interval = index_interval
+        self._indexes = {}
+        self._saved_at = {}  # {(символ, интервал): время последней записи index.json}
+        self._dirty = set()  # индексы, изменённые после записи
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol, interval):
+        return os.path.join(self.root, symbol, interval)
+
+    def _index(self, symbol, interval):
+        key = (symbol, interval)
+        index = self._indexes.get(key)
+        if index is None:
+            path = os.path.join(self._dir(symbol, interval), 'index.json')
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except FileNotFoundError:
+                index = {'segments': []}
+            self._recover(symbol, interval, index)
+            self._indexes[key] = index
+            self._saved_at[key] = time.monotonic()
+        return index
+
+    def _recover(self, symbol, interval, index):
+        """Учитывает бары последнего сегмента, дописанные после последнего сохранения индекса"""
+        segments = index['segments']
+        if not segments:
+            return
+        segment = segments[-1]
+        try:
+            timestamps = self._open_segment(symbol, interval, segment['name'], fields=('timestamp',))['timestamp']
+        except FileNotFoundError:
+            return
+        tail = timestamps[segment['count']:]
+        unwritten = np.flatnonzero(tail == 0)
+        written = int(unwritten[0]) if len(unwritten) else len(tail)
+        if written:
+            prev_end = segments[-2]['end'] if len(segments) > 1 and not segment['count'] else None
+            self._extend_segment(segment, np.array(tail[:written]), INTERVAL_MS[interval], prev_end)
+
+    @staticmethod
+    def _extend_segment(segment, timestamps, interval_ms, prev_end=None):
+        """Дописывает в запись индекса бары с временами открытия timestamps и отмечает разрывы"""
+        gaps = segment.setdefault('gaps', [])
+        pos = segment['count']
+        if segment['count']:
+            prev_end = segment['end']
+        else:
+            segment['start'] = int(timestamps[0])
+        if prev_end is not None and timestamps[0] != prev_end + interval_ms:
+            gaps.append([pos, int(timestamps[0])])
+        for i in np.flatnonzero(np.diff(timestamps) != interval_ms) + 1:
+            gaps.append([pos + int(i), int(timestamps[i])])
+        segment['count'] += len(timestamps)
+        segment['end'] = int(timestamps[-1])
+
+    def _save_index(self, symbol, interval, index):
+        path = os.path.join(self._dir(symbol, interval), 'index.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+        self._saved_at[(symbol, interval)] = time.monotonic()
+        self._dirty.discard((symbol, interval))
+
+    def flush(self):
+        """Записывает изменённые индексы (при остановке бота)"""
+        with self._lock:
+            for symbol, interval in list(self._dirty):
+                self._save_index(symbol, interval, self._indexes[(symbol, interval)])
+
+    def _open_segment(self, symbol, interval, name, mode='r', fields=FIELD_NAMES):
+        seg_dir = os.path.join(self._dir(symbol, interval), name)
+        return {field: np.load(os.path.join(seg_dir, f'{field}.npy'), mmap_mode=mode) for field in fields}
+
+    def _new_segment(self, symbol, interval, index):
+        name = f"{len(index['segments']):06d}"
+        seg_dir = os.path.join(self._dir(symbol, interval), name)
+        os.makedirs(seg_dir, exist_ok=True)
+        for field, dtype in FIELDS:
+            array = np.lib.format.open_memmap(
+                os.path.join(seg_dir, f'{field}.npy'), mode='w+', dtype=dtype, shape=(self.segment_bars,)
+            )
+            del array  # файл размечен; данные пишутся при append
+        segment = {'name': name, 'count': 0, 'start': None, 'end': None, 'gaps': []}
+        index['segments'].append(segment)
+        # Сегмент должен попасть в индекс до данных — иначе восстановление его не найдёт
+        self._save_index(symbol, interval, index)
+        return segment
+
+    def symbols(self):
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+    def last_open_time(self, symbol, interval):
+        with self._lock:
+            segments = self._index(symbol, interval)['segments']
+            return segments[-1]['end'] if segments and segments[-1]['count'] else None
+
+    def intervals(self, symbol):
+        path = os.path.join(self.root, symbol)
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    def coverage(self, symbol, interval):
+        """(баров, первое время открытия, последнее, сегментов)"""
+        with self._lock:
+            segments = [s for s in self._index(symbol, interval)['segments'] if s['count']]
+        if not segments:
+            return 0, None, None, 0
+        return sum(s['count'] for s in segments), segments[0]['start'], segments[-1]['end'], len(segments)
+
+    def append(self, symbol, interval, bars):
+        """
+        Дописывает бары в формате client.get_klines (по возрастанию времени).
+        Бары не новее сохранённого пропускаются, бар с тем же временем открытия перезаписывает последний.
+        Бар не вплотную к предыдущему (докачали окно после простоя) отмечается в индексе как разрыв.
+        Возвращает количество записанных баров.
+        """
+        if not bars:
+            return 0
+        interval_ms = INTERVAL_MS[interval]
+        key = (symbol, interval)
+        with self._lock:
+            index = self._index(symbol, interval)
+            segments = index['segments']
+            last = segments[-1]['end'] if segments and segments[-1]['count'] else None
+            if last is not None:
+                bars = [b for b in bars if int(b[0]) >= last]
+            if not bars:
+                return 0
+            os.makedirs(self._dir(symbol, interval), exist_ok=True)
+
+            columns = list(zip(*bars))
+            values = {name: np.array(columns[i], dtype=np.float64).astype(dtype) for i, (name, dtype) in enumerate(FIELDS)}
+            timestamps = values['timestamp']
+
+            pos = 0
+            if last is not None and timestamps[0] == last:
+                # Последний сохранённый бар был незакрытым — обновляем его на месте
+                segment = segments[-1]
+                arrays = self._open_segment(symbol, interval, segment['name'], mode='r+')
+                for name in FIELD_NAMES:
+                    arrays[name][segment['count'] - 1] = values[name][0]
+                    arrays[name].flush()
+                pos = 1
+
+            while pos < len(timestamps):
+                segment = segments[-1] if segments and segments[-1]['count'] < self.segment_bars else None
+                prev_end = segments[-1]['end'] if segments else None
+                if segment is None:
+                    segment = self._new_segment(symbol, interval, index)
+                take = min(len(timestamps) - pos, self.segment_bars - segment['count'])
+                arrays = self._open_segment(symbol, interval, segment['name'], mode='r+')
+                for name in FIELD_NAMES:
+                    arrays[name][segment['count']:segment['count'] + take] = values[name][pos:pos + take]
+                    arrays[name].flush()
+                self._extend_segment(segment, timestamps[pos:pos + take], interval_ms, prev_end)
+                pos += take
+
+            # Индекс — после данных и не на каждую запись: потерянный при сбое хвост восстановит _recover
+            self._dirty.add(key)
+            if time.monotonic() - self._saved_at.get(key, 0.0) >= self.index_interval:
+                self._save_index(symbol, interval, index)
+            return len(timestamps)
+
+    def gaps(self, symbol, interval):
+        """Времена открытия первых баров после разрывов истории"""
+        with self._lock:
+            return [t for s in self._index(symbol, interval)['segments'] for _, t in s.get('gaps', ())]
+
+    def iter_segments(self, symbol, interval, start=None, end=None, fields=FIELD_NAMES):
+        """
+        Отдаёт столбцы по сегментам, пересекающим [start, end] (мс времени открытия),
+        как memmap-срезы без копирования.
+        """
+        with self._lock:
+            segments = [dict(s) for s in self._index(symbol, interval)['segments'] if s['count']]
+        for segment in segments:
+            if (start is not None and segment['end'] < start) or (end is not None and segment['start'] > end):
+                continue
+            arrays = self._open_segment(symbol, interval, segment['name'], fields=set(fields) | {'timestamp'})
+            timestamps = arrays['timestamp'][:segment['count']]
+            lo = int(np.searchsorted(timestamps, start, 'left')) if start is not None else 0
+            hi = int(np.searchsorted(timestamps, end, 'right')) if end is not None else segment['count']
+            if lo < hi:
+                yield {field: arrays[field][lo:hi] for field in fields}
+
+    def read(self, symbol, interval, start=None, end=None, fields=FIELD_NAMES):
+        """Столбцы за диапазон; из одного сегмента — без копирования, из нескольких — склеиваются"""
+        parts = list(self.iter_segments(symbol, interval, start, end, fields))
+        if not parts:
+            return {field: np.empty(0, dtype=dict(FIELDS)[field]) for field in fields}
+        if len(parts) == 1:
+            return parts[0]
+        return {field: np.concatenate([p[field] for p in parts]) for field in fields}
+
+    def tail_start(self, symbol, interval, last):
+        """Время открытия бара, с которого начинаются последние last баров"""
+        with self._lock:
+            segments = [dict(s) for s in self._index(symbol, interval)['segments'] if s['count']]
+        for segment in reversed(segments):
+            if segment['count'] >= last:
+                timestamps = self._open_segment(symbol, interval, segment['name'], fields=('timestamp',))['timestamp']
+                return int(timestamps[segment['count'] - last])
+            last -= segment['count']
+        return segments[0]['start'] if segments else None
+
+    def frame(self, symbol, interval, start=None, end=None, last=None):
+        """DataFrame со столбцами klines_to_frame; last — только последние N баров"""
+        if last is not None:
+            start = self.tail_start(symbol, interval, last)
+            if start is None:
+                return pd.DataFrame({field: np.empty(0, dtype=dtype) for field, dtype in FIELDS})
+        return pd.DataFrame(self.read(symbol, interval, start, end), copy=False)
+
+    def klines(self, symbol, interval, last):
+        """Последние N баров списками в формате client.get_klines — для прогрева KlineCache"""
+        df = self.frame(symbol, interval, last=last)
+        columns = [df[name].tolist() for name in FIELD_NAMES]
+        return [list(bar) + ['0'] for bar in zip(*columns)]
+
+
+def backfill(store, client, symbol, interval, days, limit=1000):
+    """Докачивает историю символа с последнего сохранённого бара (или за days дней) до текущего момента"""
+    interval_ms = INTERVAL_MS[interval]
+    now_ms = int(time.time() * 1000)
+    last = store.last_open_time(symbol, interval)
+    start = last if last is not None else now_ms - days * 24 * 60 * 60 * 1000
+    total = 0
+    while start < now_ms:
+        bars = client.get_klines(symbol=symbol, interval=interval, startTime=start, limit=limit)
+        if not bars:
+            break
+        # Незакрытый последний бар не сохраняем — его время закрытия ещё впереди
+        closed = [b for b in bars if int(b[6]) < now_ms]
+        total += store.append(symbol, interval, closed)
+        if len(bars) < limit:
+            break
+        start = int(bars[-1][0]) + interval_ms
+    return total
+
+
+if __name__ == '__main__':
+    # python kline_store.py backfill --root klines --interval 5m --days 365 DOGEUSDT XRPUSDT
+    # python kline_store.py info --root klines
+    parser = argparse.ArgumentParser(description='Локальная история свечей')
+    parser.add_argument('command', choices=['backfill', 'info'])
+    parser.add_argument('symbols', nargs='*')
+    parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'klines'))
+    parser.add_argument('--interval', default='5m')
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    store = KlineStore(args.root)
+    if args.command == 'backfill':
+        from binance.client import Client
+        from rest_client import RateLimitedClient
+        # Свечи — публичные данные, ключи не нужны
+        client = RateLimitedClient(Client())
+        for symbol in args.symbols:
+            count = backfill(store, client, symbol, args.interval, args.days)
+            print(f"📥 {symbol} {args.interval}: +{count} баров")
+    else:
+        for symbol in args.symbols or store.symbols():
+            for interval in store.intervals(symbol):
+                count, first, last, segments = store.coverage(symbol, interval)
+                if count:
+                    first = pd.to_datetime(first, unit='ms')
+                    last = pd.to_datetime(last, unit='ms')
+                    gaps = len(store.gaps(symbol, interval))
+                    print(f"{symbol} {interval}: {count} баров, {first} — {last}, сегментов: {segments}, разрывов: {gaps}")
@@ -1,44 +1,76 @@
 from binance.client import Client
-import pandas as pd
 import numpy as np
 import time
-import requests
 import os
-import json
 import threading
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from zoneinfo import ZoneInfo
-from utils import can_trade, optimize_parameters, get_strategy_params
+from utils import can_trade, get_strategy_params
+from kline_cache import KlineCache
+from kline_store import KlineStore
+from timeframes import MultiTimeframe
+from indicators import IndicatorEngine
+from batch_signals import (
+    BUY,
+    BatchIndicators,
+    stack_frames,
+    signal_matrix,
+    consensus as batch_consensus,
+    adaptive_timeouts as batch_timeouts,
+    volatility as batch_volatility,
+    volume_sufficient as batch_volume_sufficient
+)
+from streaming import MarketStream
+from optimizer import start_background_optimizer
+from symbol_filters import SymbolFilterStore
+from account_state import AccountState, new_order_id
+from trade_journal import TradeJournal
+from trade_stats import TradeStats, winrate
+from notifier import TelegramNotifier
+from rest_client import RateLimitedClient, LazyClient, METHOD_WEIGHT, ALL_SYMBOLS_WEIGHT
+from scheduler import ScanScheduler
+from exit_engine import ExitEngine
+from sim_exchange import SimExchange
+from metrics import Counter, Gauge, Histogram, start_http_server
 from datetime import datetime, timedelta
 from strategies import (
-    ema_rsi_strategy,
-    bollinger_rsi_strategy,
-    macd_ema_strategy,
-    vwap_rsi_strategy,
-    macd_stochastic_strategy,
-    bollinger_volume_strategy,
-    ema_crossover_strategy
+    STRATEGY_REGISTRY,
+    strategy_warmup,
+    required_bars,
+    consensus_signal,
+    confidence_multiplier
 )
 
 
-HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'trade_history.json')
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'trade_history.json')  # старый формат, переносится в журнал
+JOURNAL_FILE = os.getenv("JOURNAL_FILE", os.path.join(os.path.dirname(__file__), 'trade_history.jsonl'))
+
+# Журнал сделок: каждая закрытая сделка дописывается одной строкой
+trade_journal = TradeJournal(JOURNAL_FILE)
+atexit.register(trade_journal.close)
 
 
 # Telegram конфигурация
 TELEGRAM_TOKEN = os.getenv("TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("CHAT_ID")
 
+# Сообщения уходят из фонового потока — торговый цикл их не ждёт
+notifier = TelegramNotifier(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
+atexit.register(notifier.stop)
+
 # Статистика торговли
 trade_log = []
 
 
 positions_lock = threading.Lock()
+exit_lock = threading.Lock()  # один проход проверки выхода за раз (монитор, тики, главный цикл)
+exit_engine = ExitEngine()  # уровни TP/SL и дедлайны открытых позиций
 
 
 # Время следующей отправки отчета
 next_report_time = datetime.now() + timedelta(hours=1)
 
-symbol_precision_cache = {}
-
 open_positions = {}  # Пример: {'BTCUSDT': {'side': 'BUY', 'entry_price': 30000.0, 'qty': 0.00033}}
 START_DEPOSIT = 1000.0
 TRADE_PERCENT = 5
@@ -49,12 +81,14 @@ MAX_DRAWDOWN = 0.3
 def load_trade_history():
     global trade_log_all
     if not trade_log_all:
-        try:
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except FileNotFoundError:
+        trade_journal.migrate_from_json(HISTORY_FILE)
+        data, broken = trade_journal.load()
+        if broken:
+            print(f"⚠️ В журнале сделок {broken} битых строк — переписываем журнал")
+            trade_journal.compact()
+        if not data:
             return
-            
+
         # Приводим timestamp из строк в datetime
         for t in data:
             if isinstance(t['timestamp'], str):
@@ -62,8 +96,10 @@ def load_trade_history():
             
         trade_log_all = data
 
-trade_log_all = [] # для хранения полной истории
-load_trade_history()
+trade_log_all = [] # для хранения полной истории (загружается в startup())
+
+# Счётчики winrate/прибыли по символам, стратегиям и часам — обновляются при закрытии сделки
+trade_stats = TradeStats()
 consecutive_losses = 0
 pause_until = None
 
@@ -71,12 +107,36 @@ LOSS_PAUSE_THRESHOLD = 3
 PAUSE_DURATION_MIN = 60
 pause_until = None
 
+# Параллельный скан: сеть и стратегии по разным символам идут одновременно
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "8"))
+# Пакетный скан: свечи качаются параллельно, стратегии считаются сразу по всем символам
+BATCH_SIGNALS = os.getenv("BATCH_SIGNALS", "1") == "1"
+
+# Включённые стратегии: STRATEGIES=ema_rsi_strategy,macd_ema_strategy; по умолчанию — все из реестра
+STRATEGIES = [name.strip() for name in os.getenv("STRATEGIES", "").split(",") if name.strip()] or list(STRATEGY_REGISTRY)
+for _name in STRATEGIES:
+    if _name not in STRATEGY_REGISTRY:
+        raise ValueError(f"Неизвестная стратегия: {_name}")
+scan_executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="scan")
+
 # 🔑 API ключи с Binance Testnet
 API_KEY = os.getenv("API_KEY")
 API_SECRET = os.getenv("API_SECRET")
 
-client = Client(API_KEY, API_SECRET)
-client.API_URL = 'https://testnet.binance.vision/api'
+# Локальный прогон: SIM_DATA — файл записанных свечей, биржа симулируется без сети
+SIM_DATA = os.getenv("SIM_DATA")
+SIM_SPEED = float(os.getenv("SIM_SPEED", "1"))
+
+def create_client():
+    if SIM_DATA:
+        return SimExchange.from_file(SIM_DATA, interval=Client.KLINE_INTERVAL_5MINUTE)
+    binance_client = Client(API_KEY, API_SECRET)
+    binance_client.API_URL = 'https://testnet.binance.vision/api'
+    # Все REST-запросы идут через слой с бюджетом веса, приоритетами и повторами
+    return RateLimitedClient(binance_client, pool_size=SCAN_WORKERS + 4)
+
+# Клиент создаётся при первом запросе: импорт main не ходит в сеть
+client = LazyClient(create_client)
 
 # 🔄 Торгуемые пары
 #['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'ADAUSDT', 'MATICUSDT', 'DOTUSDT', 'LINKUSDT', 'AVAXUSDT', 'XRPUSDT', 'PEPEUSDT']
@@ -103,19 +163,99 @@ raw_symbols = [
   "CKBUSDT"
 ]
 
-# Получаем список всех доступных символов на Binance
-exchange_info = client.get_exchange_info()
-valid_binance_symbols = {s['symbol'] for s in exchange_info['symbols']}
-symbols = [s for s in raw_symbols if s in valid_binance_symbols]
+# Фильтры ордеров всех символов — один exchangeInfo; разобранные фильтры хранятся в снимке на диске,
+# при старте читаются из него, а свежий exchangeInfo качается в фоне.
+# EXCHANGE_SNAPSHOT="" — без снимка; в режиме симуляции по умолчанию выключен
+EXCHANGE_SNAPSHOT = os.getenv("EXCHANGE_SNAPSHOT", "" if SIM_DATA else os.path.join(os.path.dirname(__file__), 'exchange_info.json'))
+symbol_filters = SymbolFilterStore(client, snapshot_path=EXCHANGE_SNAPSHOT or None)
+symbols = []  # торгуемые пары из raw_symbols (или весь UNIVERSE), которые есть на бирже — заполняются в startup()
+
+# UNIVERSE=USDT — сканировать все торгуемые пары к USDT из exchangeInfo вместо raw_symbols.
+# Какие символы сканировать в цикле, решает планировщик: активные чаще, спящие реже,
+# в сумме не больше SCAN_WEIGHT_PER_MIN веса REST в минуту на свечи
+UNIVERSE = os.getenv("UNIVERSE", "")
+SCAN_WEIGHT_PER_MIN = int(os.getenv("SCAN_WEIGHT_PER_MIN", "120"))
+SCAN_CYCLE_MINUTES = 5
+TICKER_REFRESH_CYCLES = 3  # 24h-тикеры для ранжирования — раз в 15 минут
+scheduler = ScanScheduler(symbol_weight=METHOD_WEIGHT['get_klines'])
 
 interval = Client.KLINE_INTERVAL_5MINUTE
-lookback = 100
+
+# Таймфрейм стратегии — из реестра (None — базовый interval); переопределяется так:
+# STRATEGY_TIMEFRAMES=ema_crossover_strategy:1h,macd_ema_strategy:15m
+# Старшие таймфреймы собираются из базовых свечей в памяти, без отдельных запросов к REST
+STRATEGY_TIMEFRAMES = {name: STRATEGY_REGISTRY[name]['timeframe'] or interval for name in STRATEGIES}
+for _item in os.getenv("STRATEGY_TIMEFRAMES", "").split(","):
+    if _item.strip():
+        _name, _timeframe = (part.strip() for part in _item.split(":"))
+        if _name in STRATEGY_TIMEFRAMES:
+            STRATEGY_TIMEFRAMES[_name] = _timeframe
+
+def timeframe_strategies(timeframe):
+    return [name for name in STRATEGIES if STRATEGY_TIMEFRAMES[name] == timeframe]
+
+# Окно для стратегий — максимальный прогрев включённых стратегий (EMA200 требует ~600 баров);
+# не меньше 20 баров — по ним считаются тайм-аут и волатильность
+lookback = max(required_bars(timeframe_strategies(interval)), 20)
+HISTORY_BARS = max(1000, lookback)  # столько свечей держим в кэше: стратегиям — последние lookback, оптимизатору — всё
+# Сколько баров держим по каждому старшему таймфрейму
+TIMEFRAME_BARS = {
+    timeframe: required_bars(timeframe_strategies(timeframe))
+    for timeframe in dict.fromkeys(STRATEGY_TIMEFRAMES.values()) if timeframe != interval
+}
+timeframes = MultiTimeframe(interval, TIMEFRAME_BARS) if TIMEFRAME_BARS else None
+
+# История свечей на диске: прогрев кэша после перезапуска и данные для бэктестов.
+# KLINE_STORE="" — не сохранять; в режиме симуляции по умолчанию выключено
+KLINE_STORE_DIR = os.getenv("KLINE_STORE", "" if SIM_DATA else os.path.join(os.path.dirname(__file__), 'klines'))
+kline_store = KlineStore(KLINE_STORE_DIR) if KLINE_STORE_DIR else None
+if kline_store:
+    atexit.register(kline_store.flush)
+
+# Кэш свечей: за цикл докачиваем только новые бары
+kline_cache = KlineCache(client, interval, size=HISTORY_BARS, store=kline_store, timeframes=timeframes)
+
+# Потоковый режим: свечи и цены приходят по WebSocket вместо опроса REST
+STREAM_MODE = os.getenv("STREAM_MODE") == "1"
+market_stream = None
+
+# Балансы: загружаются один раз и дальше обновляются из user data stream
+ACCOUNT_STREAM = os.getenv("ACCOUNT_STREAM", "0" if SIM_DATA else "1") == "1"
+account = AccountState(client)
+ws_manager = None
+
+# 📈 Метрики: задержки этапов цикла, ордера, отставание выходов — http://127.0.0.1:METRICS_PORT/metrics
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 — не запускать сервер
+
+KLINE_FETCH = Histogram('bot_kline_fetch_seconds', 'Получение свечей символа (кэш + REST)')
+FRAME_BUILD = Histogram('bot_frame_build_seconds', 'Сборка DataFrame из свечей')
+STRATEGY_LATENCY = Histogram('bot_strategy_seconds', 'Расчёт одной стратегии', ['strategy'])
+CONSENSUS = Histogram('bot_consensus_seconds', 'Консенсус, уверенность и тайм-аут по сигналам')
+SYMBOL_EVAL = Histogram('bot_symbol_eval_seconds', 'Полная оценка символа')
+SCAN_CYCLE = Histogram('bot_scan_cycle_seconds', 'Скан всех символов за цикл')
+TRADE_STEP = Histogram('bot_trade_step_seconds', 'Этапы открытия сделки', ['step'])
+SCAN_UNIVERSE = Gauge('bot_scan_universe_symbols', 'Символов в списке скана')
+SCAN_BACKLOG = Gauge('bot_scan_backlog_symbols', 'Символы, подошедшие по расписанию, но не влезшие в бюджет цикла')
+BATCH_EVAL = Histogram('bot_batch_signals_seconds', 'Пакетный расчёт сигналов по всем символам')
+EXIT_PASS = Histogram('bot_exit_check_seconds', 'Один проход проверки выхода')
+ORDERS = Counter('bot_orders_total', 'Отправленные ордера', ['side', 'purpose'])
+ERRORS = Counter('bot_errors_total', 'Ошибки по этапам', ['stage'])
+OPEN_POSITIONS = Gauge('bot_open_positions', 'Открытые позиции')
+LOOP_LAG = Gauge('bot_loop_lag_seconds', 'Насколько главный цикл опоздал относительно расписания')
+EXIT_CHECK_AGE = Gauge('bot_exit_check_age_seconds', 'Сколько секунд назад закончилась последняя проверка выхода')
+REST_WEIGHT = Gauge('bot_rest_weight_used', 'Использованный вес REST за текущую минуту')
+
+last_exit_check = time.monotonic()
+OPEN_POSITIONS.set_function(lambda: len(open_positions))
+EXIT_CHECK_AGE.set_function(lambda: time.monotonic() - last_exit_check)
+SCAN_UNIVERSE.set_function(lambda: len(symbols))
+SCAN_BACKLOG.set_function(lambda: scheduler.backlog)
+REST_WEIGHT.set_function(lambda: client.stats().get('used_weight', 0) if client.created else 0)
 
 REPORT_HOUR = 21  # час (0–23) отправки ежедневного отчёта
 
-def save_trade_history():
-    with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(trade_log_all, f, default=str, ensure_ascii=False, indent=2)
+def save_trade_history(trade):
+    trade_journal.append(trade)
         
 def next_daily_time(now=None):
     now = now or datetime.now(ZoneInfo("Europe/Kyiv"))
@@ -134,34 +274,14 @@ def next_hourly_time(now=None):
 next_daily_report = next_hourly_time()
 
 def send_daily_statistics():
-    print(f"[DEBUG] Всего записей в trade_log_all: {len(trade_log_all)}")
-    for i, t in enumerate(trade_log_all[:5]):
-        print(f"[DEBUG] Rec#{i} → {t['timestamp']} (tzinfo={t['timestamp'].tzinfo})")
-    now = datetime.now(ZoneInfo("Europe/Kyiv"))
-    one_hour_ago = (now - timedelta(hours=1)).replace(tzinfo=None) 
-    yesterday = (now - timedelta(hours=1)).replace(tzinfo=None)
-
-    # ==== DEBUG ====
-    print(f"[DEBUG] Now: {now!r}")
-    print(f"[DEBUG] Yesterday cutoff: {yesterday!r}")
-    print(f"[DEBUG] Total in trade_log_all: {len(trade_log_all)}")
-    for i, t in enumerate(trade_log_all[-5:], 1):
-        print(f"[DEBUG]   Rec {-i}: ts={t['timestamp']!r} tzinfo={t['timestamp'].tzinfo} result={t['result']}")
-    # ================
-    
-    # Фильтрация последних 24 ч закрытых сделок
-    print(f"[DEBUG] one_hour_ago cutoff: {one_hour_ago!r}")
-    recent = [
-        t for t in trade_log_all
-        ##if t['result'] in ('win','loss') and t['timestamp'] >= one_hour_ago.replace(tzinfo=None) 
-    ]
-
-    print(f"[DEBUG] After filter recent count: {len(recent)}")
+    # Сводка за последние 24 ч из часовых корзин — без прохода по всей истории
+    recent = trade_stats.last_hours(24)
+    counts = recent['counts']
 
-    total = len(recent)
-    wins  = sum(1 for t in recent if t['result']=='win')
-    losses= sum(1 for t in recent if t['result']=='loss')
-    profit= sum(t['profit'] for t in recent)
+    total = counts['total']
+    wins  = counts['wins']
+    losses= counts['losses']
+    profit= counts['profit']
 
     # Заголовок
     if total == 0:
@@ -178,16 +298,12 @@ def send_daily_statistics():
         )
 
     # Win-rate по активам
-    by_symbol = {}
-    for t in recent:
-        by_symbol.setdefault(t['symbol'], []).append(t['result'])
-
     symbol_lines = []
     recommendations = []
-    for sym, res in by_symbol.items():
-        tot = len(res)
-        w   = res.count('win')
-        wr_sym = w/tot*100
+    for sym, res in recent['by_symbol'].items():
+        tot = res['total']
+        w   = res['wins']
+        wr_sym = winrate(res)*100
         symbol_lines.append(f"{sym}: {w}/{tot} ({wr_sym:.1f}%)")
         # рекомендации по активам
         if wr_sym < 50:
@@ -197,99 +313,89 @@ def send_daily_statistics():
 
     symbol_section = "*По активам:*\n" + "\n".join(symbol_lines) + "\n\n"
 
-    # --- новая секция: статистика по стратегиям ---
-    by_strat = {}
-    for t in recent:
-        
-        # t['strategy'] — строка вида "ema_rsi,bollinger_rsi"
-        for strat in t.get('strategy', '').split(','):
-            strat = strat.strip()
-            if not strat: 
-                continue
-            by_strat.setdefault(strat, []).append(t['result'])
-
+    # --- статистика по стратегиям ---
     strat_lines = []
-    print(f"🔧 1111111111: {by_strat.items()}")
-    for strat, res in by_strat.items():
-        w   = res.count('win')
-        tot = len(res)
-        wr  = w/tot*100
+    for strat, res in recent['by_strategy'].items():
+        w   = res['wins']
+        tot = res['total']
+        wr  = winrate(res)*100
         strat_lines.append(f"{strat}: {w}/{tot} ({wr:.1f}%)")
 
-    # --- формируем и посылаем итоговое сообщение ---
-    #strat_section = "*По стратегиям:*\n" + "\n".join(strat_lines)
-
-
     # Собираем итоговое сообщение
-    message = header + symbol_section #+ strat_section
+    message = header + symbol_section
 
-    # Если есть рекомендации — добавляем
     if strat_lines:
         message += "*По стратегиям:*\n"
         message += "\n".join(strat_lines)
 
     send_telegram_message(message)
 
-def confidence_multiplier(buy_count, sell_count):
-    count = max(buy_count, sell_count)
-    if count >= 4:
-        return 1.2  # высокая уверенность
-    elif count == 3:
-        return 1.1
-    elif count == 2:
-        return 1.0
-    else:
-        return 0.9  # слабый сигнал
-
-def estimate_volatility(df):
+def estimate_volatility(df, engine=None):
     """Оценивает волатильность как среднее тело свечей / цену"""
-    df['body'] = abs(df['close'] - df['open'])
-    avg_body = df['body'].rolling(window=20).mean().iloc[-1]
-    avg_price = df['close'].rolling(window=20).mean().iloc[-1]
+    engine = engine or IndicatorEngine(df)
+    avg_body = engine.rolling_mean('body', 20).iloc[-1]
+    avg_price = engine.rolling_mean('close', 20).iloc[-1]
     return avg_body / avg_price
         
 def is_trading_time():
     now = datetime.now(ZoneInfo("Europe/Kyiv")).time()
     return now >= datetime.strptime("06:00", "%H:%M").time() and now <= datetime.strptime("22:00", "%H:%M").time()
     
-def is_volume_sufficient(df, min_volume_ratio=0.5):
+def is_volume_sufficient(df, min_volume_ratio=0.5, engine=None):
     """Проверяет, превышает ли последний объём средний хотя бы на min_volume_ratio"""
-    df['volume'] = df['volume'].astype(float)
-    avg_volume = df['volume'].rolling(window=20).mean().iloc[-2]
+    engine = engine or IndicatorEngine(df)
+    avg_volume = engine.rolling_mean('volume', 20).iloc[-2]
     current_volume = df['volume'].iloc[-1]
     return current_volume >= avg_volume * min_volume_ratio
     
 def get_klines(symbol):
-    klines = client.get_klines(symbol=symbol, interval=interval, limit=lookback)
-    df = pd.DataFrame(klines, columns=[
-        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-        'close_time', 'quote_asset_volume', 'number_of_trades',
-        'taker_buy_base', 'taker_buy_quote', 'ignore'
-    ])
-    df['high'] = df['high'].astype(float)
-    df['low'] = df['low'].astype(float)
-    df['open'] = df['open'].astype(float)
-    df['close'] = df['close'].astype(float)
-    df['volume'] = df['volume'].astype(float)
-    return df
+    with KLINE_FETCH.time():
+        kline_cache.update(symbol, fetch=market_stream is None)
+    with FRAME_BUILD.time():
+        return kline_cache.frame(symbol, current_lookback(), fetch=False)
+
+def current_lookback(timeframe=None):
+    """Прогрев с текущими параметрами: оптимизатор может увеличить периоды, но не больше, чем держим в памяти"""
+    timeframe = timeframe or interval
+    names = timeframe_strategies(timeframe)
+    bars = required_bars(names, {name: get_strategy_params(name) for name in names})
+    if timeframe == interval:
+        return min(max(bars, 20), HISTORY_BARS)
+    return min(bars, TIMEFRAME_BARS[timeframe])
+
+def ready_strategies(bars, timeframe=None):
+    """Стратегии таймфрейма, которым хватает bars баров истории; остальные пропускаем, а не считаем по непрогретым индикаторам"""
+    return [
+        name for name in timeframe_strategies(timeframe or interval)
+        if strategy_warmup(name, get_strategy_params(name)) <= bars
+    ]
+
+def strategy_frames(symbol, df):
+    """(таймфрейм, df) для стратегий: базовые свечи и старшие таймфреймы, собранные из них"""
+    yield interval, df
+    for timeframe in TIMEFRAME_BARS:
+        tf_df = timeframes.frame(symbol, timeframe, current_lookback(timeframe))
+        if tf_df is not None and not tf_df.empty:
+            yield timeframe, tf_df
+
+def get_cached_histories():
+    """Вся закэшированная история по символам — для фонового оптимизатора"""
+    histories = {}
+    # Только уже загруженные: ещё не сканированные символы большого списка не качаем
+    for symbol in kline_cache.symbols():
+        df = kline_cache.frame(symbol, fetch=False)
+        if not df.empty:
+            histories[symbol] = df
+    return histories
 
 def get_symbol_winrate(symbol, min_trades=5):
-    """Возвращает winrate символа, если достаточно сделок"""
-    trades = [t for t in trade_log if t['symbol'] == symbol and t['result'] in ('win', 'loss')]
-    total = len(trades)
-    if total < min_trades:
-        return None  # недостаточно данных
-    wins = sum(1 for t in trades if t['result'] == 'win')
-    return wins / total
+    """Возвращает winrate символа за текущий период (как по trade_log до сброса в send_statistics), если достаточно сделок"""
+    return trade_stats.symbol_winrate(symbol, min_trades, period=True)
     
-def calculate_adaptive_timeout(df):
+def calculate_adaptive_timeout(df, engine=None):
     """Адаптивный тайм-аут на основе волатильности"""
-    df['high'] = df['high'].astype(float)
-    df['low'] = df['low'].astype(float)
-    df['close'] = df['close'].astype(float)
-
-    volatility = (df['high'] - df['low']) / df['close'] * 100
-    avg_volatility = volatility.rolling(window=20).mean().iloc[-1]
+    engine = engine or IndicatorEngine(df)
+    avg_volatility = engine.rolling_mean('range_pct', 20).iloc[-1]
 
     if avg_volatility > 3:
         return 30  # высокая волатильность — держим коротко
@@ -302,14 +408,16 @@ def format_quantity(qty):
     # Преобразуем float в строку с обычной десятичной записью, не используя e-формат
     return format(qty, 'f').rstrip('0').rstrip('.') or '0'
 
-def execute_trade(symbol, signal, confidence = 1.0, timeout = 60):
+def execute_trade(symbol, signal, confidence = 1.0, timeout = 60, price = None, strategy = ''):
     global current_deposit
     if symbol in open_positions:
         return  # уже есть открытая позиция
 
     try:
-        ticker = client.get_symbol_ticker(symbol=symbol)
-        price = float(ticker['price'])
+        # Цену входа берём из последней свечи; запрос тикера — только если её не передали
+        if price is None:
+            with TRADE_STEP.labels(step='ticker').time():
+                price = get_prices([symbol])[symbol]
 
         base_percent = TRADE_PERCENT
 
@@ -326,42 +434,50 @@ def execute_trade(symbol, signal, confidence = 1.0, timeout = 60):
         adjusted_percent = min(base_percent + extra_percent + (confidence - 2) * 2, 30)
         trade_amount = current_deposit * adjusted_percent / 100
 
-        if not can_trade(client, symbol, trade_amount):
-            return
-
-        qty = get_trade_quantity(symbol, trade_amount, price)
-        qty_str=format_quantity(qty)
-
-        exchange_info = client.get_symbol_info(symbol)                
+        with TRADE_STEP.labels(step='sizing').time():
+            if not can_trade(symbol_filters, symbol, trade_amount):
+                return
+            qty = get_trade_quantity(symbol, trade_amount, price)
+            qty_str=format_quantity(qty)
 
-        # Проверка баланса USDT перед покупкой
-        if signal == 'BUY':
-            balance_info = client.get_asset_balance(asset='USDT')
-            free_usdt = float(balance_info['free']) if balance_info else 0.0
-            if free_usdt < trade_amount:
-                return  # Недостаточно USDT — пропускаем
+        # Проверка баланса перед ордером: USDT для покупки, монеты — для продажи
+        with TRADE_STEP.labels(step='balance').time():
+            if signal == 'BUY':
+                enough = account.free('USDT') >= trade_amount
+            else:
+                enough = account.free(symbol.replace('USDT', '')) >= qty
+        if not enough:
+            return  # Недостаточно средств — пропускаем
 
+        # Резерв до подтверждения биржей: следующая сделка цикла видит уже уменьшенный баланс.
+        # Снимается по executionReport ордера с этим clientOrderId
+        order_id = new_order_id()
         if signal == 'BUY':
-            client.order_market_buy(symbol=symbol, quantity=qty_str)
-        elif signal == 'SELL':
-            # Проверка баланса монеты перед продажей
-            base_asset = symbol.replace('USDT', '')
-            balance_info = client.get_asset_balance(asset=base_asset)
-            free_balance = float(balance_info['free']) if balance_info else 0.0
-            if free_balance < qty:
-                return  # Недостаточно монет — пропускаем
-                
-            client.order_market_sell(symbol=symbol, quantity=qty_str)
+            account.reserve(order_id, 'USDT', trade_amount)
+        else:
+            account.reserve(order_id, symbol.replace('USDT', ''), qty)
+        with TRADE_STEP.labels(step='order').time():
+            try:
+                if signal == 'BUY':
+                    client.order_market_buy(symbol=symbol, quantity=qty_str, newClientOrderId=order_id)
+                elif signal == 'SELL':
+                    client.order_market_sell(symbol=symbol, quantity=qty_str, newClientOrderId=order_id)
+            except Exception:
+                account.release(order_id)
+                raise
+        ORDERS.labels(side=signal, purpose='open').inc()
 
         print(f"✅ {signal} ордер отправлен для {symbol} по {price}")
 
+        opened_at = datetime.now()
         open_positions[symbol] = {
             'side': signal,
             'entry_price': price,
             'qty': qty,
-            'time': datetime.now(),
+            'time': opened_at,
             'timeout': timeout
         }
+        exit_engine.add(symbol, symbol, signal, price, opened_at, timeout)
 
         trade_log.append({
             'symbol': symbol,
@@ -369,43 +485,94 @@ def execute_trade(symbol, signal, confidence = 1.0, timeout = 60):
             'amount': trade_amount,
             'entry_price': price,
             'timestamp': datetime.now(),
+            'strategy': strategy,
             'result': None,
             'profit': 0.0
         })
 
     except Exception as e:
+        ERRORS.labels(stage='trade').inc()
         error_message = f"❌ Ошибка при торговле {symbol}: {e}"
         print(f"{error_message}")
         send_telegram_error(error_message)
 
 def get_trade_quantity(symbol, trade_amount, price):
-    info = client.get_symbol_info(symbol)
-    step = 0.00001  # fallback
-
-    for f in info['filters']:
-        if f['filterType'] == 'LOT_SIZE':
-            step = float(f['stepSize'])
-            break
+    filters = symbol_filters.get(symbol)
+    step = filters['step_size']
 
     raw_qty = trade_amount / price
-    precision = int(round(-np.log10(step)))
+    precision = filters['qty_precision']
     adjusted_qty = raw_qty - (raw_qty % step)
     qty = round(adjusted_qty, precision)
     return float(qty)
 
-def check_exit_conditions():
+def get_prices(symbols):
+    """
+    Текущие цены по списку символов: из WebSocket-потока, если он свежий,
+    остальные — одним запросом get_symbol_ticker() по всем парам вместо N запросов.
+    """
+    prices = {}
+    missing = []
+    for symbol in symbols:
+        price = market_stream.get_price(symbol) if market_stream is not None else None
+        if price is None:
+            missing.append(symbol)
+        else:
+            prices[symbol] = price
+
+    if len(missing) == 1:
+        prices[missing[0]] = float(client.get_symbol_ticker(symbol=missing[0])['price'])
+    elif missing:
+        wanted = set(missing)
+        for ticker in client.get_symbol_ticker():
+            if ticker['symbol'] in wanted:
+                prices[ticker['symbol']] = float(ticker['price'])
+    return prices
+
+def check_exit_conditions(only=None, prices=None):
+    global last_exit_check
+    with exit_lock:
+        with EXIT_PASS.time():
+            _check_exit_conditions(only, prices)
+        if only is None:
+            # Возраст полного прохода — для алерта на зависшие выходы
+            last_exit_check = time.monotonic()
+
+def _check_exit_conditions(only=None, prices=None):
     global current_deposit, consecutive_losses
     symbols_to_close = []
 
     with positions_lock:
-        symbols = list(open_positions.keys())
+        symbols = [s for s in open_positions if only is None or s in only]
+    if not symbols:
+        return
+
+    # Цены всех открытых позиций — одним запросом, затем проверяем их вместе
+    if prices is None:
+        try:
+            prices = get_prices(symbols)
+        except Exception as e:
+            print(f"⚠️ Не удалось получить цены для проверки выхода: {e}")
+            return
+
+    # Индекс уровней отдаёт только позиции, пересёкшие TP/SL или вышедшие по времени
+    triggered = set(exit_engine.on_clock(datetime.now()))
+    for symbol in symbols:
+        if symbol in prices:
+            triggered.update(exit_engine.on_price(symbol, prices[symbol]))
+
     for symbol in symbols:
+        if symbol not in triggered:
+            continue
         with positions_lock:
             pos=open_positions.get(symbol)
         if not pos:
             continue
         try:
-            current_price = float(client.get_symbol_ticker(symbol=symbol)['price'])
+            current_price = prices.get(symbol)
+            if current_price is None:
+                # Тайм-аут по символу без свежего тика — цену запрашиваем отдельно
+                current_price = get_prices([symbol])[symbol]
             entry = pos['entry_price']
             side = pos['side']
             qty = pos['qty']
@@ -415,65 +582,62 @@ def check_exit_conditions():
             if side == 'SELL':
                 change = -change  # для коротких сделок переворачиваем знак
 
-            elapsed_minutes = (datetime.now() - pos['time']).total_seconds() / 60
-            max_minutes = pos.get('timeout', 60) # Дефолт 60 мин
-            
-            if change >= 1.5 or change <= -1.0 or elapsed_minutes >= max_minutes:
+            # Проверка перед закрытием позиции
+            base_asset = symbol.replace('USDT', '')
 
-                # Проверка перед закрытием позиции
-                base_asset = symbol.replace('USDT', '')
+            try:
+                free_balance = account.free(base_asset)
+            except Exception:
+                continue  # если не удалось получить баланс — пропускаем
+
+            # Если не хватает монет — пропускаем
+            if free_balance < qty:
+                continue
+            
+            close_side = 'SELL' if side == 'BUY' else 'BUY'
+            if close_side == 'BUY':
+                client.order_market_buy(symbol=symbol, quantity=qty_str)
+            else:
+                client.order_market_sell(symbol=symbol, quantity=qty_str)
+            ORDERS.labels(side=close_side, purpose='close').inc()
+
+            # Обновление лога
+            for t in reversed(trade_log):
+                if t['symbol'] == symbol and t['result'] is None:
+                    trade_amount = t['amount']
+                    profit_usdt = round(trade_amount * change / 100, 2)
+                    t['result'] = 'win' if profit_usdt > 0 else 'loss'
+                    t['profit'] = profit_usdt
+                    current_deposit += profit_usdt  # не забываем обновить текущий депозит
+                    result = t['result']
+                    print(f"📤 Закрыта позиция по {symbol} — {result.upper()} ({change:.2f}%)")
+
+                    trade_log_all.append(t)
+                    trade_stats.record(t)
+
+                    save_trade_history(t)
+                    
+                    if t['result'] == 'loss':
+                        consecutive_losses += 1
+                    else:
+                        consecutive_losses = 0
+
+                    # Если дошли до порога — ставим паузу
+                    if consecutive_losses >= LOSS_PAUSE_THRESHOLD:
+                        pause_until = datetime.now() + timedelta(minutes=PAUSE_DURATION_MIN)
+                        print(f"⏸️ Ставим паузу до {pause_until.strftime('%H:%M')}, из-за {consecutive_losses} убыточных сделок подряд.")
+                    break
+            
 
-                try:
-                    balance_info = client.get_asset_balance(asset=base_asset)
-                    free_balance = float(balance_info['free']) if balance_info else 0.0
-                except Exception:
-                    continue  # если не удалось получить баланс — пропускаем
+            symbols_to_close.append(symbol)
+            with positions_lock:
+                open_positions.pop(symbol, None)
+            exit_engine.remove(symbol)
 
-                # Если не хватает монет — пропускаем
-                if free_balance < qty:
-                    continue
-                
-                close_side = 'SELL' if side == 'BUY' else 'BUY'
-                if close_side == 'BUY':
-                    client.order_market_buy(symbol=symbol, quantity=qty_str)
-                else:
-                    client.order_market_sell(symbol=symbol, quantity=qty_str)
-
-                # Обновление лога
-                for t in reversed(trade_log):
-                    if t['symbol'] == symbol and t['result'] is None:
-                        trade_amount = t['amount']
-                        profit_usdt = round(trade_amount * change / 100, 2)
-                        t['result'] = 'win' if profit_usdt > 0 else 'loss'
-                        t['profit'] = profit_usdt
-                        current_deposit += profit_usdt  # не забываем обновить текущий депозит
-                        result = t['result']
-                        print(f"📤 Закрыта позиция по {symbol} — {result.upper()} ({change:.2f}%)")
-
-                        trade_log_all.append(t)
-   
-                        save_trade_history()
-                        optimize_parameters(trade_log_all)
-                        
-                        if t['result'] == 'loss':
-                            consecutive_losses += 1
-                        else:
-                            consecutive_losses = 0
-
-                        # Если дошли до порога — ставим паузу
-                        if consecutive_losses >= LOSS_PAUSE_THRESHOLD:
-                            pause_until = datetime.now() + timedelta(minutes=PAUSE_DURATION_MIN)
-                            print(f"⏸️ Ставим паузу до {pause_until.strftime('%H:%M')}, из-за {consecutive_losses} убыточных сделок подряд.")
-                        break
-                
-
-                symbols_to_close.append(symbol)
-                with positions_lock:
-                    open_positions.pop(symbol, None)
-
-                
+            
 
         except Exception as e:
+            ERRORS.labels(stage='exit').inc()
             error_message = str(e)
             if "502 Bad Gateway" in error_message:
                 print(f"⚠️ Binance временно недоступен при закрытии {symbol} — ошибка 502.")
@@ -484,24 +648,11 @@ def check_exit_conditions():
 
 
 def send_telegram_message(message):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {'chat_id': TELEGRAM_CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-       error_message = f"❌ Ошибка при отправке Telegram: {e}"
-       print(f"{error_message}")
-       send_telegram_error(error_message)
-        
+    notifier.send(message, parse_mode='Markdown')
+
 
 def send_telegram_error(message):
-    full_message = f"❌ Ошибка:\n{message}"
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {'chat_id': TELEGRAM_CHAT_ID, 'text': full_message}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-        print(f"[Telegram Error Fail] {e}")
+    notifier.send_error(f"❌ Ошибка:\n{message}")
 
 def start_exit_monitor(interval_seconds=60):
     def monitor():
@@ -517,14 +668,13 @@ def send_statistics():
         send_telegram_message("📊 Пока нет сделок.")
         return
 
-    closed_trades = [t for t in trade_log if t['result'] is not None]
-    open_trades= [t for t in trade_log if t['result'] is None]
-    
-    total = len(closed_trades)
-    wins = sum(1 for t in closed_trades if t['result'] == 'win')
-    losses = sum(1 for t in closed_trades if t['result'] == 'loss')
-    total_amount = sum(t['amount'] for t in closed_trades)
-    total_profit = sum(t.get('profit', 0) for t in closed_trades)
+    # Закрытые с прошлого отчёта — из счётчика периода
+    period = trade_stats.reset_period()
+    total = period['total']
+    wins = period['wins']
+    losses = period['losses']
+    total_amount = period['amount']
+    total_profit = period['profit']
     open_trades = len(open_positions)
 
     message = (
@@ -545,107 +695,303 @@ def send_statistics():
     #trade_log_all.extend(closed_trades)
    
     #save_trade_history()
-    #optimize_parameters(trade_log_all)
 
 def round_step_size(symbol, qty):
-    if symbol in symbol_precision_cache:
-        precision = symbol_precision_cache[symbol]
-    else:
-        info = client.get_symbol_info(symbol)
-        for f in info['filters']:
-            if f['filterType'] == 'LOT_SIZE':
-                step = float(f['stepSize'])
-                precision = int(round(-np.log10(step)))
-                symbol_precision_cache[symbol] = precision
-                break
-        else:
-            precision = 5  # запасной вариант
-
+    filters = symbol_filters.get(symbol)
+    precision = filters['qty_precision'] if filters else 5  # запасной вариант
     return round(qty, precision)
 
 
-start_exit_monitor(interval_seconds=60)
+def evaluate_symbol(symbol):
+    """
+    Прогоняет стратегии по символу.
+    Возвращает (сигнал, уверенность, тайм-аут, цена, стратегии) при подтверждении или None.
+    """
+    df = get_klines(symbol)
+    if df is None or df.empty:
+        return None
+
+    # Один движок индикаторов на df: общие RSI/MACD/Боллинджер считаются один раз
+    engine = IndicatorEngine(df)
+    adaptive_timeout = calculate_adaptive_timeout(df, engine=engine)
+    if len(df) >= 2:
+        scheduler.record(symbol, estimate_volatility(df, engine=engine), is_volume_sufficient(df, engine=engine))
+
+    signals = []
+    voters = {'BUY': [], 'SELL': []}
+    for timeframe, tf_df in strategy_frames(symbol, df):
+        tf_engine = engine if timeframe == interval else IndicatorEngine(tf_df)
+        for name in ready_strategies(len(tf_df), timeframe):
+            params = get_strategy_params(name)
+            with STRATEGY_LATENCY.labels(strategy=name).time():
+                result = STRATEGY_REGISTRY[name]['func'](tf_df, params=params, engine=tf_engine)
+            if result:
+                print(f" 📊 {symbol}: {name} дал сигнал {result}")
+                signals.append(result)
+                voters[result].append(name)
+
+    with CONSENSUS.time():
+        # Подтверждение от минимум 2 стратегий
+        buy_count = signals.count('BUY')
+        sell_count = signals.count('SELL')
+
+        final_signal = consensus_signal(buy_count, sell_count)
+
+        if final_signal:
+            # Коэффициенты уверенности
+            conf_mult = confidence_multiplier(buy_count, sell_count)
+
+            # Волатильность
+            volatility = estimate_volatility(df, engine=engine)
+
+            # Модифицируем timeout
+            new_timeout = int(adaptive_timeout * (1 + volatility))  # адаптивное время удержания
+
+            # Последняя (ещё открытая) свеча: её close — цена последней сделки на момент загрузки
+            return final_signal, conf_mult, min(new_timeout, 240), float(df['close'].iloc[-1]), ','.join(voters[final_signal])
+        return None
+
+def evaluate_batch(symbols):
+    """
+    Пакетный аналог evaluate_symbol: окна свечей всех символов складываются в 2-D массивы,
+    индикаторы и стратегии считаются сразу по всем символам.
+    Возвращает {символ: (сигнал, уверенность, тайм-аут, цена, стратегии)} для подтверждённых сигналов.
+    """
+    # Свечи качаем параллельно (REST), считаем — одним проходом
+    frames = {}
+    for symbol, df in zip(symbols, scan_executor.map(fetch_frame, symbols)):
+        if df is not None and not df.empty:
+            frames[symbol] = df
+
+    decisions = {}
+    if not frames:
+        return decisions
+    columns = {symbol: j for j, symbol in enumerate(frames)}
+    rows = {}  # {стратегия: сигналы по символам}; стратегии разных таймфреймов считаются своими пачками
+    timeouts = np.full(len(columns), np.nan)
+    prices = np.empty(len(columns))
+    with BATCH_EVAL.time():
+        for timeframe, tf_frames in batch_frames(frames):
+            for group, arrays in stack_frames(tf_frames):
+                ind = BatchIndicators(arrays)
+                cols = [columns[symbol] for symbol in group]
+                if timeframe == interval:
+                    timeouts[cols] = batch_timeouts(ind)
+                    prices[cols] = arrays['close'][:, -1]
+                    for symbol, vol, volume_ok in zip(group, batch_volatility(ind), batch_volume_sufficient(ind)):
+                        scheduler.record(symbol, vol, volume_ok)
+                names = ready_strategies(arrays['close'].shape[1], timeframe)
+                if not names:
+                    continue
+                for name, row in zip(names, signal_matrix(ind, names)):
+                    rows.setdefault(name, np.zeros(len(columns), dtype=np.int8))[cols] = row
+        if not rows:
+            return decisions
+
+        names = list(rows)
+        matrix = np.vstack([rows[name] for name in names])
+        final, confidence, _, _ = batch_consensus(matrix)
+        for symbol, j in columns.items():
+            for name, code in zip(names, matrix[:, j]):
+                if code:
+                    print(f" 📊 {symbol}: {name} дал сигнал {'BUY' if code == BUY else 'SELL'}")
+            # Где волатильность ещё не посчитана (мало баров), сделку не открываем
+            if not final[j] or np.isnan(timeouts[j]):
+                continue
+            voters = [name for name, code in zip(names, matrix[:, j]) if code == final[j]]
+            decisions[symbol] = (
+                'BUY' if final[j] == BUY else 'SELL',
+                float(confidence[j]),
+                int(timeouts[j]),
+                float(prices[j]),
+                ','.join(voters),
+            )
+    return decisions
+
+def batch_frames(frames):
+    """Окна по таймфреймам для пакетного расчёта: базовые и старшие, собранные из них"""
+    yield interval, frames
+    for timeframe in TIMEFRAME_BARS:
+        tf_frames = {}
+        for symbol in frames:
+            tf_df = timeframes.frame(symbol, timeframe, current_lookback(timeframe))
+            if tf_df is not None and not tf_df.empty:
+                tf_frames[symbol] = tf_df
+        yield timeframe, tf_frames
+
+def fetch_frame(symbol):
+    try:
+        return get_klines(symbol)
+    except Exception as e:
+        report_scan_error(symbol, e)
+        return None
+
+def report_scan_error(symbol, e):
+    ERRORS.labels(stage='scan').inc()
+    error_message = f"⚠️ Ошибка при обработке {symbol}: {e}"
+    print(f"{error_message}")
+    send_telegram_error(error_message)
+
+def act_on_decision(symbol, decision):
+    final_signal, conf_mult, timeout, price, strategy = decision
+    # Ордера выставляются строго по одному — под positions_lock
+    with positions_lock:
+        # Передаём коэффициент уверенности в execute_trade
+        execute_trade(symbol, final_signal, confidence=conf_mult, timeout=timeout, price=price, strategy=strategy)
 
-# 🧠 Главный цикл
-while True:
-    if not is_trading_time():
-        print("⏳ Вне торгового времени. Пауза.")
-        time.sleep(60 * 5)
-        continue
+def process_symbol(symbol):
+    """Оценивает символ и при подтверждённом сигнале открывает сделку"""
+    try:
+        with SYMBOL_EVAL.time():
+            decision = evaluate_symbol(symbol)
+        if decision:
+            act_on_decision(symbol, decision)
+    except Exception as e:
+        report_scan_error(symbol, e)
+
+def scan_symbols(symbols):
+    """
+    Скан всех символов за цикл: пакетно (BATCH_SIGNALS) или каждый символ
+    отдельно в пуле потоков. Ждёт завершения цикла.
+    """
+    with SCAN_CYCLE.time():
+        if BATCH_SIGNALS:
+            for symbol, decision in evaluate_batch(symbols).items():
+                act_on_decision(symbol, decision)
+            return
+        futures = [scan_executor.submit(process_symbol, symbol) for symbol in symbols]
+        for future in futures:
+            future.result()
+
+def plan_scan():
+    """Символы на этот цикл: по активности, в пределах бюджета веса REST на свечи"""
+    global symbols
+    budget = SCAN_WEIGHT_PER_MIN * SCAN_CYCLE_MINUTES
+    if UNIVERSE and scheduler.cycle % TICKER_REFRESH_CYCLES == 0:
+        # Новые листинги и делистинги — из фильтров, которые обновляются в фоне
+        symbols = symbol_filters.tradable(UNIVERSE)
+        scheduler.set_universe(symbols)
+    if not scheduler.fits(budget) and scheduler.cycle % TICKER_REFRESH_CYCLES == 0:
+        # Все пары не помещаются — ранжируем по 24h-обороту (один запрос на все символы)
+        try:
+            scheduler.update_tickers(client.get_ticker())
+            budget -= ALL_SYMBOLS_WEIGHT['get_ticker']
+        except Exception as e:
+            print(f"⚠️ Не удалось получить 24h-тикеры: {e}")
+    with positions_lock:
+        pinned = list(open_positions)
+    batch = scheduler.next_batch(budget, pinned)
+    if scheduler.backlog:
+        print(f"📋 Скан {len(batch)} из {len(symbols)} символов, в очереди {scheduler.backlog}")
+    return batch
 
-    print(f"\n🕒 Проверка сигналов... {time.strftime('%Y-%m-%d %H:%M:%S')}")
+def on_stream_bar_close(symbol):
+    if not is_trading_time():
+        return
+    if pause_until and datetime.now() < pause_until:
+        return
+    # Свечи всех символов закрываются одновременно — обрабатываем их тем же пулом
+    scan_executor.submit(process_symbol, symbol)
+
+def on_stream_tick(symbol, price):
+    check_exit_conditions(only={symbol}, prices={symbol: price})
+
+def get_ws_manager():
+    """Один WebSocket-менеджер на рыночные потоки и user data stream"""
+    global ws_manager
+    if ws_manager is None:
+        from binance import ThreadedWebsocketManager
+        ws_manager = ThreadedWebsocketManager(api_key=API_KEY, api_secret=API_SECRET, testnet=True)
+        ws_manager.start()
+    return ws_manager
+
+def start_market_stream():
+    global market_stream
+    # Прогреваем кэш свечей через REST, дальше его обновляет поток
     for symbol in symbols:
-        try:
+        kline_cache.refill(symbol)
+    market_stream = MarketStream(
+        get_ws_manager(), symbols, interval, kline_cache,
+        on_bar_close=on_stream_bar_close,
+        on_tick=on_stream_tick,
+    )
+    market_stream.start()
+
+
+started = False
+
+def startup():
+    """
+    Всё, что нужно циклу, кроме фоновых потоков: фильтры символов и история сделок.
+    Вызывается из main() (и из replay.py); при импорте модуля ничего не загружается.
+    """
+    global symbols, started
+    if started:
+        return
+    if symbol_filters.ensure_loaded():
+        print(f"📦 Фильтры {len(symbol_filters.symbols())} символов из снимка, exchangeInfo обновится в фоне")
+    if UNIVERSE:
+        symbols = symbol_filters.tradable(UNIVERSE)
+    else:
+        symbols = [s for s in raw_symbols if s in symbol_filters.symbols()]
+    scheduler.set_universe(symbols)
+
+    load_trade_history()
+    for t in trade_log_all:
+        trade_stats.record(t)
+    trade_stats.reset_period()
+    started = True
+
+def main():
+    global next_report_time, next_daily_report
+    startup()
+    if SIM_DATA:
+        client.start_clock(SIM_SPEED)
+    start_exit_monitor(interval_seconds=60)
+    symbol_filters.start_background_refresh()
+    if ACCOUNT_STREAM:
+        account.start(get_ws_manager())
+    start_background_optimizer(get_cached_histories)
+    if STREAM_MODE:
+        start_market_stream()
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+
+    # 🧠 Главный цикл
+    wake_at = time.monotonic()
+    while True:
+        # Опоздание итерации относительно плана (сон + долгие циклы)
+        LOOP_LAG.set(max(0.0, time.monotonic() - wake_at))
+        if not is_trading_time():
+            print("⏳ Вне торгового времени. Пауза.")
+            wake_at = time.monotonic() + 60 * 5
+            time.sleep(60 * 5)
+            continue
+
+        # В потоковом режиме стратегии запускаются по закрытию свечи (on_stream_bar_close)
+        if market_stream is None:
+            print(f"\n🕒 Проверка сигналов... {time.strftime('%Y-%m-%d %H:%M:%S')}")
             if pause_until and datetime.now() < pause_until:
                 print(f"⏸ Торговля на паузе до {pause_until.strftime('%H:%M')}")
-                time.sleep(60 * 5)
-                continue
-                
-            df = get_klines(symbol)
-            if df is None or df.empty:
-                continue
+            else:
+                scan_symbols(plan_scan())
 
-            adaptive_timeout = calculate_adaptive_timeout(df)
-            
-            strategies = [
-                ema_rsi_strategy,
-                bollinger_rsi_strategy,
-                macd_ema_strategy,
-                vwap_rsi_strategy,
-                macd_stochastic_strategy,
-                bollinger_volume_strategy,
-                ema_crossover_strategy
-            ]
-
-            signals = []
-            for strat in strategies:
-                params = get_strategy_params(strat.__name__)
-                result = strat(df, params=params)
-                if result:
-                    print(f" 📊 {symbol}: {strat.__name__} дал сигнал {result}")
-                    signals.append(result)
-
-            # Подтверждение от минимум 2 стратегий
-            buy_count = signals.count('BUY')
-            sell_count = signals.count('SELL')
-
-            final_signal = None
-            confidence = 0
-            
-            if buy_count >= 2 and sell_count == 0:
-                final_signal = 'BUY'
-            elif sell_count >= 2 and buy_count == 0:
-                final_signal = 'SELL'
+      # Проверка времени отчета
+        if datetime.now() >= next_report_time:
+            send_statistics()
+            next_report_time = datetime.now() + timedelta(hours=3)
 
-            if final_signal:
-                # Коэффициенты уверенности
-                conf_mult = confidence_multiplier(buy_count, sell_count)
+        # Ежедневный отчёт
+        now = datetime.now(ZoneInfo("Europe/Kyiv"))
+        if now >= next_daily_report:
+            send_daily_statistics()
+            next_daily_report = next_hourly_time(now)
 
-                # Волатильность
-                volatility = estimate_volatility(df)
-    
-                # Модифицируем timeout
-                new_timeout = int(adaptive_timeout * (1 + volatility))  # адаптивное время удержания
-        
-                # Передаём коэффициент уверенности в execute_trade
-                execute_trade(symbol, final_signal, confidence=conf_mult, timeout = min(new_timeout, 240))
+        check_exit_conditions()
 
-        except Exception as e:
-            error_message = f"⚠️ Ошибка при обработке {symbol}: {e}"
-            print(f"{error_message}")
-            send_telegram_error(error_message)
-
-  # Проверка времени отчета
-    if datetime.now() >= next_report_time:
-        send_statistics()
-        next_report_time = datetime.now() + timedelta(hours=3)
-
-    # Ежедневный отчёт
-    now = datetime.now(ZoneInfo("Europe/Kyiv"))
-    if now >= next_daily_report:
-        send_daily_statistics()
-        next_daily_report = next_hourly_time(now)
-
-    check_exit_conditions()
-    
-    time.sleep(60 * 5)  # ждем 5 минут до следующей проверки
+        wake_at = time.monotonic() + 60 * 5
+        time.sleep(60 * 5)  # ждем 5 минут до следующей проверки
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+class TelegramNotifier:
+    """
+    Отправка сообщений в Telegram из фонового потока.
+    send()/send_error() только кладут сообщение в очередь и сразу возвращаются,
+    поэтому медленный Telegram не задерживает торговлю.
+    - одинаковые ошибки склеиваются в одно сообщение со счётчиком повторов;
+    - соблюдаются лимиты Telegram (не чаще min_interval секунд и max_per_minute в минуту);
+    - очередь ограничена max_queue, лишние сообщения отбрасываются и учитываются в dropped.
+    """
+
+    def __init__(self, token, chat_id, api_url=TELEGRAM_API_URL, max_queue=100, min_interval=1.0,
+                 max_per_minute=20, error_cooldown=60.0, timeout=10, max_attempts=3):
+        self.token = token
+        self.chat_id = chat_id
+        self.url = f"{api_url}/bot{token}/sendMessage"
+        self.max_queue = max_queue
+        self.min_interval = min_interval
+        self.max_per_minute = max_per_minute
+        self.error_cooldown = error_cooldown
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._dropped_unreported = 0
+
+        self._queue = deque()        # сообщения: {'text', 'parse_mode', 'count', 'not_before', 'key', 'attempts'}
+        self._pending_errors = {}    # текст ошибки -> сообщение в очереди
+        self._last_error_sent = {}   # текст ошибки -> время отправки
+        self._sent_times = deque()   # время отправок за последнюю минуту
+        self._last_sent = 0.0
+        self._cond = threading.Condition()
+        self._running = True
+        self._busy = False
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def send(self, text, parse_mode='Markdown'):
+        self._enqueue({'text': text, 'parse_mode': parse_mode, 'count': 1, 'not_before': 0.0, 'key': None, 'attempts': 0})
+
+    def send_error(self, text):
+        with self._cond:
+            pending = self._pending_errors.get(text)
+            if pending is not None:
+                pending['count'] += 1
+                self.coalesced += 1
+                return
+            # Та же ошибка недавно уже ушла — копим повторы и отправляем после паузы
+            last_sent = self._last_error_sent.get(text)
+            not_before = last_sent + self.error_cooldown if last_sent is not None else 0.0
+        self._enqueue({'text': text, 'parse_mode': None, 'count': 1, 'not_before': not_before, 'key': text, 'attempts': 0})
+
+    def _enqueue(self, message):
+        if not self.token:
+            # Без токена (локальный прогон) сообщения только печатаются
+            print(message['text'])
+            return
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                self._dropped_unreported += 1
+                return
+            self._queue.append(message)
+            if message['key'] is not None:
+                self._pending_errors[message['key']] = message
+            self._cond.notify()
+
+    def flush(self, timeout=10.0):
+        """Ждёт, пока очередь опустеет (для остановки бота и тестов)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self._queue or self._busy) and time.monotonic() < deadline:
+                self._cond.wait(0.05)
+            return not self._queue and not self._busy
+
+    def stop(self, timeout=5.0):
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _next_message(self):
+        """Первое готовое к отправке сообщение с учётом лимитов; иначе — сколько ждать"""
+        now = time.monotonic()
+        while self._sent_times and now - self._sent_times[0] > 60:
+            self._sent_times.popleft()
+        wait = self._last_sent + self.min_interval - now
+        if len(self._sent_times) >= self.max_per_minute:
+            wait = max(wait, self._sent_times[0] + 60 - now)
+        if wait > 0:
+            return None, wait
+        soonest = None
+        for message in self._queue:
+            if message['not_before'] <= now:
+                self._queue.remove(message)
+                if message['key'] is not None:
+                    self._pending_errors.pop(message['key'], None)
+                return message, 0
+            soonest = min(soonest or message['not_before'], message['not_before'])
+        return None, (soonest - now) if soonest else None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                message, wait = None, None
+                while self._running:
+                    message, wait = self._next_message() if self._queue else (None, None)
+                    if message is not None:
+                        break
+                    self._cond.wait(wait)
+                if message is None:
+                    return
+                self._busy = True
+                dropped, self._dropped_unreported = self._dropped_unreported, 0
+            try:
+                self._post(message, dropped)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _post(self, message, dropped):
+        text = message['text']
+        if message['count'] > 1:
+            text += f"\n(повторилось {message['count']} раз)"
+        if dropped:
+            text += f"\n(пропущено сообщений: {dropped})"
+        payload = {'chat_id': self.chat_id, 'text': text}
+        if message['parse_mode']:
+            payload['parse_mode'] = message['parse_mode']
+
+        retry_after = None
+        try:
+            response = self.session.post(self.url, data=payload, timeout=self.timeout)
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get('parameters', {}).get('retry_after', 5)
+                except ValueError:
+                    retry_after = 5
+            elif response.status_code >= 400:
+                # Ошибка запроса (например, разметка Markdown) — повтор не поможет
+                self.failed += 1
+                print(f"[Telegram Error Fail] {response.status_code}: {response.text[:200]}")
+                return
+        except requests.RequestException as e:
+            print(f"[Telegram Error Fail] {e}")
+            retry_after = 2 ** message['attempts']
+
+        with self._cond:
+            now = time.monotonic()
+            self._last_sent = now
+            self._sent_times.append(now)
+            if retry_after is None:
+                self.sent += 1
+                if message['key'] is not None:
+                    self._last_error_sent[message['key']] = now
+                    if len(self._last_error_sent) > 1000:
+                        self._last_error_sent = {
+                            k: t for k, t in self._last_error_sent.items() if now - t < self.error_cooldown
+                        }
+                return
+            message['attempts'] += 1
+            if message['attempts'] >= self.max_attempts:
+                self.failed += 1
+                return
+            # Возвращаем в начало очереди и ждём, сколько попросил Telegram
+            message['not_before'] = now + retry_after
+            self._queue.appendleft(message)
+            if message['key'] is not None:
+                self._pending_errors[message['key']] = message
@@ -0,0 +1,166 @@
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from kline_cache import klines_to_frame
+from backtest import run_backtest
+from strategies import STRATEGY_SIGNALS, required_bars
+import utils
+
+# Пространство поиска: только параметры, которые стратегии реально читают.
+# ema_crossover_strategy работает на фиксированных EMA50/EMA200 и в поиск не входит.
+PARAM_SPACE = {
+    'ema_rsi_strategy':       {'ema_period': [10, 14, 20, 26, 34, 50], 'rsi_period': [8, 10, 14, 21]},
+    'bollinger_rsi_strategy': {'window': [14, 20, 26, 34], 'rsi_period': [8, 10, 14, 21]},
+    'macd_ema_strategy':      {'fast': [8, 12, 16], 'slow': [21, 26, 34], 'signal': [7, 9, 12]},
+    'vwap_rsi_strategy':      {'rsi_period': [8, 10, 14, 21]},
+}
+
+# История, доступная процессам-воркерам (передаётся один раз через initializer)
+_worker_histories = None
+
+
+def sample_candidates(n_candidates, seed=None):
+    """Случайная выборка наборов параметров; первым всегда идёт текущий набор"""
+    rng = random.Random(seed)
+    current = {name: dict(utils.get_strategy_params(name)) for name in PARAM_SPACE}
+    candidates = [current]
+    seen = {json.dumps(current, sort_keys=True)}
+    total = 1
+    for space in PARAM_SPACE.values():
+        for values in space.values():
+            total *= len(values)
+    while len(candidates) < min(n_candidates, total):
+        candidate = {
+            name: {key: rng.choice(values) for key, values in space.items()}
+            for name, space in PARAM_SPACE.items()
+        }
+        # Быстрая EMA должна быть быстрее медленной
+        if candidate['macd_ema_strategy']['fast'] >= candidate['macd_ema_strategy']['slow']:
+            continue
+        key = json.dumps(candidate, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(candidate)
+    return candidates
+
+
+def walk_forward_folds(n_bars, n_folds=3, test_ratio=0.25):
+    """
+    Разбивает историю на последовательные окна (train, test) — test всегда идёт после train.
+    Возвращает список ((train_start, train_end), (test_start, test_end)).
+    """
+    fold_size = n_bars // n_folds
+    test_size = max(int(fold_size * test_ratio), 1)
+    folds = []
+    for k in range(n_folds):
+        start = k * fold_size
+        end = n_bars if k == n_folds - 1 else start + fold_size
+        folds.append(((start, end - test_size), (end - test_size, end)))
+    return folds
+
+
+def _init_worker(histories, strategy_params):
+    global _worker_histories
+    _worker_histories = histories
+    utils.publish_strategy_params(strategy_params)
+
+
+def _backtest_window(df, start, end, candidate, warmup):
+    """
+    Прибыль на участке [start, end). Перед участком берём до warmup баров истории:
+    иначе на коротких test-участках стратегии с долгим прогревом (MACD, EMA200) не голосуют.
+    """
+    context = max(0, start - warmup)
+    window = df.iloc[context:end].reset_index(drop=True)
+    return run_backtest(window, params_by_name=candidate, start_bar=start - context)['profit']
+
+
+def _score_candidate(candidate, n_folds):
+    """Прибыль кандидата на train- и test-участках всех символов (запускается в воркере)"""
+    warmup = required_bars(STRATEGY_SIGNALS, candidate)
+    train_profit = 0.0
+    test_profit = 0.0
+    for df in _worker_histories.values():
+        for (train_start, train_end), (test_start, test_end) in walk_forward_folds(len(df), n_folds):
+            train_profit += _backtest_window(df, train_start, train_end, candidate, warmup)
+            test_profit += _backtest_window(df, test_start, test_end, candidate, warmup)
+    return train_profit, test_profit
+
+
+def optimize(histories, n_candidates=64, n_folds=3, max_workers=None, seed=None):
+    """
+    Случайный поиск параметров с walk-forward проверкой на пуле процессов.
+    Лучший кандидат выбирается по прибыли на train-участках и принимается,
+    только если на отложенных test-участках он не хуже текущих параметров.
+    Возвращает (параметры или None, отчёт).
+    """
+    candidates = sample_candidates(n_candidates, seed)
+    # spawn, а не fork: бот многопоточный, а форк копирует чужие захваченные блокировки.
+    # Воркер начинает с чистого интерпретатора — история и параметры передаются явно
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                             initargs=(histories, utils.strategy_params)) as pool:
+        scores = list(pool.map(_score_candidate, candidates, [n_folds] * len(candidates)))
+
+    best = max(range(len(candidates)), key=lambda i: scores[i][0])
+    baseline_train, baseline_test = scores[0]
+    best_train, best_test = scores[best]
+    report = {
+        'candidates': len(candidates),
+        'baseline': {'train': baseline_train, 'test': baseline_test},
+        'best': {'train': best_train, 'test': best_test, 'params': candidates[best]},
+    }
+    if best == 0 or best_test <= baseline_test:
+        return None, report
+    return candidates[best], report
+
+
+def start_background_optimizer(get_histories, interval_seconds=6 * 60 * 60, n_candidates=64, max_workers=None):
+    """
+    Периодически подбирает параметры в фоне и публикует их через utils.publish_strategy_params.
+    get_histories() должна вернуть {'BTCUSDT': df, ...} из уже закэшированных свечей.
+    """
+    def loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                histories = get_histories()
+                if not histories:
+                    continue
+                params, report = optimize(histories, n_candidates=n_candidates, max_workers=max_workers)
+                if params:
+                    utils.publish_strategy_params(params)
+                    print(f"🔧 Оптимизация: новые параметры {params} "
+                          f"(test: {report['best']['test']:.2f} против {report['baseline']['test']:.2f})")
+                else:
+                    print("🔧 Оптимизация: текущие параметры не хуже найденных")
+            except Exception as e:
+                print(f"❌ Ошибка оптимизации параметров: {e}")
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+    return t
+
+
+if __name__ == '__main__':
+    # python optimizer.py BTCUSDT.json ETHUSDT.json — файлы со свечами в формате client.get_klines
+    # python optimizer.py --store klines DOGEUSDT XRPUSDT — история из KlineStore
+    histories = {}
+    if sys.argv[1] == '--store':
+        from kline_store import KlineStore
+        store = KlineStore(sys.argv[2])
+        for symbol in sys.argv[3:]:
+            histories[symbol] = store.frame(symbol, '5m')
+    else:
+        for path in sys.argv[1:]:
+            with open(path, 'r', encoding='utf-8') as f:
+                histories[path] = klines_to_frame(json.load(f))
+    params, report = optimize(histories)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if params:
+        print("Рекомендуемые параметры:")
+        print(json.dumps(params, indent=2, ensure_ascii=False))
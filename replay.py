@@ -0,0 +1,85 @@
+import argparse
+import os
+import tempfile
+import time
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def replay(data_path, bars=None, speed=0.0, start_bar=100, slippage_bps=2.0, impact_bps=50.0):
+    """
+    Прогоняет торговый цикл бота по записанным свечам на локальной бирже.
+    На каждом баре: сдвиг времени симуляции, скан символов, проверка выходов.
+    speed=0 — без пауз (замер пропускной способности), иначе бар раз в interval/speed секунд.
+    Выходы по тайм-ауту считаются по настоящим часам, поэтому при быстром прогоне срабатывают только TP/SL.
+    """
+    # Настройки main читаются при импорте: биржа — симулятор, журнал — во временный файл
+    os.environ['SIM_DATA'] = data_path
+    os.environ['ACCOUNT_STREAM'] = '0'
+    os.environ['STREAM_MODE'] = '0'
+    os.environ.setdefault('UNIVERSE', 'USDT')  # все пары из файла, а не только raw_symbols
+    os.environ.setdefault('JOURNAL_FILE', os.path.join(tempfile.mkdtemp(prefix='replay_'), 'trade_history.jsonl'))
+    import main
+    main.startup()
+
+    sim = main.client.get()
+    sim.seek(start_bar)
+    sim.slippage_bps = slippage_bps
+    sim.impact_bps = impact_bps
+
+    cycles = []
+    scanned = 0
+    started = time.perf_counter()
+    while (bars is None or len(cycles) < bars) and sim.advance():
+        t0 = time.perf_counter()
+        batch = main.plan_scan()
+        main.scan_symbols(batch)
+        scanned += len(batch)
+        main.check_exit_conditions()
+        cycles.append(time.perf_counter() - t0)
+        if speed:
+            time.sleep(max(0.0, sim.interval_ms / 1000 / speed - cycles[-1]))
+    elapsed = time.perf_counter() - started
+
+    report = sim.stats()
+    report.update({
+        'cycles': len(cycles),
+        'symbols': len(main.symbols),
+        'elapsed': elapsed,
+        'cycles_per_sec': len(cycles) / elapsed if elapsed else None,
+        'symbols_per_sec': scanned / elapsed if elapsed else None,
+        'cycle_p50': percentile(cycles, 0.5),
+        'cycle_p95': percentile(cycles, 0.95),
+        'open_positions': len(main.open_positions),
+        'closed_trades': main.trade_stats.total['total'],
+        'profit': main.trade_stats.total['profit'],
+    })
+    return report
+
+
+if __name__ == '__main__':
+    # python replay.py klines.json --bars 500 — файл {"SYMBOL": [свечи client.get_klines], ...}
+    parser = argparse.ArgumentParser(description='Прогон бота на локальной бирже по записанным свечам')
+    parser.add_argument('data')
+    parser.add_argument('--bars', type=int, default=None)
+    parser.add_argument('--speed', type=float, default=0.0)
+    parser.add_argument('--start-bar', type=int, default=100)
+    parser.add_argument('--slippage-bps', type=float, default=2.0)
+    parser.add_argument('--impact-bps', type=float, default=50.0)
+    args = parser.parse_args()
+
+    report = replay(args.data, args.bars, args.speed, args.start_bar, args.slippage_bps, args.impact_bps)
+
+    def ms(value):
+        return f"{value * 1000:.1f} мс" if value is not None else '—'
+
+    print(f"\n🔁 Циклов: {report['cycles']} × {report['symbols']} символов за {report['elapsed']:.1f} с "
+          f"({report['cycles_per_sec']:.1f} циклов/с, {report['symbols_per_sec']:.0f} символов/с)")
+    print(f"⏱ Цикл: p50 {ms(report['cycle_p50'])}, p95 {ms(report['cycle_p95'])}")
+    print(f"📨 Ордеров: {report['orders']}, задержка бар→ордер: p50 {ms(report['latency_p50'])}, p95 {ms(report['latency_p95'])}")
+    if report['avg_slippage_bps'] is not None:
+        print(f"📉 Среднее проскальзывание: {report['avg_slippage_bps']:.1f} bps")
+    print(f"💼 Закрыто сделок: {report['closed_trades']}, открыто: {report['open_positions']}, прибыль: ${report['profit']:.2f}")
@@ -0,0 +1,205 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+
+# Приоритеты запросов: ордера и цены для выхода идут первыми, свечи — последними
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+METHOD_PRIORITY = {
+    'order_market_buy': PRIORITY_HIGH,
+    'order_market_sell': PRIORITY_HIGH,
+    'create_order': PRIORITY_HIGH,
+    'get_symbol_ticker': PRIORITY_HIGH,
+    'get_account': PRIORITY_NORMAL,
+    'get_asset_balance': PRIORITY_NORMAL,
+    'get_klines': PRIORITY_LOW,
+    'get_historical_klines': PRIORITY_LOW,
+    'get_exchange_info': PRIORITY_LOW,
+    'get_symbol_info': PRIORITY_LOW,
+    'get_ticker': PRIORITY_LOW,
+}
+
+# Вес запросов по документации Binance (REQUEST_WEIGHT); для запросов по всем символам — отдельно
+METHOD_WEIGHT = {
+    'get_klines': 2,
+    'get_historical_klines': 2,
+    'get_symbol_ticker': 2,
+    'get_exchange_info': 20,
+    'get_symbol_info': 20,
+    'get_account': 20,
+    'get_asset_balance': 20,
+    'order_market_buy': 1,
+    'order_market_sell': 1,
+    'create_order': 1,
+    'get_ticker': 2,
+}
+ALL_SYMBOLS_WEIGHT = {
+    'get_symbol_ticker': 4,
+    'get_ticker': 80,
+}
+
+# Ордера неидемпотентны: после таймаута или 5xx неизвестно, исполнился ли ордер,
+# поэтому их повторяем только когда биржа явно отклонила запрос по лимиту
+ORDER_METHODS = {'order_market_buy', 'order_market_sell', 'create_order'}
+
+
+class RateLimitedClient:
+    """
+    Обёртка над binance Client с тем же интерфейсом (client.get_klines(...) и т.д.):
+    - общий пул HTTP-соединений под параллельный скан;
+    - учёт веса за минуту по заголовку X-MBX-USED-WEIGHT-1M;
+    - при нехватке бюджета запросы низкого приоритета ждут следующей минуты, ордера — нет;
+    - повторы с экспоненциальной задержкой и джиттером на 429/418/5xx и сетевых ошибках.
+    """
+
+    def __init__(self, client, weight_limit=6000, low_share=0.6, normal_share=0.85,
+                 max_retries=3, backoff=0.5, pool_size=20):
+        self.client = client
+        self.weight_limit = weight_limit
+        # Доля минутного бюджета, доступная приоритету
+        self.shares = {PRIORITY_HIGH: 1.0, PRIORITY_NORMAL: normal_share, PRIORITY_LOW: low_share}
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.used_weight = 0
+        self.window = self._current_window()
+        self.banned_until = 0.0
+        self.retries = 0
+        self.throttled = 0
+        self._cond = threading.Condition()
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        client.session.mount('https://', adapter)
+        client.session.mount('http://', adapter)
+        # Заголовки веса читаем из ответа каждого запроса: client.response общий для всех потоков
+        # и после параллельного вызова может относиться к чужому запросу
+        client.session.hooks['response'].append(self._on_response)
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        return wrapper
+
+    @staticmethod
+    def _current_window():
+        # Binance считает вес в окне календарной минуты
+        return int(time.time() // 60)
+
+    def _estimate_weight(self, method, kwargs):
+        if method in ALL_SYMBOLS_WEIGHT and 'symbol' not in kwargs:
+            return ALL_SYMBOLS_WEIGHT[method]
+        return METHOD_WEIGHT.get(method, 1)
+
+    def _acquire(self, priority, weight):
+        """Ждёт, пока у приоритета есть бюджет, и резервирует вес"""
+        with self._cond:
+            while True:
+                now = time.time()
+                window = self._current_window()
+                if window != self.window:
+                    self.window = window
+                    self.used_weight = 0
+                    self._cond.notify_all()
+
+                if now < self.banned_until:
+                    wait = self.banned_until - now
+                elif self.used_weight + weight <= self.weight_limit * self.shares[priority]:
+                    self.used_weight += weight
+                    return
+                else:
+                    wait = (self.window + 1) * 60 - now
+                    self.throttled += 1
+                self._cond.wait(max(wait, 0.05))
+
+    def _on_response(self, response, *args, **kwargs):
+        """Хук requests: вызывается в потоке запроса с его собственным ответом"""
+        used = response.headers.get('x-mbx-used-weight-1m')
+        if used is not None:
+            with self._cond:
+                # Заголовок учитывает и чужие запросы с этого IP — он главнее локальной оценки
+                self.used_weight = max(self.used_weight, int(used))
+
+    def _retry_delay(self, attempt, error=None):
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if isinstance(error, BinanceAPIException) and error.status_code in (418, 429):
+            retry_after = error.response.headers.get('Retry-After') if error.response is not None else None
+            if retry_after:
+                delay = max(delay, float(retry_after))
+            with self._cond:
+                self.banned_until = max(self.banned_until, time.time() + delay)
+        return delay
+
+    def _should_retry(self, method, error):
+        if isinstance(error, BinanceAPIException):
+            if error.status_code in (418, 429):
+                return True
+            return error.status_code >= 500 and method not in ORDER_METHODS
+        return method not in ORDER_METHODS
+
+    def call(self, method, *args, **kwargs):
+        priority = METHOD_PRIORITY.get(method, PRIORITY_NORMAL)
+        weight = self._estimate_weight(method, kwargs)
+        func = getattr(self.client, method)
+        attempt = 0
+        while True:
+            self._acquire(priority, weight)
+            try:
+                return func(*args, **kwargs)
+            except (BinanceAPIException, BinanceRequestException,
+                    requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries or not self._should_retry(method, e):
+                    raise
+                delay = self._retry_delay(attempt, e)
+                self.retries += 1
+                print(f"⚠️ {method}: {e} — повтор через {delay:.1f} с")
+                time.sleep(delay)
+                attempt += 1
+
+    def stats(self):
+        return {
+            'used_weight': self.used_weight,
+            'weight_limit': self.weight_limit,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'banned_until': self.banned_until,
+        }
+
+
+class LazyClient:
+    """
+    Клиент, который создаётся при первом обращении к нему (factory()).
+    Конструктор binance Client ходит в сеть, поэтому импорт модулей бота его не создаёт:
+    функции можно импортировать и вызывать офлайн, пока им не нужен REST.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self):
+        return self._client is not None
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
@@ -0,0 +1,119 @@
+import math
+import threading
+
+
+def percentile_ranks(values):
+    """{ключ: значение} -> {ключ: доля значений не больше данного, 0..1}; None — ранг 0"""
+    known = sorted((v, k) for k, v in values.items() if v is not None)
+    ranks = dict.fromkeys(values, 0.0)
+    for i, (_, k) in enumerate(known):
+        ranks[k] = i / (len(known) - 1) if len(known) > 1 else 1.0
+    return ranks
+
+
+class ScanScheduler:
+    """
+    Планировщик скана большого списка символов в пределах бюджета веса REST.
+    Каждому символу — оценка активности 0..1: среднее перцентилей 24h-оборота и волатильности
+    (оборот — из get_ticker по всем парам одним запросом, волатильность — из estimate_volatility
+    после скана). Без достаточного объёма (is_volume_sufficient) оценка снижается.
+    Самые активные должны сканироваться каждый цикл, спящие — раз в max_interval циклов.
+    За цикл берётся не больше budget // symbol_weight символов: сначала с открытыми позициями,
+    затем подошедшие по расписанию (самые просроченные первыми). Не подошедшие символы
+    остаток бюджета не добирают — иначе спящие сканировались бы каждый цикл, как только
+    бюджета хватает. Если весь список влезает в бюджет, сканируется весь.
+    """
+
+    def __init__(self, symbol_weight=2, max_interval=12, low_volume_penalty=0.5):
+        self.symbol_weight = symbol_weight
+        self.max_interval = max_interval
+        self.low_volume_penalty = low_volume_penalty
+        self.cycle = 0
+        self.backlog = 0  # сколько подошедших по расписанию символов не влезло в прошлый цикл
+        self._state = {}  # {'BTCUSDT': {'last': цикл, 'volume', 'volatility', 'volume_ok', 'score'}}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def set_universe(self, symbols):
+        """Новый список символов; накопленная статистика по оставшимся сохраняется"""
+        with self._lock:
+            self._state = {
+                s: self._state.get(s) or {'last': None, 'volume': None, 'volatility': None,
+                                          'volume_ok': True, 'score': 0.0}
+                for s in symbols
+            }
+            self._dirty = True
+
+    def fits(self, budget):
+        """Весь список помещается в бюджет цикла — ранжировать не нужно"""
+        return len(self._state) * self.symbol_weight <= budget
+
+    def update_tickers(self, tickers):
+        """24h-тикеры (client.get_ticker()): оборот в USDT и, пока нет своей оценки, изменение цены"""
+        with self._lock:
+            for ticker in tickers:
+                state = self._state.get(ticker['symbol'])
+                if state is None:
+                    continue
+                state['volume'] = float(ticker['quoteVolume'])
+                if state['last'] is None:
+                    # До первого скана волатильность оцениваем по суточному изменению цены
+                    state['volatility'] = abs(float(ticker['priceChangePercent'])) / 100
+            self._dirty = True
+
+    def record(self, symbol, volatility, volume_ok):
+        """Итог скана символа: estimate_volatility и is_volume_sufficient"""
+        with self._lock:
+            state = self._state.get(symbol)
+            if state is None:
+                return
+            if volatility is not None and math.isfinite(volatility):
+                state['volatility'] = float(volatility)
+            state['volume_ok'] = bool(volume_ok)
+            self._dirty = True
+
+    def _rescore(self):
+        volume = percentile_ranks({s: st['volume'] for s, st in self._state.items()})
+        volatility = percentile_ranks({s: st['volatility'] for s, st in self._state.items()})
+        for symbol, state in self._state.items():
+            score = (volume[symbol] + volatility[symbol]) / 2
+            state['score'] = score if state['volume_ok'] else score * self.low_volume_penalty
+        self._dirty = False
+
+    def interval(self, symbol):
+        """Раз во сколько циклов сканировать символ"""
+        return 1 + round((1 - self._state[symbol]['score']) * (self.max_interval - 1))
+
+    def next_batch(self, budget, pinned=()):
+        """Символы на этот цикл в пределах budget веса; pinned (открытые позиции) — в первую очередь"""
+        with self._lock:
+            self.cycle += 1
+            if self._dirty:
+                self._rescore()
+            capacity = max(0, int(budget // self.symbol_weight))
+            batch = [s for s in dict.fromkeys(pinned) if s in self._state][:capacity]
+            chosen = set(batch)
+
+            queue = []
+            for symbol, state in self._state.items():
+                if symbol in chosen:
+                    continue
+                if state['last'] is None:
+                    overdue = math.inf  # ещё не сканировали
+                else:
+                    overdue = (self.cycle - state['last']) / self.interval(symbol)
+                queue.append((overdue, state['score'], symbol))
+            queue.sort(reverse=True)
+
+            if len(self._state) > capacity:
+                queue = [item for item in queue if item[0] >= 1]  # только подошедшие по расписанию
+            free = capacity - len(batch)
+            batch.extend(symbol for _, _, symbol in queue[:free])
+            self.backlog = sum(1 for overdue, _, _ in queue[free:] if overdue >= 1)
+            for symbol in batch:
+                self._state[symbol]['last'] = self.cycle
+            return batch
+
+    def stats(self):
+        with self._lock:
+            return {'universe': len(self._state), 'backlog': self.backlog, 'cycle': self.cycle}
@@ -0,0 +1,244 @@
+import bisect
+import itertools
+import json
+import math
+import threading
+import time
+
+from kline_cache import INTERVAL_MS
+
+
+class SimExchangeError(Exception):
+    """Отказ симулятора в формате ошибок Binance (code + msg)"""
+
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+        super().__init__(f"APIError(code={code}): {message}")
+
+
+def _fmt(value):
+    return format(value, '.8f')
+
+
+class SimExchange:
+    """
+    Локальная биржа для прогонов без сети.
+    Реализует те методы Client, которые использует бот, поверх записанных свечей:
+    видны только бары, открытые не позже текущего времени симуляции (now_ms).
+    Время двигается вручную (advance) или фоновым потоком со скоростью speed (start_clock).
+    Рыночные ордера исполняются по close последнего бара с проскальзыванием:
+    slippage_bps + impact_bps * (объём ордера / оборот бара в USDT).
+    Комиссия списывается в USDT, чтобы закрытие позиции видело весь купленный объём.
+    """
+
+    def __init__(self, klines_by_symbol, interval='5m', start_bar=100, balances=None,
+                 slippage_bps=2.0, impact_bps=50.0, fee_rate=0.001, min_notional=5.0):
+        self.interval_ms = INTERVAL_MS[interval]
+        self.klines = {s: list(k) for s, k in klines_by_symbol.items() if k}
+        self._open_times = {s: [int(k[0]) for k in kl] for s, kl in self.klines.items()}
+        self.slippage_bps = slippage_bps
+        self.impact_bps = impact_bps
+        self.fee_rate = fee_rate
+        self.min_notional = min_notional
+        self.balances = dict(balances or {'USDT': 1000.0})
+
+        self.start_ms = min(times[0] for times in self._open_times.values())
+        self.end_ms = max(times[-1] for times in self._open_times.values())
+        self.now_ms = self.start_ms + start_bar * self.interval_ms
+
+        self.orders = []
+        self._order_ids = itertools.count(1)
+        self._bar_published = time.perf_counter()  # когда стал виден текущий бар — от него меряем задержку ордера
+        self._lock = threading.Lock()
+        self._clock = None
+        self.response = None  # интерфейс Client: последний HTTP-ответ
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """JSON вида {"BTCUSDT": [свечи в формате client.get_klines], ...}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    # ⏱ Время симуляции
+
+    def advance(self, bars=1):
+        """Сдвигает время на bars свечей; False, если данные закончились"""
+        with self._lock:
+            if self.now_ms >= self.end_ms:
+                return False
+            self.now_ms = min(self.now_ms + bars * self.interval_ms, self.end_ms)
+            self._bar_published = time.perf_counter()
+            return True
+
+    def seek(self, bar):
+        """Ставит время симуляции на открытие бара с номером bar"""
+        with self._lock:
+            self.now_ms = min(self.start_ms + bar * self.interval_ms, self.end_ms)
+
+    def start_clock(self, speed=1.0):
+        """Воспроизводит свечи в фоне: speed=60 — час данных за минуту"""
+        def run():
+            while self.advance():
+                time.sleep(self.interval_ms / 1000 / speed)
+        self._clock = threading.Thread(target=run, daemon=True)
+        self._clock.start()
+
+    def _visible(self, symbol):
+        klines = self.klines.get(symbol)
+        if klines is None:
+            raise SimExchangeError(-1121, 'Invalid symbol.')
+        return klines, bisect.bisect_right(self._open_times[symbol], self.now_ms)
+
+    def _last_bar(self, symbol):
+        klines, end = self._visible(symbol)
+        if end == 0:
+            raise SimExchangeError(-1121, 'Invalid symbol.')
+        return klines[end - 1]
+
+    # 📈 Рыночные данные
+
+    def get_klines(self, symbol, interval=None, limit=500, startTime=None, endTime=None, **kwargs):
+        klines, end = self._visible(symbol)
+        if endTime is not None:
+            end = min(end, bisect.bisect_right(self._open_times[symbol], endTime))
+        if startTime is not None:
+            start = bisect.bisect_left(self._open_times[symbol], startTime)
+            return [list(k) for k in klines[start:min(end, start + limit)]]
+        return [list(k) for k in klines[max(0, end - limit):end]]
+
+    def get_symbol_ticker(self, symbol=None, **kwargs):
+        if symbol is not None:
+            return {'symbol': symbol, 'price': str(self._last_bar(symbol)[4])}
+        return [{'symbol': s, 'price': str(self._last_bar(s)[4])}
+                for s in self.klines if self._visible(s)[1]]
+
+    def get_ticker(self, symbol=None, **kwargs):
+        """24h-статистика по последним суткам видимых баров (оборот, изменение цены)"""
+        def ticker(s):
+            klines, end = self._visible(s)
+            day = klines[max(0, end - 24 * 60 * 60_000 // self.interval_ms):end]
+            open_price = float(day[0][1])
+            last_price = float(day[-1][4])
+            return {
+                'symbol': s,
+                'lastPrice': str(last_price),
+                'priceChangePercent': str((last_price - open_price) / open_price * 100),
+                'volume': str(sum(float(k[5]) for k in day)),
+                'quoteVolume': str(sum(float(k[7]) for k in day)),
+            }
+        if symbol is not None:
+            self._last_bar(symbol)
+            return ticker(symbol)
+        return [ticker(s) for s in self.klines if self._visible(s)[1]]
+
+    def get_symbol_info(self, symbol):
+        if symbol not in self.klines:
+            return None
+        # Шаги подбираем от цены: лот ~ сотые доли min_notional, цена — 5 значащих цифр
+        price = float(self.klines[symbol][0][4])
+        step = min(1.0, max(1e-8, 10 ** math.floor(math.log10(self.min_notional / price) - 2)))
+        tick = max(1e-8, 10 ** (math.floor(math.log10(price)) - 4))
+        return {
+            'symbol': symbol,
+            'status': 'TRADING',
+            'baseAsset': self._base_asset(symbol),
+            'quoteAsset': 'USDT',
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'minPrice': _fmt(tick), 'maxPrice': '1000000.00000000', 'tickSize': _fmt(tick)},
+                {'filterType': 'LOT_SIZE', 'minQty': _fmt(step), 'maxQty': '9000000000.00000000', 'stepSize': _fmt(step)},
+                {'filterType': 'NOTIONAL', 'minNotional': _fmt(self.min_notional)},
+            ],
+        }
+
+    def get_exchange_info(self):
+        return {
+            'timezone': 'UTC',
+            'serverTime': self.now_ms,
+            'symbols': [self.get_symbol_info(s) for s in self.klines],
+        }
+
+    # 💰 Баланс и ордера
+
+    def get_asset_balance(self, asset, **kwargs):
+        with self._lock:
+            if asset not in self.balances:
+                return None
+            return {'asset': asset, 'free': _fmt(self.balances[asset]), 'locked': _fmt(0.0)}
+
+    def get_account(self, **kwargs):
+        with self._lock:
+            balances = [{'asset': a, 'free': _fmt(v), 'locked': _fmt(0.0)} for a, v in self.balances.items()]
+        return {'canTrade': True, 'updateTime': self.now_ms, 'balances': balances}
+
+    def order_market_buy(self, symbol, quantity, **kwargs):
+        return self._fill(symbol, 'BUY', float(quantity))
+
+    def order_market_sell(self, symbol, quantity, **kwargs):
+        return self._fill(symbol, 'SELL', float(quantity))
+
+    def _fill(self, symbol, side, qty):
+        bar = self._last_bar(symbol)
+        price = float(bar[4])
+        notional = qty * price
+        if qty <= 0 or notional < self.min_notional:
+            raise SimExchangeError(-1013, 'Filter failure: NOTIONAL')
+
+        quote_volume = float(bar[7]) if len(bar) > 7 else 0.0
+        impact = self.impact_bps * notional / quote_volume if quote_volume > 0 else self.impact_bps
+        slippage = (self.slippage_bps + impact) / 10000
+        fill_price = price * (1 + slippage) if side == 'BUY' else price * (1 - slippage)
+        cost = qty * fill_price
+        fee = cost * self.fee_rate
+        base = self._base_asset(symbol)
+
+        with self._lock:
+            if side == 'BUY':
+                if self.balances.get('USDT', 0.0) < cost + fee:
+                    raise SimExchangeError(-2010, 'Account has insufficient balance for requested action.')
+                self.balances['USDT'] -= cost + fee
+                self.balances[base] = self.balances.get(base, 0.0) + qty
+            else:
+                if self.balances.get(base, 0.0) < qty:
+                    raise SimExchangeError(-2010, 'Account has insufficient balance for requested action.')
+                self.balances[base] -= qty
+                self.balances['USDT'] = self.balances.get('USDT', 0.0) + cost - fee
+
+            order = {
+                'symbol': symbol,
+                'orderId': next(self._order_ids),
+                'transactTime': self.now_ms,
+                'side': side,
+                'type': 'MARKET',
+                'status': 'FILLED',
+                'origQty': _fmt(qty),
+                'executedQty': _fmt(qty),
+                'cummulativeQuoteQty': _fmt(cost),
+                'fills': [{'price': _fmt(fill_price), 'qty': _fmt(qty), 'commission': _fmt(fee), 'commissionAsset': 'USDT'}],
+            }
+            self.orders.append({
+                'order': order,
+                'price': price,
+                'fill_price': fill_price,
+                'slippage_bps': slippage * 10000,
+                'latency': time.perf_counter() - self._bar_published,
+            })
+        return order
+
+    @staticmethod
+    def _base_asset(symbol):
+        return symbol[:-4] if symbol.endswith('USDT') else symbol
+
+    def stats(self):
+        latencies = sorted(o['latency'] for o in self.orders)
+
+        def pct(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+        return {
+            'orders': len(self.orders),
+            'latency_p50': pct(0.5),
+            'latency_p95': pct(0.95),
+            'avg_slippage_bps': sum(o['slippage_bps'] for o in self.orders) / len(self.orders) if self.orders else None,
+            'balances': dict(self.balances),
+        }
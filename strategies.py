@@ -1,115 +1,289 @@
 import pandas as pd
 import numpy as np
-from indicators import compute_rsi
+from indicators import IndicatorEngine, stochastic_rsi
+
+# Все стратегии берут индикаторы из общего IndicatorEngine: если main.py передаёт
+# один engine на df, RSI/MACD/Боллинджер считаются один раз на символ за цикл.
 
 # 📌 EMA + RSI
-def ema_rsi_strategy(df, params=None):
+def ema_rsi_strategy(df, params=None, engine=None):
     params = params or {}
+    engine = engine or IndicatorEngine(df)
     period = params['ema_period']
-    df['EMA20'] = df['close'].ewm(span=period).mean()
-    df['RSI'] = compute_rsi(df['close'], period = params['rsi_period'])
-    latest = df.iloc[-1]
-    if latest['close'] > latest['EMA20'] and latest['RSI'] < 70:
+    ema = engine.ema(period)
+    rsi = engine.rsi(params['rsi_period'])
+    close = df['close'].iloc[-1]
+    if close > ema.iloc[-1] and rsi.iloc[-1] < 70:
         return 'BUY'
-    elif latest['close'] < latest['EMA20'] and latest['RSI'] > 30:
+    elif close < ema.iloc[-1] and rsi.iloc[-1] > 30:
         return 'SELL'
     return None
 
 # 📌 Bollinger + RSI
-def bollinger_rsi_strategy(df, params=None):
-    df['MA20'] = df['close'].rolling(window=20).mean()
-    df['STD'] = df['close'].rolling(window=20).std()
-    df['Upper'] = df['MA20'] + 2 * df['STD']
-    df['Lower'] = df['MA20'] - 2 * df['STD']
-    df['RSI'] = compute_rsi(df['close'])
-    latest = df.iloc[-1]
-    if latest['close'] < latest['Lower'] and latest['RSI'] < 30:
+def bollinger_rsi_strategy(df, params=None, engine=None):
+    params = params or {}
+    engine = engine or IndicatorEngine(df)
+    _, upper, lower = engine.bollinger(params.get('window', 20))
+    rsi = engine.rsi(params.get('rsi_period', 14))
+    close = df['close'].iloc[-1]
+    if close < lower.iloc[-1] and rsi.iloc[-1] < 30:
         return 'BUY'
-    elif latest['close'] > latest['Upper'] and latest['RSI'] > 70:
+    elif close > upper.iloc[-1] and rsi.iloc[-1] > 70:
         return 'SELL'
     return None
 
 # 📌 MACD + EMA
-def macd_ema_strategy(df, params=None):
-    df['EMA12'] = df['close'].ewm(span=12).mean()
-    df['EMA26'] = df['close'].ewm(span=26).mean()
-    df['MACD'] = df['EMA12'] - df['EMA26']
-    df['Signal'] = df['MACD'].ewm(span=9).mean()
-    latest = df.iloc[-1]
-    prev = df.iloc[-2]
-    if prev['MACD'] < prev['Signal'] and latest['MACD'] > latest['Signal']:
+def macd_ema_strategy(df, params=None, engine=None):
+    params = params or {}
+    engine = engine or IndicatorEngine(df)
+    macd, signal = engine.macd(params.get('fast', 12), params.get('slow', 26), params.get('signal', 9))
+    if macd.iloc[-2] < signal.iloc[-2] and macd.iloc[-1] > signal.iloc[-1]:
         return 'BUY'
-    elif prev['MACD'] > prev['Signal'] and latest['MACD'] < latest['Signal']:
+    elif macd.iloc[-2] > signal.iloc[-2] and macd.iloc[-1] < signal.iloc[-1]:
         return 'SELL'
     return None
 
 # 📌 VWAP + RSI
-def vwap_rsi_strategy(df, params=None):
-    q = df['volume']
-    p = df['close']
-    df['VWAP'] = (p * q).cumsum() / q.cumsum()
-    df['RSI'] = compute_rsi(df['close'])
-    latest = df.iloc[-1]
-    if latest['close'] > latest['VWAP'] and latest['RSI'] < 70:
+def vwap_rsi_strategy(df, params=None, engine=None):
+    params = params or {}
+    engine = engine or IndicatorEngine(df)
+    vwap = engine.vwap(params.get('vwap_window', 100))
+    rsi = engine.rsi(params.get('rsi_period', 14))
+    close = df['close'].iloc[-1]
+    if close > vwap.iloc[-1] and rsi.iloc[-1] < 70:
         return 'BUY'
-    elif latest['close'] < latest['VWAP'] and latest['RSI'] > 30:
+    elif close < vwap.iloc[-1] and rsi.iloc[-1] > 30:
         return 'SELL'
     return None
 
-# 📌 Stochastic RSI helper
-def stochastic_rsi(close, period=14, smoothK=3, smoothD=3):
-    rsi = compute_rsi(close, period)
-    min_rsi = rsi.rolling(window=period).min()
-    max_rsi = rsi.rolling(window=period).max()
-    stoch_rsi = (rsi - min_rsi) / (max_rsi - min_rsi)
-    k = stoch_rsi.rolling(window=smoothK).mean()
-    d = k.rolling(window=smoothD).mean()
-    return k, d
-
 # 📌 MACD + Stochastic RSI
-def macd_stochastic_strategy(df, params=None):
-    df['EMA12'] = df['close'].ewm(span=12).mean()
-    df['EMA26'] = df['close'].ewm(span=26).mean()
-    df['MACD'] = df['EMA12'] - df['EMA26']
-    df['Signal'] = df['MACD'].ewm(span=9).mean()
-    df['StochK'], df['StochD'] = stochastic_rsi(df['close'])
-    latest = df.iloc[-1]
-    prev = df.iloc[-2]
+def macd_stochastic_strategy(df, params=None, engine=None):
+    engine = engine or IndicatorEngine(df)
+    macd, signal = engine.macd(12, 26, 9)
+    k, d = engine.stoch_rsi(14, 3, 3)
     if (
-        prev['MACD'] < prev['Signal'] and latest['MACD'] > latest['Signal']
-        and prev['StochK'] < prev['StochD'] and latest['StochK'] > latest['StochD']
+        macd.iloc[-2] < signal.iloc[-2] and macd.iloc[-1] > signal.iloc[-1]
+        and k.iloc[-2] < d.iloc[-2] and k.iloc[-1] > d.iloc[-1]
     ):
         return 'BUY'
     elif (
-        prev['MACD'] > prev['Signal'] and latest['MACD'] < latest['Signal']
-        and prev['StochK'] > prev['StochD'] and latest['StochK'] < latest['StochD']
+        macd.iloc[-2] > signal.iloc[-2] and macd.iloc[-1] < signal.iloc[-1]
+        and k.iloc[-2] > d.iloc[-2] and k.iloc[-1] < d.iloc[-1]
     ):
         return 'SELL'
     return None
 
 # 📌 Bollinger + Volume Spike
-def bollinger_volume_strategy(df, volume_threshold=1.5, params=None):
-    df['MA20'] = df['close'].rolling(window=20).mean()
-    df['STD'] = df['close'].rolling(window=20).std()
-    df['Upper'] = df['MA20'] + 2 * df['STD']
-    df['Lower'] = df['MA20'] - 2 * df['STD']
-    df['Volume_MA20'] = df['volume'].rolling(window=20).mean()
-    latest = df.iloc[-1]
-    volume_spike = latest['volume'] > volume_threshold * latest['Volume_MA20']
-    if latest['close'] > latest['Upper'] and volume_spike:
+def bollinger_volume_strategy(df, volume_threshold=1.5, params=None, engine=None):
+    engine = engine or IndicatorEngine(df)
+    _, upper, lower = engine.bollinger(20)
+    volume_ma = engine.sma(20, column='volume')
+    close = df['close'].iloc[-1]
+    volume_spike = df['volume'].iloc[-1] > volume_threshold * volume_ma.iloc[-1]
+    if close > upper.iloc[-1] and volume_spike:
         return 'SELL'
-    elif latest['close'] < latest['Lower'] and volume_spike:
+    elif close < lower.iloc[-1] and volume_spike:
         return 'BUY'
     return None
 
 # 📌 EMA50 / EMA200 crossover
-def ema_crossover_strategy(df, params=None):
-    df['EMA50'] = df['close'].ewm(span=50).mean()
-    df['EMA200'] = df['close'].ewm(span=200).mean()
-    latest = df.iloc[-1]
-    prev = df.iloc[-2]
-    if prev['EMA50'] < prev['EMA200'] and latest['EMA50'] > latest['EMA200']:
+def ema_crossover_strategy(df, params=None, engine=None):
+    engine = engine or IndicatorEngine(df)
+    fast = engine.ema(50)
+    slow = engine.ema(200)
+    if fast.iloc[-2] < slow.iloc[-2] and fast.iloc[-1] > slow.iloc[-1]:
         return 'BUY'
-    elif prev['EMA50'] > prev['EMA200'] and latest['EMA50'] < latest['EMA200']:
+    elif fast.iloc[-2] > slow.iloc[-2] and fast.iloc[-1] < slow.iloc[-1]:
         return 'SELL'
     return None
+
+
+# ============================================================
+# Векторные версии: сигнал BUY/SELL/None на каждом баре за один проход.
+# Значение на баре i совпадает с тем, что вернула бы обычная стратегия на df.iloc[:i + 1].
+# ============================================================
+
+def _to_signals(index, buy, sell):
+    buy = np.asarray(buy, dtype=bool)
+    sell = np.asarray(sell, dtype=bool)
+    return pd.Series(np.where(buy, 'BUY', np.where(sell, 'SELL', None)), index=index, dtype=object)
+
+def _cross_up(a, b):
+    return (a.shift(1) < b.shift(1)) & (a > b)
+
+def _cross_down(a, b):
+    return (a.shift(1) > b.shift(1)) & (a < b)
+
+def ema_rsi_signals(df, params=None, engine=None):
+    params = params or {}
+    engine = engine or IndicatorEngine(df)
+    ema = engine.ema(params['ema_period'])
+    rsi = engine.rsi(params['rsi_period'])
+    close = df['close']
+    return _to_signals(df.index, (close > ema) & (rsi < 70), (close < ema) & (rsi > 30))
+
+def bollinger_rsi_signals(df, params=None, engine=None):
+    params = params or {}
+    engine = engine or IndicatorEngine(df)
+    _, upper, lower = engine.bollinger(params.get('window', 20))
+    rsi = engine.rsi(params.get('rsi_period', 14))
+    close = df['close']
+    return _to_signals(df.index, (close < lower) & (rsi < 30), (close > upper) & (rsi > 70))
+
+def macd_ema_signals(df, params=None, engine=None):
+    params = params or {}
+    engine = engine or IndicatorEngine(df)
+    macd, signal = engine.macd(params.get('fast', 12), params.get('slow', 26), params.get('signal', 9))
+    return _to_signals(df.index, _cross_up(macd, signal), _cross_down(macd, signal))
+
+def vwap_rsi_signals(df, params=None, engine=None):
+    params = params or {}
+    engine = engine or IndicatorEngine(df)
+    vwap = engine.vwap(params.get('vwap_window', 100))
+    rsi = engine.rsi(params.get('rsi_period', 14))
+    close = df['close']
+    return _to_signals(df.index, (close > vwap) & (rsi < 70), (close < vwap) & (rsi > 30))
+
+def macd_stochastic_signals(df, params=None, engine=None):
+    engine = engine or IndicatorEngine(df)
+    macd, signal = engine.macd(12, 26, 9)
+    k, d = engine.stoch_rsi(14, 3, 3)
+    return _to_signals(
+        df.index,
+        _cross_up(macd, signal) & _cross_up(k, d),
+        _cross_down(macd, signal) & _cross_down(k, d),
+    )
+
+def bollinger_volume_signals(df, volume_threshold=1.5, params=None, engine=None):
+    engine = engine or IndicatorEngine(df)
+    _, upper, lower = engine.bollinger(20)
+    volume_ma = engine.sma(20, column='volume')
+    close = df['close']
+    volume_spike = df['volume'] > volume_threshold * volume_ma
+    # В обычной версии SELL проверяется первым
+    sell = (close > upper) & volume_spike
+    buy = (close < lower) & volume_spike & ~sell
+    return _to_signals(df.index, buy, sell)
+
+def ema_crossover_signals(df, params=None, engine=None):
+    engine = engine or IndicatorEngine(df)
+    fast = engine.ema(50)
+    slow = engine.ema(200)
+    return _to_signals(df.index, _cross_up(fast, slow), _cross_down(fast, slow))
+
+# 📋 Реестр стратегий: функция, векторная версия, индикаторы, параметры по умолчанию,
+# таймфрейм (None — базовый интервал бота) и прогрев — сколько баров этого таймфрейма нужно,
+# чтобы индикаторы на последнем баре были достоверны.
+# Прогрев зависит от параметров (их меняет оптимизатор), поэтому задан функцией.
+
+EMA_WARMUP_SPANS = 3  # EMA считаем сошедшейся через 3 периода: вес неучтённой истории < 0.3%
+
+def _ema_bars(span):
+    return EMA_WARMUP_SPANS * span
+
+def _rsi_bars(period):
+    # Первое значение RSI — на баре period (нужна разность цен и полное окно)
+    return period + 1
+
+def _macd_bars(fast, slow, signal):
+    return _ema_bars(max(fast, slow)) + _ema_bars(signal)
+
+def _stoch_rsi_bars(period, smoothK, smoothD):
+    return _rsi_bars(period) + (period - 1) + (smoothK - 1) + (smoothD - 1)
+
+STRATEGY_REGISTRY = {
+    'ema_rsi_strategy': {
+        'func': ema_rsi_strategy,
+        'signals': ema_rsi_signals,
+        'indicators': ('ema', 'rsi'),
+        'timeframe': None,
+        'params': {'ema_period': 20, 'rsi_period': 14},
+        'warmup': lambda p: max(_ema_bars(p['ema_period']), _rsi_bars(p['rsi_period'])),
+    },
+    'bollinger_rsi_strategy': {
+        'func': bollinger_rsi_strategy,
+        'signals': bollinger_rsi_signals,
+        'indicators': ('bollinger', 'rsi'),
+        'timeframe': None,
+        'params': {'window': 20, 'rsi_period': 14},
+        'warmup': lambda p: max(p['window'], _rsi_bars(p['rsi_period'])),
+    },
+    'macd_ema_strategy': {
+        'func': macd_ema_strategy,
+        'signals': macd_ema_signals,
+        'indicators': ('macd',),
+        'timeframe': None,
+        'params': {'fast': 12, 'slow': 26, 'signal': 9},
+        # +1: пересечение сравнивает два последних бара
+        'warmup': lambda p: _macd_bars(p['fast'], p['slow'], p['signal']) + 1,
+    },
+    'vwap_rsi_strategy': {
+        'func': vwap_rsi_strategy,
+        'signals': vwap_rsi_signals,
+        'indicators': ('vwap', 'rsi'),
+        'timeframe': None,
+        # VWAP по скользящему окну: накопительный зависел бы от длины загруженной истории
+        'params': {'rsi_period': 14, 'vwap_window': 100},
+        'warmup': lambda p: max(p['vwap_window'], _rsi_bars(p['rsi_period'])),
+    },
+    'macd_stochastic_strategy': {
+        'func': macd_stochastic_strategy,
+        'signals': macd_stochastic_signals,
+        'indicators': ('macd', 'stoch_rsi'),
+        'timeframe': None,
+        'params': {},
+        'warmup': lambda p: max(_macd_bars(12, 26, 9), _stoch_rsi_bars(14, 3, 3)) + 1,
+    },
+    'bollinger_volume_strategy': {
+        'func': bollinger_volume_strategy,
+        'signals': bollinger_volume_signals,
+        'indicators': ('bollinger', 'volume_sma'),
+        'timeframe': None,
+        'params': {},
+        'warmup': lambda p: 20,
+    },
+    'ema_crossover_strategy': {
+        'func': ema_crossover_strategy,
+        'signals': ema_crossover_signals,
+        'indicators': ('ema',),
+        'timeframe': None,
+        'params': {},  # фиксированные EMA50/EMA200
+        'warmup': lambda p: _ema_bars(200) + 1,
+    },
+}
+
+# Векторная версия для каждой стратегии
+STRATEGY_SIGNALS = {name: spec['signals'] for name, spec in STRATEGY_REGISTRY.items()}
+
+
+def strategy_warmup(name, params=None):
+    """Минимум баров, с которого стратегия даёт осмысленный сигнал"""
+    spec = STRATEGY_REGISTRY[name]
+    return spec['warmup']({**spec['params'], **(params or {})})
+
+
+def required_bars(names, params_by_name=None):
+    """Сколько баров нужно загрузить, чтобы прогрелись все перечисленные стратегии"""
+    params_by_name = params_by_name or {}
+    return max((strategy_warmup(name, params_by_name.get(name)) for name in names), default=0)
+
+
+# 📌 Консенсус стратегий
+def consensus_signal(buy_count, sell_count):
+    """Подтверждение от минимум 2 стратегий без противоположных сигналов"""
+    if buy_count >= 2 and sell_count == 0:
+        return 'BUY'
+    elif sell_count >= 2 and buy_count == 0:
+        return 'SELL'
+    return None
+
+def confidence_multiplier(buy_count, sell_count):
+    count = max(buy_count, sell_count)
+    if count >= 4:
+        return 1.2  # высокая уверенность
+    elif count == 3:
+        return 1.1
+    elif count == 2:
+        return 1.0
+    else:
+        return 0.9  # слабый сигнал
@@ -0,0 +1,106 @@
+import queue
+import threading
+import time
+
+
+class MarketStream:
+    """
+    Подписка на комбинированные потоки kline и bookTicker по всем символам.
+    Держит локальный кэш свечей и последние цены в актуальном состоянии:
+    on_bar_close(symbol) вызывается при закрытии свечи, on_tick(symbol, price) — на каждом тике.
+    """
+
+    def __init__(self, manager, symbols, interval, kline_cache, on_bar_close=None, on_tick=None):
+        self.manager = manager  # ThreadedWebsocketManager или FakeStreamManager
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.kline_cache = kline_cache
+        self.on_bar_close = on_bar_close
+        self.on_tick = on_tick
+
+        self.prices = {}  # {'BTCUSDT': (цена, время получения)}
+        self._bar_queue = queue.Queue()
+        self._pending_ticks = {}  # последние непрочитанные цены — тики схлопываются
+        self._ticks_lock = threading.Lock()
+        self._tick_event = threading.Event()
+        self._socket = None
+        self._running = False
+
+    def streams(self):
+        names = []
+        for symbol in self.symbols:
+            names.append(f"{symbol.lower()}@kline_{self.interval}")
+            names.append(f"{symbol.lower()}@bookTicker")
+        return names
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._bar_worker, daemon=True).start()
+        threading.Thread(target=self._tick_worker, daemon=True).start()
+        # Менеджер запускает вызывающий код — он может быть общим с user data stream
+        self._socket = self.manager.start_multiplex_socket(callback=self.handle_message, streams=self.streams())
+
+    def stop(self):
+        self._running = False
+        self._tick_event.set()
+        self._bar_queue.put(None)
+        if self._socket is not None:
+            self.manager.stop_socket(self._socket)
+            self._socket = None
+
+    def get_price(self, symbol, max_age=30):
+        """Последняя цена из потока, если она не старше max_age секунд"""
+        entry = self.prices.get(symbol)
+        if entry is None or time.time() - entry[1] > max_age:
+            return None
+        return entry[0]
+
+    def handle_message(self, msg):
+        data = msg.get('data', msg)
+        if data.get('e') == 'error':
+            print(f"⚠️ Ошибка WebSocket-потока: {data.get('m')}")
+        elif data.get('e') == 'kline':
+            self._on_kline(data)
+        elif 'b' in data and 'a' in data:
+            self._on_book_ticker(data)
+
+    def _on_kline(self, data):
+        symbol = data['s']
+        k = data['k']
+        # Приводим к формату строки client.get_klines
+        bar = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'], k['q'], k['n'], k['V'], k['Q'], k['B']]
+        self.kline_cache.apply_bar(symbol, bar)
+        if k['x']:
+            self._bar_queue.put(symbol)
+
+    def _on_book_ticker(self, data):
+        symbol = data['s']
+        price = (float(data['b']) + float(data['a'])) / 2
+        self.prices[symbol] = (price, time.time())
+        with self._ticks_lock:
+            self._pending_ticks[symbol] = price
+        self._tick_event.set()
+
+    def _bar_worker(self):
+        while self._running:
+            symbol = self._bar_queue.get()
+            if symbol is None or not self.on_bar_close:
+                continue
+            try:
+                self.on_bar_close(symbol)
+            except Exception as e:
+                print(f"❌ Ошибка обработки закрытия свечи {symbol}: {e}")
+
+    def _tick_worker(self):
+        while self._running:
+            self._tick_event.wait()
+            self._tick_event.clear()
+            with self._ticks_lock:
+                ticks, self._pending_ticks = self._pending_ticks, {}
+            if not self.on_tick:
+                continue
+            for symbol, price in ticks.items():
+                try:
+                    self.on_tick(symbol, price)
+                except Exception as e:
+                    print(f"❌ Ошибка обработки тика {symbol}: {e}")
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+
+# Значения по умолчанию — те же запасные варианты, что были в коде сделок
+DEFAULT_STEP_SIZE = 0.00001
+DEFAULT_MIN_NOTIONAL = 10.0
+
+SNAPSHOT_VERSION = 1  # меняется вместе с форматом parse_symbol_filters — старый снимок не читаем
+SNAPSHOT_FIELDS = {
+    'symbol': str,
+    'step_size': float,
+    'min_qty': float,
+    'min_notional': float,
+    'qty_precision': int,
+}
+
+
+def step_precision(step):
+    """Количество знаков после запятой для шага (0.001 -> 3)"""
+    return int(round(-np.log10(step)))
+
+
+def parse_symbol_filters(info):
+    """Достаёт нужные для ордеров фильтры из описания символа (exchangeInfo / get_symbol_info)"""
+    result = {
+        'symbol': info['symbol'],
+        'status': info.get('status'),
+        'base_asset': info.get('baseAsset'),
+        'quote_asset': info.get('quoteAsset'),
+        'step_size': DEFAULT_STEP_SIZE,
+        'min_qty': 0.0,
+        'max_qty': None,
+        'min_notional': DEFAULT_MIN_NOTIONAL,
+        'tick_size': None,
+    }
+    for f in info.get('filters', []):
+        if f['filterType'] == 'LOT_SIZE':
+            result['step_size'] = float(f['stepSize'])
+            result['min_qty'] = float(f['minQty'])
+            result['max_qty'] = float(f['maxQty'])
+        elif f['filterType'] in ('MIN_NOTIONAL', 'NOTIONAL'):
+            # Старые символы отдают MIN_NOTIONAL, новые — NOTIONAL; поле minNotional у обоих
+            result['min_notional'] = float(f['minNotional'])
+        elif f['filterType'] == 'PRICE_FILTER':
+            result['tick_size'] = float(f['tickSize'])
+    result['qty_precision'] = step_precision(result['step_size'])
+    result['price_precision'] = step_precision(result['tick_size']) if result['tick_size'] else None
+    return result
+
+
+def _valid_filters(symbol, filters):
+    """Проверка записи снимка: нужные поля нужных типов, шаг и минимумы не отрицательные"""
+    if not isinstance(filters, dict) or filters.get('symbol') != symbol:
+        return False
+    for field, kind in SNAPSHOT_FIELDS.items():
+        value = filters.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float) if kind is float else kind):
+            return False
+    return filters['step_size'] > 0 and filters['min_qty'] >= 0 and filters['min_notional'] >= 0
+
+
+class SymbolFilterStore:
+    """
+    Фильтры всех символов из одного ответа get_exchange_info().
+    Сделки читают их из памяти, а не запрашивают get_symbol_info перед каждым ордером.
+    Обновляется в фоне раз в ttl секунд.
+    С snapshot_path разобранные фильтры (а не весь exchangeInfo) сохраняются на диск:
+    после перезапуска они читаются за миллисекунды, а свежий exchangeInfo качается в фоне.
+    """
+
+    def __init__(self, client, exchange_info=None, ttl=60 * 60, snapshot_path=None):
+        self.client = client
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.updated_at = 0.0
+        self._filters = {}
+        if exchange_info is not None:
+            self.load(exchange_info)
+
+    def load(self, exchange_info):
+        # Собираем новый словарь и подменяем ссылку целиком
+        self._filters = {s['symbol']: parse_symbol_filters(s) for s in exchange_info['symbols']}
+        self.updated_at = time.time()
+
+    def refresh(self):
+        self.load(self.client.get_exchange_info())
+        self.save_snapshot()
+
+    def is_stale(self):
+        return time.time() - self.updated_at >= self.ttl
+
+    def load_snapshot(self):
+        """
+        Загружает фильтры из снимка на диске. Возвращает False, если снимка нет,
+        он другой версии или повреждён; битые записи отдельных символов отбрасываются.
+        """
+        if not self.snapshot_path:
+            return False
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Снимок exchangeInfo не читается: {e}")
+            return False
+        if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+            return False
+        filters = snapshot.get('filters')
+        updated_at = snapshot.get('updated_at')
+        if not isinstance(filters, dict) or not isinstance(updated_at, (int, float)):
+            return False
+        valid = {symbol: f for symbol, f in filters.items() if _valid_filters(symbol, f)}
+        if not valid:
+            return False
+        if len(valid) < len(filters):
+            print(f"⚠️ В снимке exchangeInfo {len(filters) - len(valid)} битых записей — пропущены")
+        self._filters = valid
+        # Время из будущего (сбитые часы) считаем устаревшим снимком
+        self.updated_at = updated_at if updated_at <= time.time() else 0.0
+        return True
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        snapshot = {'version': SNAPSHOT_VERSION, 'updated_at': self.updated_at, 'filters': self._filters}
+        tmp_path = self.snapshot_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить снимок exchangeInfo: {e}")
+
+    def ensure_loaded(self):
+        """
+        Снимок с диска, если он есть, иначе — синхронный get_exchange_info().
+        Возвращает True, если загружен снимок (его стоит обновить в фоне).
+        """
+        if self.load_snapshot():
+            return True
+        self.refresh()
+        return False
+
+    def symbols(self):
+        return set(self._filters)
+
+    def tradable(self, quote_asset='USDT'):
+        """Торгуемые сейчас пары к quote_asset"""
+        return sorted(s for s, f in self._filters.items()
+                      if f.get('quote_asset') == quote_asset and f.get('status') == 'TRADING')
+
+    def get(self, symbol):
+        """Фильтры символа; если символа нет в кэше — один запрос get_symbol_info"""
+        filters = self._filters.get(symbol)
+        if filters is None:
+            info = self.client.get_symbol_info(symbol)
+            if not info:
+                return None
+            filters = parse_symbol_filters(info)
+            self._filters[symbol] = filters
+        return filters
+
+    def start_background_refresh(self, retry_delay=60):
+        def loop():
+            while True:
+                # Устаревший снимок обновляем сразу, свежий — когда истечёт ttl
+                time.sleep(max(0.0, self.updated_at + self.ttl - time.time()))
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠️ Не удалось обновить exchangeInfo: {e}")
+                    time.sleep(retry_delay)
+
+        t = threading.Thread(target=loop, daemon=True)
+        t.start()
+        return t
@@ -0,0 +1,31 @@
+import math
+import os
+import sys
+
+import pytest
+
+# Модули бота лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INTERVAL_MS = 5 * 60_000
+START_MS = 1_700_000_100_000 // INTERVAL_MS * INTERVAL_MS
+
+
+def make_klines(count, start=START_MS, interval_ms=INTERVAL_MS, price=100.0):
+    """Синтетические 5m-свечи в формате client.get_klines: синусоида с трендом"""
+    bars = []
+    for i in range(count):
+        open_price = price
+        price = price * (1 + 0.004 * math.sin(i / 7) + 0.0007 * math.cos(i / 3))
+        high = max(open_price, price) * 1.002
+        low = min(open_price, price) * 0.998
+        volume = 1000 + 400 * math.sin(i / 5) + (i % 11) * 30
+        open_time = start + i * interval_ms
+        bars.append([open_time, open_price, high, low, price, volume, open_time + interval_ms - 1,
+                     volume * price, 50 + i % 13, volume / 2, volume * price / 2, '0'])
+    return bars
+
+
+@pytest.fixture
+def klines():
+    return make_klines
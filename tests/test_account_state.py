@@ -0,0 +1,132 @@
+import pytest
+
+from account_state import AccountState
+from fake_stream import FakeStreamManager
+from sim_exchange import SimExchange
+
+
+@pytest.fixture
+def sim(klines):
+    return SimExchange({'TESTUSDT': klines(200)}, balances={'USDT': 1000.0, 'TEST': 5.0})
+
+
+@pytest.fixture
+def manager():
+    manager = FakeStreamManager()
+    manager.start()
+    yield manager
+    manager.stop()
+
+
+@pytest.fixture
+def account(sim, manager):
+    account = AccountState(sim, reconcile_interval=3600)
+    account.start(manager)
+    return account
+
+
+def test_rest_before_stream_starts(sim):
+    account = AccountState(sim)
+    assert account.free('USDT') == 1000.0
+    sim.balances['USDT'] = 700.0
+    assert account.free('USDT') == 700.0
+
+
+def test_loaded_once_then_in_memory(sim, account):
+    assert account.live
+    assert account.free('USDT') == 1000.0
+    assert account.free('TEST') == 5.0
+    assert account.free('NONE') == 0.0
+    sim.balances['USDT'] = 1.0  # REST больше не спрашиваем
+    assert account.free('USDT') == 1000.0
+
+
+def test_account_position_replaces_balances(sim, manager, account):
+    manager.push_account_position({'USDT': (812.5, 10.0), 'NEW': (3.0, 0.0)}, update_time=sim.now_ms + 1)
+    assert account.free('USDT') == 812.5
+    assert account.balances['USDT'] == {'free': 812.5, 'locked': 10.0}
+    assert account.free('NEW') == 3.0
+    assert account.free('TEST') == 5.0
+
+
+def test_balance_update_is_not_double_counted(sim, manager, account):
+    # Депозит: сначала дельта, затем снимок с итоговым балансом — учитывается только снимок
+    manager.push_balance_update('USDT', 250.0, update_time=sim.now_ms + 1)
+    assert account.free('USDT') == 1000.0
+    manager.push_account_position({'USDT': (1250.0, 0.0)}, update_time=sim.now_ms + 1)
+    assert account.free('USDT') == 1250.0
+    # Обратный порядок событий даёт тот же результат
+    manager.push_account_position({'USDT': (1200.0, 0.0)}, update_time=sim.now_ms + 2)
+    manager.push_balance_update('USDT', -50.0, update_time=sim.now_ms + 2)
+    assert account.free('USDT') == 1200.0
+
+
+def test_reserve_until_fill_and_next_snapshot(sim, manager, account):
+    account.reserve('a', 'USDT', 300.0)
+    account.reserve('b', 'USDT', 300.0)
+    assert account.free('USDT') == 400.0
+    assert account.free('TEST') == 5.0
+
+    # Снимок до исполнения ордеров резерв не снимает — даже с более поздним временем биржи
+    manager.push_account_position({'USDT': (1000.0, 0.0)}, update_time=sim.now_ms + 10**9)
+    assert account.free('USDT') == 400.0
+
+    manager.push_execution_report('TESTUSDT', 'BUY', 3.0, 100.0, client_order_id='a')
+    assert account.free('USDT') == 400.0  # снимок с этой сделкой ещё не пришёл
+    manager.push_account_position({'USDT': (700.0, 0.0)}, update_time=sim.now_ms + 10**9 + 1)
+    assert account.free('USDT') == 400.0  # 700 минус резерв неисполненного 'b'
+
+
+def test_rejected_order_releases_reserve(manager, account):
+    account.reserve('a', 'USDT', 300.0)
+    manager.push_execution_report('TESTUSDT', 'BUY', 3.0, 100.0, status='REJECTED', client_order_id='a')
+    assert account.free('USDT') == 1000.0
+
+
+def test_release_failed_order(account):
+    account.reserve('a', 'USDT', 600.0)
+    assert account.free('USDT') == 400.0
+    account.release('a')
+    assert account.free('USDT') == 1000.0
+
+
+def test_reconcile_drops_filled_and_stale_reserves(sim, manager, account):
+    account.reserve('filled', 'USDT', 100.0)
+    account.reserve('lost', 'USDT', 200.0)
+    account.reserve('open', 'USDT', 300.0)
+    manager.push_execution_report('TESTUSDT', 'BUY', 1.0, 100.0, client_order_id='filled')
+    account._reserved['lost']['at'] -= account.reconcile_interval + 1
+    sim.now_ms += 1
+    account.load()
+    assert set(account._reserved) == {'open'}
+    assert account.free('USDT') == 700.0
+
+
+def test_reserve_is_noop_over_rest(sim):
+    account = AccountState(sim)
+    account.reserve('a', 'USDT', 300.0)
+    account.release('a')
+    assert account.free('USDT') == 1000.0
+
+
+def test_older_rest_snapshot_does_not_overwrite_stream(sim, manager, account):
+    manager.push_account_position({'USDT': (900.0, 0.0)}, update_time=sim.now_ms + 10)
+    account.load()  # снимок REST с updateTime = now_ms — старше события
+    assert account.free('USDT') == 900.0
+    assert account.free('TEST') == 5.0
+
+
+def test_execution_report_is_recorded_until_final(manager, account):
+    manager.push_execution_report('TESTUSDT', 'BUY', 2.0, 101.5, status='NEW', client_order_id='abc')
+    assert account.orders['abc']['S'] == 'BUY'
+    manager.push_execution_report('TESTUSDT', 'BUY', 1.0, 101.5, status='PARTIALLY_FILLED', client_order_id='abc')
+    assert account.orders['abc']['X'] == 'PARTIALLY_FILLED'
+    manager.push_execution_report('TESTUSDT', 'BUY', 1.0, 101.5, client_order_id='abc')
+    assert 'abc' not in account.orders
+
+
+def test_stream_error_reconciles_with_rest(sim, manager, account):
+    sim.balances['USDT'] = 640.0
+    sim.now_ms += 1
+    manager.push_user_event({'e': 'error', 'm': 'stream closed'})
+    assert account.free('USDT') == 640.0
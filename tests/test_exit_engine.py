@@ -0,0 +1,103 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from exit_engine import ExitEngine
+
+OPENED = datetime(2024, 1, 1, 12, 0)
+TICK = 0.01
+
+
+def down(x):
+    return math.nextafter(x, -math.inf)
+
+
+def up(x):
+    return math.nextafter(x, math.inf)
+
+
+@pytest.fixture
+def engine():
+    return ExitEngine(take_profit=1.5, stop_loss=1.0)
+
+
+@pytest.mark.parametrize('side, exit_above, exit_below', [
+    ('BUY', 101.5, 99.0),    # TP сверху, SL снизу
+    ('SELL', 101.0, 98.5),   # SL сверху, TP снизу
+])
+def test_levels_fire_at_and_beyond_but_not_before(engine, side, exit_above, exit_below):
+    engine.add('p', 'TESTUSDT', side, 100.0, OPENED, 60)
+    levels = engine.levels('p')
+    assert levels['above'] == pytest.approx(exit_above)
+    assert levels['below'] == pytest.approx(exit_below)
+
+    above, below = levels['above'], levels['below']
+    assert engine.on_price('TESTUSDT', 100.0) == []
+
+    # Ровно на уровне и дальше — срабатывает, на шаг не дойдя — нет
+    for price in (above, up(above), above + TICK):
+        assert engine.on_price('TESTUSDT', price) == ['p']
+    for price in (down(above), above - TICK):
+        assert engine.on_price('TESTUSDT', price) == []
+
+    for price in (below, down(below), below - TICK):
+        assert engine.on_price('TESTUSDT', price) == ['p']
+    for price in (up(below), below + TICK):
+        assert engine.on_price('TESTUSDT', price) == []
+
+
+def test_price_only_touches_own_symbol(engine):
+    engine.add('a', 'AUSDT', 'BUY', 100.0, OPENED, 60)
+    engine.add('b', 'BUSDT', 'BUY', 100.0, OPENED, 60)
+    assert engine.on_price('AUSDT', 200.0) == ['a']
+    assert engine.on_price('CUSDT', 200.0) == []
+
+
+def test_deadline_expires_through_on_clock(engine):
+    engine.add('p', 'TESTUSDT', 'BUY', 100.0, OPENED, 30)
+    assert engine.on_clock(OPENED + timedelta(minutes=30) - timedelta(microseconds=1)) == []
+    assert engine.on_clock(OPENED + timedelta(minutes=30)) == ['p']
+    # Не закрытая позиция возвращается и на следующем тике
+    assert engine.on_clock(OPENED + timedelta(minutes=31)) == ['p']
+    engine.remove('p')
+    assert engine.on_clock(OPENED + timedelta(minutes=32)) == []
+
+
+def test_readd_after_exit_uses_new_levels(engine):
+    engine.add('p', 'TESTUSDT', 'BUY', 100.0, OPENED, 30)
+    assert engine.on_price('TESTUSDT', 101.5) == ['p']
+    engine.remove('p')
+    assert engine.on_price('TESTUSDT', 101.5) == []
+
+    reopened = OPENED + timedelta(hours=1)
+    engine.add('p', 'TESTUSDT', 'SELL', 200.0, reopened, 30)
+    assert engine.on_price('TESTUSDT', 101.5) == ['p']  # для короткой 200 → 101.5 — тейк-профит
+    assert engine.on_price('TESTUSDT', 200.0) == []
+    assert engine.on_clock(OPENED + timedelta(minutes=30)) == []
+    assert engine.on_clock(reopened + timedelta(minutes=30)) == ['p']
+
+
+def test_readd_without_remove_replaces_levels(engine):
+    engine.add('p', 'TESTUSDT', 'BUY', 100.0, OPENED, 30)
+    engine.add('p', 'TESTUSDT', 'BUY', 110.0, OPENED, 30)
+    assert engine.on_price('TESTUSDT', 101.5) == ['p']  # старый тейк-профит, но ниже нового стопа 108.9
+    assert engine.on_price('TESTUSDT', 109.5) == []
+    assert engine.on_price('TESTUSDT', 111.65) == ['p']
+    assert engine.on_clock(OPENED + timedelta(minutes=30)) == ['p']
+
+
+def test_removed_deadline_never_fires(engine):
+    engine.add('p', 'TESTUSDT', 'BUY', 100.0, OPENED, 10)
+    engine.add('q', 'TESTUSDT', 'BUY', 100.0, OPENED, 20)
+    engine.remove('p')
+    assert engine.on_clock(OPENED + timedelta(minutes=15)) == []
+
+    # Тот же ключ с более поздним дедлайном: старая запись кучи не срабатывает
+    engine.add('p', 'TESTUSDT', 'BUY', 100.0, OPENED + timedelta(minutes=15), 60)
+    assert sorted(engine.on_clock(OPENED + timedelta(minutes=20))) == ['q']
+    assert sorted(engine.on_clock(OPENED + timedelta(minutes=75))) == ['p', 'q']
+    engine.remove('q')
+    engine.remove('p')
+    assert engine.on_clock(OPENED + timedelta(days=1)) == []
+    assert engine.levels('p') is None
@@ -0,0 +1,77 @@
+import json
+
+from kline_cache import KlineCache
+from kline_store import KlineStore
+from sim_exchange import SimExchange
+
+
+def test_gap_is_recorded_in_current_segment(tmp_path, klines):
+    bars = klines(300)
+    store = KlineStore(str(tmp_path))
+    store.append('TESTUSDT', '5m', bars[:100])
+    store.append('TESTUSDT', '5m', bars[100:150])
+    assert store.gaps('TESTUSDT', '5m') == []
+
+    # После простоя окно начинается не вплотную к сохранённому — разрыв в индексе, сегмент тот же
+    store.append('TESTUSDT', '5m', bars[200:260] + bars[270:300])
+    count, first, last, segments = store.coverage('TESTUSDT', '5m')
+    assert segments == 1
+    assert (count, first, last) == (240, bars[0][0], bars[-1][0])
+    assert store.gaps('TESTUSDT', '5m') == [bars[200][0], bars[270][0]]
+    assert list(store.read('TESTUSDT', '5m')['timestamp']) == [b[0] for b in bars[:150] + bars[200:260] + bars[270:300]]
+
+
+def test_gap_across_segment_boundary(tmp_path, klines):
+    bars = klines(100)
+    store = KlineStore(str(tmp_path), segment_bars=50)
+    store.append('TESTUSDT', '5m', bars[:50])
+    store.append('TESTUSDT', '5m', bars[60:100])
+    assert store.coverage('TESTUSDT', '5m')[3] == 2
+    assert store.gaps('TESTUSDT', '5m') == [bars[60][0]]
+
+
+def test_index_is_not_rewritten_on_every_append(tmp_path, klines):
+    bars = klines(300)
+    store = KlineStore(str(tmp_path))
+    store.append('TESTUSDT', '5m', bars[:100])
+    index_path = tmp_path / 'TESTUSDT' / '5m' / 'index.json'
+    saved = index_path.read_text()
+    store.append('TESTUSDT', '5m', bars[100:150])
+    store.append('TESTUSDT', '5m', bars[200:250])
+    assert index_path.read_text() == saved
+
+    # Без flush (падение процесса) хвост восстанавливается по данным сегмента
+    restarted = KlineStore(str(tmp_path))
+    assert restarted.coverage('TESTUSDT', '5m') == store.coverage('TESTUSDT', '5m')
+    assert restarted.gaps('TESTUSDT', '5m') == [bars[200][0]]
+
+    store.flush()
+    assert json.loads(index_path.read_text()) == store._index('TESTUSDT', '5m')
+
+
+def test_warm_takes_contiguous_tail(tmp_path, klines):
+    bars = klines(300)
+    store = KlineStore(str(tmp_path))
+    store.append('TESTUSDT', '5m', bars[:100])
+    store.append('TESTUSDT', '5m', bars[150:250])
+
+    cache = KlineCache(None, '5m', size=300, store=store)
+    cache.update('TESTUSDT', fetch=False)
+    warmed = cache.get('TESTUSDT', fetch=False)
+    assert [b[0] for b in warmed] == [b[0] for b in bars[150:250]]
+
+
+def test_refill_after_downtime_is_not_gapped_on_next_start(tmp_path, klines):
+    bars = klines(1000)
+    store = KlineStore(str(tmp_path))
+    store.append('TESTUSDT', '5m', bars[:300])
+
+    sim = SimExchange({'TESTUSDT': bars}, start_bar=800)
+    KlineCache(sim, '5m', size=300, store=store).update('TESTUSDT')
+
+    restarted = KlineCache(sim, '5m', size=300, store=store)
+    restarted.update('TESTUSDT', fetch=False)
+    warmed = restarted.get('TESTUSDT', fetch=False)
+    assert len(warmed) >= 299
+    assert restarted._is_contiguous(warmed)
+    assert warmed[-1][0] == bars[799][0]
@@ -0,0 +1,75 @@
+import urllib.request
+
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Registry, start_http_server
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_render_text_format(registry):
+    orders = Counter('bot_orders_total', 'Ордера', ['side', 'note'], registry=registry)
+    orders.labels('BUY', 'plain').inc()
+    orders.labels(side='BUY', note='plain').inc(2)
+    orders.labels('SELL', 'a "q" \\ b\nc').inc()
+
+    positions = Gauge('bot_open_positions', 'Открытые позиции', registry=registry)
+    positions.set(3)
+    positions.dec()
+    queue = Gauge('bot_queue', 'Очередь', registry=registry)
+    queue.set_function(lambda: 7)
+
+    latency = Histogram('bot_latency_seconds', 'Задержка', ['step'], buckets=(0.5, 0.1, 1.0), registry=registry)
+    step = latency.labels(step='scan')
+    for value in (0.05, 0.1, 0.3, 1.0, 2.0, 5.0):
+        step.observe(value)
+
+    assert registry.render() == '\n'.join([
+        '# HELP bot_orders_total Ордера',
+        '# TYPE bot_orders_total counter',
+        'bot_orders_total{side="BUY",note="plain"} 3.0',
+        'bot_orders_total{side="SELL",note="a \\"q\\" \\\\ b\\nc"} 1.0',
+        '# HELP bot_open_positions Открытые позиции',
+        '# TYPE bot_open_positions gauge',
+        'bot_open_positions 2.0',
+        '# HELP bot_queue Очередь',
+        '# TYPE bot_queue gauge',
+        'bot_queue 7.0',
+        '# HELP bot_latency_seconds Задержка',
+        '# TYPE bot_latency_seconds histogram',
+        # Корзины накопительные, граница включается, последняя — +Inf и равна _count
+        'bot_latency_seconds_bucket{step="scan",le="0.1"} 2',
+        'bot_latency_seconds_bucket{step="scan",le="0.5"} 3',
+        'bot_latency_seconds_bucket{step="scan",le="1.0"} 4',
+        'bot_latency_seconds_bucket{step="scan",le="+Inf"} 6',
+        'bot_latency_seconds_sum{step="scan"} 8.45',
+        'bot_latency_seconds_count{step="scan"} 6',
+    ]) + '\n'
+
+
+def test_failing_gauge_function_renders_nan(registry):
+    gauge = Gauge('bot_broken', 'Сломанная функция', registry=registry)
+    gauge.set_function(lambda: 1 / 0)
+    assert registry.render().splitlines()[-1] == 'bot_broken nan'
+
+
+def test_duplicate_name_rejected(registry):
+    Counter('bot_x_total', 'x', registry=registry)
+    with pytest.raises(ValueError):
+        Gauge('bot_x_total', 'x', registry=registry)
+
+
+def test_http_endpoint(registry):
+    Counter('bot_hits_total', 'Запросы', registry=registry).inc()
+    server = start_http_server(0, registry=registry)
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert response.read().decode('utf-8') == registry.render()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,167 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from notifier import TelegramNotifier
+
+
+class TelegramStandIn(ThreadingHTTPServer):
+    """Локальная замена api.telegram.org: запоминает запросы, умеет тормозить и отвечать ошибкой"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.requests = []  # (время, путь, поля формы)
+        self.delay = 0.0
+        self.status = 200
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def texts(self):
+        with self.lock:
+            return [fields['text'] for _, _, fields in self.requests]
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        fields = {k: v[0] for k, v in parse_qs(body).items()}
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), self.path, fields))
+        time.sleep(self.server.delay)
+        payload = b'{"ok": true}' if self.server.status == 200 else b'{"ok": false}'
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = TelegramStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_notifier(server, **kwargs):
+    kwargs.setdefault('min_interval', 0.0)
+    return TelegramNotifier('TOKEN', 'CHAT', api_url=server.url, **kwargs)
+
+
+def test_sends_to_bot_endpoint(server):
+    notifier = make_notifier(server)
+    notifier.send('привет')
+    assert notifier.flush(5)
+    _, path, fields = server.requests[0]
+    assert path == '/botTOKEN/sendMessage'
+    assert fields == {'chat_id': 'CHAT', 'text': 'привет', 'parse_mode': 'Markdown'}
+    assert notifier.sent == 1
+    notifier.stop(0)
+
+
+def test_repeated_errors_are_coalesced(server):
+    notifier = make_notifier(server, min_interval=0.3)
+    notifier.send('первое')  # занимает окно min_interval — ошибки успевают склеиться в очереди
+    for _ in range(5):
+        notifier.send_error('биржа недоступна')
+    assert notifier.flush(5)
+    assert notifier.coalesced == 4
+    assert server.texts() == ['первое', 'биржа недоступна\n(повторилось 5 раз)']
+    notifier.stop(0)
+
+
+def test_error_cooldown_holds_back_repeats(server):
+    notifier = make_notifier(server, error_cooldown=0.5)
+    notifier.send_error('таймаут')
+    assert notifier.flush(5)
+    notifier.send_error('таймаут')
+    notifier.send_error('таймаут')
+    assert notifier.flush(5)
+    (first, _, _), (second, _, _) = server.requests
+    assert second - first >= 0.45
+    assert server.texts() == ['таймаут', 'таймаут\n(повторилось 2 раз)']
+    notifier.stop(0)
+
+
+def test_min_interval_between_messages(server):
+    notifier = make_notifier(server, min_interval=0.2)
+    for i in range(4):
+        notifier.send(f"сообщение {i}")
+    assert notifier.flush(5)
+    times = [t for t, _, _ in server.requests]
+    assert len(times) == 4
+    assert all(b - a >= 0.18 for a, b in zip(times, times[1:]))
+    notifier.stop(0)
+
+
+def test_max_per_minute(server):
+    notifier = make_notifier(server, max_per_minute=3)
+    for i in range(5):
+        notifier.send(f"сообщение {i}")
+    assert not notifier.flush(1.0)
+    assert len(server.requests) == 3
+    notifier.stop(0)
+
+
+def test_slow_endpoint_does_not_block_caller(server):
+    server.delay = 1.0
+    notifier = make_notifier(server, timeout=5)
+    start = time.perf_counter()
+    for i in range(20):
+        notifier.send(f"сообщение {i}")
+        notifier.send_error('ошибка')
+    assert time.perf_counter() - start < 0.1
+    notifier.stop(0)
+
+
+def test_failing_endpoint_does_not_block_caller(server):
+    server.status = 500
+    notifier = make_notifier(server)
+    start = time.perf_counter()
+    for i in range(3):
+        notifier.send(f"сообщение {i}")
+    assert time.perf_counter() - start < 0.1
+    assert notifier.flush(5)
+    assert (notifier.sent, notifier.failed) == (0, 3)
+    notifier.stop(0)
+
+
+def test_unreachable_endpoint_retries_then_gives_up(server):
+    url = server.url
+    server.shutdown()
+    server.server_close()
+    notifier = TelegramNotifier('TOKEN', 'CHAT', api_url=url, min_interval=0.0, max_attempts=2, timeout=1)
+    start = time.perf_counter()
+    notifier.send('потеряется')
+    assert time.perf_counter() - start < 0.1
+    assert notifier.flush(10)
+    assert (notifier.sent, notifier.failed) == (0, 1)
+    notifier.stop(0)
+
+
+def test_bounded_queue_counts_dropped(server):
+    server.delay = 0.5
+    notifier = make_notifier(server, max_queue=3)
+    for i in range(10):
+        notifier.send(f"сообщение {i}")
+    assert notifier.dropped >= 6
+    assert notifier.flush(5)
+    # О пропущенных сообщается в следующем отправленном после них
+    texts = server.texts()
+    assert len(texts) == 10 - notifier.dropped
+    assert sum(t.endswith(f"\n(пропущено сообщений: {notifier.dropped})") for t in texts) == 1
+    notifier.stop(0)
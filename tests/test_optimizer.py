@@ -0,0 +1,14 @@
+import optimizer
+import utils
+from kline_cache import klines_to_frame
+
+
+def test_spawned_workers_score_like_in_process(klines):
+    histories = {'TESTUSDT': klines_to_frame(klines(700))}
+    params, report = optimizer.optimize(histories, n_candidates=3, max_workers=1, seed=7)
+
+    optimizer._init_worker(histories, utils.strategy_params)
+    expected = [optimizer._score_candidate(c, 3) for c in optimizer.sample_candidates(3, seed=7)]
+    assert report['candidates'] == 3
+    assert (report['baseline']['train'], report['baseline']['test']) == expected[0]
+    assert report['best']['train'] == max(train for train, _ in expected)
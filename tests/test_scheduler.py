@@ -0,0 +1,73 @@
+import pytest
+
+from scheduler import ScanScheduler, percentile_ranks
+
+SYMBOLS = [f'S{i}USDT' for i in range(10)]
+
+
+@pytest.fixture
+def scheduler():
+    """10 символов: S9 — самый активный (интервал 1), S0 — спящий (max_interval)"""
+    scheduler = ScanScheduler(symbol_weight=2, max_interval=12)
+    scheduler.set_universe(SYMBOLS)
+    scheduler.update_tickers([
+        {'symbol': s, 'quoteVolume': str(1000 * (i + 1)), 'priceChangePercent': str(i + 1)}
+        for i, s in enumerate(SYMBOLS)
+    ])
+    return scheduler
+
+
+def test_percentile_ranks():
+    assert percentile_ranks({'a': 3.0, 'b': 1.0, 'c': None, 'd': 2.0}) == {'a': 1.0, 'b': 0.0, 'c': 0.0, 'd': 0.5}
+    assert percentile_ranks({'a': 5.0}) == {'a': 1.0}
+
+
+def test_pinned_first_and_truncated_by_budget(scheduler):
+    batch = scheduler.next_batch(budget=8, pinned=['S0USDT', 'NOPEUSDT', 'S1USDT', 'S0USDT'])
+    assert batch[:2] == ['S0USDT', 'S1USDT']
+    assert len(batch) == 4
+    assert scheduler.backlog == 6  # не сканированные ни разу, но не влезли
+
+    # Позиций больше, чем бюджет, — берутся первые
+    assert scheduler.next_batch(budget=4, pinned=SYMBOLS[:5]) == SYMBOLS[:2]
+
+
+def test_budget_truncation_takes_most_active_unscanned_first(scheduler):
+    first = scheduler.next_batch(budget=12)
+    assert first == SYMBOLS[::-1][:6]
+    assert scheduler.backlog == 4
+    second = scheduler.next_batch(budget=12)
+    assert set(SYMBOLS[:4]) <= set(second)
+    assert scheduler.backlog == 0
+
+
+def test_dormant_symbols_back_off_to_their_interval(scheduler):
+    scanned = {s: [] for s in SYMBOLS}
+    for cycle in range(1, 61):
+        batch = scheduler.next_batch(budget=12)
+        assert len(batch) <= 6
+        for s in batch:
+            scanned[s].append(cycle)
+    intervals = {s: scheduler.interval(s) for s in SYMBOLS}
+    assert intervals['S9USDT'] == 1 and intervals['S0USDT'] == 12
+
+    # Бюджета хватает на 6 символов за цикл, но спящие не добирают его — ждут своего интервала
+    for s in SYMBOLS:
+        gaps = {b - a for a, b in zip(scanned[s][1:], scanned[s][2:])}
+        assert gaps == {intervals[s]}, s
+    assert len(scanned['S9USDT']) == 60
+    assert len(scanned['S0USDT']) <= 6
+
+
+def test_whole_universe_when_it_fits(scheduler):
+    for _ in range(3):
+        assert sorted(scheduler.next_batch(budget=20)) == sorted(SYMBOLS)
+    assert scheduler.fits(20) and not scheduler.fits(19)
+
+
+def test_low_volume_lowers_score(scheduler):
+    scheduler.next_batch(budget=20)
+    before = scheduler.interval('S9USDT')
+    scheduler.record('S9USDT', None, volume_ok=False)
+    scheduler.next_batch(budget=20)
+    assert scheduler.interval('S9USDT') > before
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import optimizer
+from backtest import run_backtest
+from batch_signals import BatchIndicators, ewm_mean, signal_matrix, stack_frames
+from indicators import IndicatorEngine
+from kline_cache import klines_to_frame
+from strategies import STRATEGY_REGISTRY, STRATEGY_SIGNALS, required_bars, strategy_warmup
+
+
+@pytest.fixture
+def df(klines):
+    return klines_to_frame(klines(700))
+
+
+def test_vwap_window_does_not_depend_on_loaded_history(df):
+    # VWAP по окну на длинной истории = накопительный VWAP по последним window барам
+    window = STRATEGY_REGISTRY['vwap_rsi_strategy']['params']['vwap_window']
+    rolling = IndicatorEngine(df).vwap(window).iloc[-1]
+    cumulative = IndicatorEngine(df.iloc[-window:].reset_index(drop=True)).vwap().iloc[-1]
+    assert rolling == pytest.approx(cumulative, rel=1e-12)
+    assert strategy_warmup('vwap_rsi_strategy') == window
+
+
+def test_batch_vwap_matches_pandas(df):
+    (_, arrays), = stack_frames({'TESTUSDT': df})
+    np.testing.assert_allclose(BatchIndicators(arrays).vwap(100)[0], IndicatorEngine(df).vwap(100).to_numpy(),
+                               rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('span', [1, 2, 9, 26, 200])
+def test_batch_ewm_matches_pandas(span):
+    # Длинный ряд: блочный cumsum не должен терять точность между блоками
+    rng = np.random.default_rng(span)
+    x = 100 * np.exp(rng.normal(0, 0.01, (3, 5000)).cumsum(axis=1))
+    x[1] = np.diff(x[0], prepend=x[0, 0])  # ряд около нуля со сменой знака — как MACD
+    expected = np.vstack([pd.Series(row).ewm(span=span).mean().to_numpy() for row in x])
+    np.testing.assert_allclose(ewm_mean(x, span), expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('start', [0, 350, 620])
+def test_batch_signals_match_scalar_on_last_bar(df, start):
+    window = df.iloc[start:].reset_index(drop=True)
+    names = [n for n in STRATEGY_REGISTRY if strategy_warmup(n) <= len(window)]
+    (_, arrays), = stack_frames({'TESTUSDT': window})
+    batch = signal_matrix(BatchIndicators(arrays), names)[:, 0]
+    engine = IndicatorEngine(window)
+    scalar = [STRATEGY_REGISTRY[n]['func'](window, params=STRATEGY_REGISTRY[n]['params'], engine=engine) for n in names]
+    assert [{1: 'BUY', -1: 'SELL', 0: None}[int(code)] for code in batch] == scalar
+
+
+def test_backtest_start_bar_only_warms_up(df):
+    full = run_backtest(df)
+    late = run_backtest(df, start_bar=400)
+    assert all(t['entry_bar'] >= 400 for t in late['trades'])
+    # Сигналы те же, что на полной истории: сделки совпадают начиная с первой после start_bar
+    bars = [(t['entry_bar'], t['exit_bar'], t['direction']) for t in late['trades']]
+    assert bars == [(t['entry_bar'], t['exit_bar'], t['direction']) for t in full['trades'] if t['entry_bar'] >= bars[0][0]]
+
+
+def test_test_folds_get_warm_up_history(df, monkeypatch):
+    seen = []
+
+    def fake_backtest(window, params_by_name=None, start_bar=0):
+        seen.append((len(window), start_bar))
+        return {'profit': 0.0}
+
+    monkeypatch.setattr(optimizer, 'run_backtest', fake_backtest)
+    monkeypatch.setattr(optimizer, '_worker_histories', {'TESTUSDT': df})
+    candidate = optimizer.sample_candidates(1)[0]
+    optimizer._score_candidate(candidate, 3)
+
+    warmup = required_bars(STRATEGY_SIGNALS, candidate)
+    folds = optimizer.walk_forward_folds(len(df), 3)
+    for ((train, test), (train_len, train_start), (test_len, test_start)) in zip(folds, seen[::2], seen[1::2]):
+        # Перед участком — вся доступная история, но не больше прогрева
+        assert test_start == min(test[0], warmup)
+        assert test_len - test_start == test[1] - test[0]
+        assert train_start == min(train[0], warmup)
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from fake_stream import FakeStreamManager
+from kline_cache import KlineCache
+from sim_exchange import SimExchange
+from streaming import MarketStream
+
+
+@pytest.fixture
+def bars(klines):
+    return klines(300)
+
+
+@pytest.fixture
+def cache(bars):
+    sim = SimExchange({'TESTUSDT': bars}, start_bar=100)
+    cache = KlineCache(sim, '5m', size=50)
+    cache.update('TESTUSDT')
+    return cache
+
+
+@pytest.fixture
+def stream(cache):
+    closed = []
+    ticks = []
+    events = {'bar': threading.Event(), 'tick': threading.Event()}
+
+    def on_bar_close(symbol):
+        closed.append(symbol)
+        events['bar'].set()
+
+    def on_tick(symbol, price):
+        ticks.append((symbol, price))
+        events['tick'].set()
+
+    manager = FakeStreamManager()
+    manager.start()
+    stream = MarketStream(manager, ['TESTUSDT'], '5m', cache, on_bar_close=on_bar_close, on_tick=on_tick)
+    stream.start()
+    stream.closed, stream.ticks, stream.events = closed, ticks, events
+    yield stream
+    stream.stop()
+    manager.stop()
+
+
+def open_times(cache):
+    return [b[0] for b in cache.get('TESTUSDT', fetch=False)]
+
+
+def test_subscribes_to_kline_and_book_ticker(stream):
+    assert stream.streams() == ['testusdt@kline_5m', 'testusdt@bookTicker']
+
+
+def test_same_open_time_updates_last_bar(stream, cache, bars):
+    before = open_times(cache)
+    live = list(bars[100])
+    live[4] = live[4] * 1.01
+    stream.manager.push_kline('TESTUSDT', '5m', live, closed=False)
+    assert open_times(cache) == before
+    assert cache.get('TESTUSDT', fetch=False)[-1][4] == live[4]
+    assert stream.closed == []
+
+
+def test_next_bar_is_appended_and_closes(stream, cache, bars):
+    stream.manager.push_kline('TESTUSDT', '5m', bars[100], closed=True)
+    stream.manager.push_kline('TESTUSDT', '5m', bars[101], closed=False)
+    assert open_times(cache) == [b[0] for b in bars[52:102]]
+    assert stream.events['bar'].wait(2)
+    assert stream.closed == ['TESTUSDT']
+
+
+def test_late_message_is_ignored(stream, cache, bars):
+    before = cache.get('TESTUSDT', fetch=False)
+    stream.manager.push_kline('TESTUSDT', '5m', bars[90], closed=True)
+    assert cache.get('TESTUSDT', fetch=False) == before
+
+
+def test_gap_resets_symbol_until_refill(stream, cache, bars):
+    stream.manager.push_kline('TESTUSDT', '5m', bars[105], closed=False)
+    assert cache.symbols() == []
+    # Пока окно не перезалито через REST, поток его не заполняет
+    stream.manager.push_kline('TESTUSDT', '5m', bars[106], closed=False)
+    assert cache.symbols() == []
+
+    cache.client.seek(106)
+    cache.update('TESTUSDT')
+    assert open_times(cache) == [b[0] for b in bars[57:107]]
+
+
+def test_book_ticker_updates_price(stream):
+    stream.manager.push_book_ticker('TESTUSDT', 99.0, 101.0)
+    assert stream.get_price('TESTUSDT') == 100.0
+    assert stream.events['tick'].wait(2)
+    assert stream.ticks == [('TESTUSDT', 100.0)]
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kline_buffer import FIELD_NAMES
+from kline_cache import INTERVAL_MS
+from timeframes import MultiTimeframe
+
+RULES = {'15m': '15min', '1h': '1h'}
+AGGREGATE = {
+    'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum',
+    'quote_asset_volume': 'sum', 'number_of_trades': 'sum', 'taker_buy_base': 'sum', 'taker_buy_quote': 'sum',
+}
+
+
+def resample(bars, interval):
+    """Эталон: старшие бары по непрерывному участку базовых через pandas resample"""
+    df = pd.DataFrame([bar[:len(FIELD_NAMES)] for bar in bars], columns=FIELD_NAMES)
+    df.index = pd.to_datetime(df['timestamp'], unit='ms')
+    grouped = df.resample(RULES[interval], origin='epoch')
+    result = grouped.agg(AGGREGATE)
+    result['first_open'] = grouped['timestamp'].min()
+    result = result[result['first_open'].notna()]
+    result.insert(0, 'timestamp', result.index.as_unit('ms').asi8)
+    # Первый бар, начавшийся не с границы, MultiTimeframe не строит
+    if result['first_open'].iloc[0] != result['timestamp'].iloc[0]:
+        result = result.iloc[1:]
+    result['close_time'] = result['timestamp'] + INTERVAL_MS[interval] - 1
+    return result.drop(columns='first_open').reset_index(drop=True)
+
+
+def to_frame(bars):
+    return pd.DataFrame([bar[:len(FIELD_NAMES)] for bar in bars], columns=FIELD_NAMES)
+
+
+def assert_same(actual, expected):
+    columns = ['timestamp', 'close_time'] + list(AGGREGATE)
+    actual = actual[columns].reset_index(drop=True)
+    expected = expected[columns].reset_index(drop=True)
+    assert len(actual) == len(expected)
+    for column in columns:
+        np.testing.assert_allclose(actual[column].to_numpy(np.float64), expected[column].to_numpy(np.float64),
+                                   rtol=1e-12, err_msg=column)
+
+
+def live_updates(bars):
+    """Каждый бар приходит сначала незакрытым (часть объёма, close = open), затем итоговым"""
+    for bar in bars:
+        partial = list(bar)
+        partial[2] = partial[3] = partial[4] = bar[1]
+        for i in (5, 7, 9, 10):
+            partial[i] = bar[i] / 2
+        partial[8] = bar[8] // 2
+        yield partial
+        yield bar
+
+
+@pytest.mark.parametrize('live', [False, True])
+def test_matches_pandas_resample_with_gap_and_partial_tail(klines, live):
+    # Старт не на границе часа, разрыв посреди 15m-бара, хвост обрывается посреди часа
+    bars = klines(500)[:-5]
+    before, after = bars[:200], bars[213:]
+    assert (before[0][0] % INTERVAL_MS['1h']) and (after[-1][6] + 1) % INTERVAL_MS['1h']
+
+    timeframes = MultiTimeframe('5m', {'15m': 500, '1h': 500})
+    closed = []
+    for bar in live_updates(before + after) if live else before + after:
+        closed.extend(timeframes.add('TESTUSDT', bar))
+
+    for interval in ('15m', '1h'):
+        expected_before = resample(before, interval)
+        expected_after = resample(after, interval)
+        # Текущее окно — только участок после разрыва, последний бар ещё не закрыт
+        assert_same(timeframes.frame('TESTUSDT', interval), expected_after)
+        # Закрытые бары: до разрыва незавершённый бар пропадает, после — последний ещё открыт
+        closed_bars = to_frame([bar for i, bar in closed if i == interval])
+        assert_same(closed_bars, pd.concat([expected_before.iloc[:-1], expected_after.iloc[:-1]]))
+
+
+def test_add_many_equals_bar_by_bar(klines):
+    bars = klines(300)
+    one = MultiTimeframe('5m', {'15m': 100, '1h': 30})
+    many = MultiTimeframe('5m', {'15m': 100, '1h': 30})
+    for bar in bars:
+        one.add('TESTUSDT', bar)
+    many.add_many('TESTUSDT', bars)
+    for interval in ('15m', '1h'):
+        pd.testing.assert_frame_equal(one.frame('TESTUSDT', interval), many.frame('TESTUSDT', interval))
+        assert_same(many.frame('TESTUSDT', interval), resample(bars, interval).iloc[-(many.sizes[interval] + 1):])
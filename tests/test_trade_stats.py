@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from trade_stats import TradeStats
+
+
+def trade(symbol, result, minutes=0, profit=1.0):
+    return {'symbol': symbol, 'result': result, 'profit': profit if result == 'win' else -profit,
+            'amount': 50.0, 'strategy': 'ema_rsi_strategy,vwap_rsi_strategy',
+            'timestamp': datetime(2026, 1, 1, 12) + timedelta(minutes=minutes)}
+
+
+def test_period_winrate_resets_with_period():
+    stats = TradeStats()
+    for i in range(6):
+        stats.record(trade('DOGEUSDT', 'loss', i))
+    period = stats.reset_period()
+    assert period['total'] == 6
+    for i in range(5):
+        stats.record(trade('DOGEUSDT', 'win', 10 + i))
+
+    assert stats.symbol_winrate('DOGEUSDT', 5) == 5 / 11
+    assert stats.symbol_winrate('DOGEUSDT', 5, period=True) == 1.0
+    assert stats.symbol_winrate('XRPUSDT', 5, period=True) is None
+    stats.reset_period()
+    assert stats.symbol_winrate('DOGEUSDT', 5, period=True) is None
+
+
+def test_open_trades_are_not_counted():
+    stats = TradeStats()
+    stats.record(trade('DOGEUSDT', None))
+    assert stats.total['total'] == 0
+    assert stats.symbol_winrate('DOGEUSDT', 1, period=True) is None
+
+
+def test_rollups_by_strategy_and_hour():
+    stats = TradeStats()
+    stats.record(trade('DOGEUSDT', 'win', 0))
+    stats.record(trade('XRPUSDT', 'loss', 70))
+    assert stats.by_strategy['vwap_rsi_strategy']['total'] == 2
+    recent = stats.last_hours(24, now=datetime(2026, 1, 1, 13, 30))
+    assert recent['counts']['total'] == 2
+    assert stats.last_hours(1, now=datetime(2026, 1, 1, 13, 30))['by_symbol'] == {
+        'XRPUSDT': {'total': 1, 'wins': 0, 'losses': 1, 'profit': -1.0, 'amount': 50.0}
+    }
@@ -0,0 +1,159 @@
+import threading
+
+from kline_buffer import KlineBuffer
+from kline_cache import INTERVAL_MS
+
+# Binance выравнивает бары по UTC от эпохи, недельные — по понедельникам (эпоха — четверг)
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60_000
+
+
+def bucket_start(open_time, interval):
+    """Время открытия бара interval, в который попадает бар с временем открытия open_time"""
+    interval_ms = INTERVAL_MS[interval]
+    offset = WEEK_OFFSET_MS if interval == '1w' else 0
+    return (open_time - offset) // interval_ms * interval_ms + offset
+
+
+def merge_bar(acc, bar):
+    """Добавляет к агрегату следующую свечу базового интервала (формат client.get_klines)"""
+    if acc is None:
+        return [int(bar[0]), float(bar[1]), float(bar[2]), float(bar[3]), float(bar[4]), float(bar[5]),
+                int(bar[6]), float(bar[7]), int(bar[8]), float(bar[9]), float(bar[10])]
+    return [
+        acc[0],
+        acc[1],
+        max(acc[2], float(bar[2])),
+        min(acc[3], float(bar[3])),
+        float(bar[4]),
+        acc[5] + float(bar[5]),
+        acc[6],
+        acc[7] + float(bar[7]),
+        acc[8] + int(bar[8]),
+        acc[9] + float(bar[9]),
+        acc[10] + float(bar[10]),
+    ]
+
+
+class MultiTimeframe:
+    """
+    Собирает старшие таймфреймы (15m/1h/4h...) из свечей базового интервала прямо в памяти —
+    без отдельных запросов get_klines на каждый таймфрейм.
+    Свечи подаются по одной или пачкой в формате client.get_klines: бар с тем же временем
+    открытия обновляет текущий, следующий — закрывает предыдущий. Старший бар хранится
+    как агрегат закрытых базовых баров плюс текущий незакрытый, поэтому OHLCV совпадают
+    с барами биржи, а последний бар, как и у get_klines, может быть ещё не закрыт.
+    Неполный первый бар (история началась с середины) не строится; при разрыве базовых
+    свечей агрегация по символу начинается заново со следующей границы.
+    on_close(symbol, interval, bar) вызывается при закрытии старшего бара.
+    """
+
+    def __init__(self, base_interval, sizes, on_close=None):
+        """sizes — {интервал: сколько закрытых баров держать}"""
+        self.base_interval = base_interval
+        self.base_ms = INTERVAL_MS[base_interval]
+        for interval in sizes:
+            if INTERVAL_MS[interval] <= self.base_ms or INTERVAL_MS[interval] % self.base_ms:
+                raise ValueError(f"Таймфрейм {interval} не собирается из {base_interval}")
+        self.sizes = dict(sizes)
+        self.on_close = on_close
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    @property
+    def intervals(self):
+        return list(self.sizes)
+
+    def history_bars(self):
+        """Сколько базовых баров нужно, чтобы заполнить все таймфреймы (+1 на неполный первый бар)"""
+        return max(((size + 1) * INTERVAL_MS[interval] // self.base_ms for interval, size in self.sizes.items()),
+                   default=0)
+
+    def _new_state(self):
+        return {
+            'last_open': None,
+            'live': None,  # текущий базовый бар, ещё не закрыт
+            'frames': {
+                interval: {'buffer': KlineBuffer(size + 1), 'bucket': None, 'acc': None}
+                for interval, size in self.sizes.items()
+            },
+        }
+
+    def add(self, symbol, bar):
+        """Применяет свечу базового интервала; возвращает закрывшиеся старшие бары [(интервал, бар)]"""
+        with self._lock:
+            closed = self._add(symbol, bar)
+        self._notify(symbol, closed)
+        return closed
+
+    def add_many(self, symbol, bars):
+        closed = []
+        with self._lock:
+            for bar in bars:
+                closed.extend(self._add(symbol, bar))
+        self._notify(symbol, closed)
+        return closed
+
+    def _add(self, symbol, bar):
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = self._new_state()
+        open_time = int(bar[0])
+        last_open = state['last_open']
+        if last_open is not None:
+            if open_time < last_open:
+                return []  # запоздавшая свеча
+            if open_time > last_open + self.base_ms:
+                state = self._symbols[symbol] = self._new_state()  # разрыв — начинаем заново
+            elif open_time > last_open:
+                # Предыдущий базовый бар закрылся — переносим его в агрегат
+                for frame in state['frames'].values():
+                    if frame['bucket'] is not None:
+                        frame['acc'] = merge_bar(frame['acc'], state['live'])
+        state['last_open'] = open_time
+        state['live'] = bar
+
+        closed = []
+        for interval, frame in state['frames'].items():
+            start = bucket_start(open_time, interval)
+            buffer = frame['buffer']
+            if start != frame['bucket']:
+                if frame['bucket'] is not None:
+                    closed.append((interval, buffer.to_klines(1)[0]))
+                elif open_time - start >= self.base_ms:
+                    continue  # ждём начала следующего бара, неполный не строим
+                frame['bucket'] = start
+                frame['acc'] = None
+                buffer.append(self._current(frame, bar, interval))
+            else:
+                buffer.update_last(self._current(frame, bar, interval))
+        return closed
+
+    def _current(self, frame, live, interval):
+        bar = merge_bar(frame['acc'], live)
+        bar[0] = frame['bucket']
+        bar[6] = frame['bucket'] + INTERVAL_MS[interval] - 1
+        return bar
+
+    def _notify(self, symbol, closed):
+        if self.on_close is None:
+            return
+        for interval, bar in closed:
+            try:
+                self.on_close(symbol, interval, bar)
+            except Exception as e:
+                print(f"⚠️ Ошибка обработчика закрытия {symbol} {interval}: {e}")
+
+    def frame(self, symbol, interval, n=None):
+        """DataFrame последних n баров таймфрейма (последний может быть не закрыт) или None"""
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None:
+                return None
+            return state['frames'][interval]['buffer'].to_frame(n)
+
+    def reset(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._symbols.clear()
+            else:
+                self._symbols.pop(symbol, None)
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+
+
+class TradeJournal:
+    """
+    Журнал закрытых сделок в формате JSONL: одна сделка — одна строка.
+    Сохранение сделки — дописывание строки (O(1)), fsync выполняется пачками:
+    раз в fsync_every записей или раз в fsync_interval секунд.
+    """
+
+    def __init__(self, path, fsync_every=10, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def append(self, trade):
+        line = json.dumps(trade, default=str, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line + '\n')
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _open(self):
+        # Если прошлый запуск оборвался посреди строки — начинаем с новой, чтобы не склеить записи
+        needs_newline = False
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if needs_newline:
+            self._file.write('\n')
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def load(self):
+        """
+        Читает все сделки. Битые строки (например, недописанная последняя
+        после аварийного завершения) пропускаются.
+        Возвращает (сделки, количество битых строк).
+        """
+        trades = []
+        broken = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        trades.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        broken += 1
+        except FileNotFoundError:
+            pass
+        return trades, broken
+
+    def compact(self, keep_last=None):
+        """
+        Переписывает журнал начисто: убирает битые строки и (опционально)
+        оставляет только последние keep_last сделок. Замена файла атомарная.
+        """
+        trades, _ = self.load()
+        if keep_last is not None:
+            trades = trades[-keep_last:]
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._write_all(trades)
+        return len(trades)
+
+    def migrate_from_json(self, json_path):
+        """Однократный перенос старого trade_history.json в журнал"""
+        if os.path.exists(self.path) or not os.path.exists(json_path):
+            return False
+        with open(json_path, 'r', encoding='utf-8') as f:
+            trades = json.load(f)
+        with self._lock:
+            self._write_all(trades)
+        os.replace(json_path, json_path + '.migrated')
+        print(f"📦 История сделок перенесена в {os.path.basename(self.path)}: {len(trades)} записей")
+        return True
+
+    def _write_all(self, trades):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for trade in trades:
+                f.write(json.dumps(trade, default=str, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+def _new_counts():
+    return {'total': 0, 'wins': 0, 'losses': 0, 'profit': 0.0, 'amount': 0.0}
+
+
+def _add(counts, trade):
+    counts['total'] += 1
+    if trade['result'] == 'win':
+        counts['wins'] += 1
+    else:
+        counts['losses'] += 1
+    counts['profit'] += trade.get('profit', 0.0)
+    counts['amount'] += trade.get('amount', 0.0)
+
+
+def _merge(target, counts):
+    for key, value in counts.items():
+        target[key] += value
+
+
+def _new_bucket():
+    return {'counts': _new_counts(), 'by_symbol': {}, 'by_strategy': {}}
+
+
+def trade_strategies(trade):
+    """Стратегии сделки: поле 'strategy' — строка вида 'ema_rsi,bollinger_rsi'"""
+    return [s.strip() for s in (trade.get('strategy') or '').split(',') if s.strip()]
+
+
+def winrate(counts):
+    return counts['wins'] / counts['total'] if counts['total'] else None
+
+
+class TradeStats:
+    """
+    Накопительная статистика закрытых сделок.
+    Счётчики по символам, стратегиям, часам и дням обновляются один раз при закрытии сделки,
+    поэтому winrate и отчёты не зависят от длины истории.
+    """
+
+    def __init__(self, hourly_retention=48, daily_retention=90):
+        self.hourly_retention = hourly_retention
+        self.daily_retention = daily_retention
+        self.total = _new_counts()
+        self.period = _new_counts()  # с момента последнего reset_period() (отчёт за 3 часа)
+        self.period_by_symbol = {}   # то же по символам — для размера ставки, как раньше по trade_log
+        self.by_symbol = {}
+        self.by_strategy = {}
+        self.hourly = OrderedDict()  # {начало часа: корзина}
+        self.daily = OrderedDict()   # {дата: корзина}
+        self._lock = threading.Lock()
+
+    def record(self, trade):
+        """Учитывает закрытую сделку"""
+        if trade.get('result') not in ('win', 'loss'):
+            return
+        ts = self._naive(trade['timestamp'])
+        strategies = trade_strategies(trade)
+        with self._lock:
+            _add(self.total, trade)
+            _add(self.period, trade)
+            _add(self.period_by_symbol.setdefault(trade['symbol'], _new_counts()), trade)
+            _add(self.by_symbol.setdefault(trade['symbol'], _new_counts()), trade)
+            for strat in strategies:
+                _add(self.by_strategy.setdefault(strat, _new_counts()), trade)
+
+            hour = ts.replace(minute=0, second=0, microsecond=0)
+            for buckets, key, retention in (
+                (self.hourly, hour, self.hourly_retention),
+                (self.daily, ts.date(), self.daily_retention),
+            ):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    out_of_order = bool(buckets) and key < next(reversed(buckets))
+                    bucket = buckets[key] = _new_bucket()
+                    # Сделки приходят по времени; запоздавшая (редко) — восстанавливаем порядок корзин
+                    if out_of_order:
+                        items = sorted(buckets.items())
+                        buckets.clear()
+                        buckets.update(items)
+                _add(bucket['counts'], trade)
+                _add(bucket['by_symbol'].setdefault(trade['symbol'], _new_counts()), trade)
+                for strat in strategies:
+                    _add(bucket['by_strategy'].setdefault(strat, _new_counts()), trade)
+                while len(buckets) > retention:
+                    buckets.popitem(last=False)
+
+    def symbol_winrate(self, symbol, min_trades=5, period=False):
+        """Winrate символа (за всё время или с period=True — за текущий период) или None, если сделок меньше min_trades"""
+        counts = (self.period_by_symbol if period else self.by_symbol).get(symbol)
+        if not counts or counts['total'] < min_trades:
+            return None
+        return winrate(counts)
+
+    def last_hours(self, hours=24, now=None):
+        """Сводка за последние `hours` часов по часовым корзинам"""
+        now = self._naive(now or datetime.now())
+        cutoff = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+        result = _new_bucket()
+        with self._lock:
+            for hour in reversed(self.hourly):
+                if hour < cutoff:
+                    break
+                bucket = self.hourly[hour]
+                _merge(result['counts'], bucket['counts'])
+                for group in ('by_symbol', 'by_strategy'):
+                    for name, counts in bucket[group].items():
+                        _merge(result[group].setdefault(name, _new_counts()), counts)
+        return result
+
+    def reset_period(self):
+        """Сбрасывает счётчик периода и возвращает его значение"""
+        with self._lock:
+            period, self.period = self.period, _new_counts()
+            self.period_by_symbol = {}
+        return period
+
+    @staticmethod
+    def _naive(ts):
+        # Сделки пишутся с naive datetime.now(); загруженные из журнала — с той же датой и tz Киева
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts)
+        return ts.replace(tzinfo=None)